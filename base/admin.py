@@ -1,25 +1,241 @@
+from django import forms
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Max
+from django.utils.functional import cached_property
+
 from .models import (
     Product,
+    ProductStockSummary,
     Stock,
+    StockMovement,
+    StockSnapshot,
     StockTransfer,
     PurchaseOrder,
     DropShipment,
     DemandForecast,
     GoodsReceivedNote,
+    IdempotencyKey,
+    Job,
     SalesOrder,
-    SalesInvoice
+    SalesOrderAllocation,
+    SalesInvoice,
+    SalesDailyRollup,
+    SalesMonthlyRollup,
 )
 
-# Already registered:
-admin.site.register(Product)
-admin.site.register(Stock)
-admin.site.register(StockTransfer)
-admin.site.register(PurchaseOrder)
-admin.site.register(DropShipment)
-admin.site.register(DemandForecast)
-
-# ⚡ Register missing models for testing signals
-admin.site.register(GoodsReceivedNote)
-admin.site.register(SalesOrder)
-admin.site.register(SalesInvoice)
+# -------------------------------
+# LARGE-TABLE CHANGELISTS
+# -------------------------------
+# Changelists show related columns from one joined query
+# (list_select_related), search only with exact lookups on indexed columns
+# (SKU, customer, location), use raw-id widgets instead of <select>s over
+# every product, and skip the COUNT(*) over the whole table.
+
+ESTIMATE_COUNT_ABOVE = 10_000
+
+
+def estimated_row_count(model):
+    """Cheap row-count estimate: planner statistics or the highest pk."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+    # One index probe; an upper bound when rows have been deleted.
+    return model._default_manager.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Unfiltered changelists of big tables report an estimated total instead
+    of counting every row; filtered or searched lists are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate > ESTIMATE_COUNT_ABOVE:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # no second COUNT(*) when filtering
+    list_per_page = 100
+    search_help_text = "Exact match; quote values that contain spaces."
+
+
+class ReadOnlyAdmin(LargeTableAdmin):
+    """Rows written only by base.services."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('sku', 'name', 'unit_price', 'created_at')
+    search_fields = ('sku__exact', 'name__exact')
+
+
+@admin.register(Stock)
+class StockAdmin(LargeTableAdmin):
+    list_display = ('product', 'location', 'quantity', 'reorder_level')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+    search_fields = ('product__sku__exact', 'location__exact')
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(ReadOnlyAdmin):
+    list_display = ('created_at', 'product', 'location', 'quantity', 'reason', 'reference_id')
+    list_select_related = ('product',)
+    list_filter = ('reason',)
+    search_fields = ('product__sku__exact', 'location__exact')
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(ReadOnlyAdmin):
+    list_display = ('taken_at', 'product', 'location', 'quantity', 'last_movement_id')
+    list_select_related = ('product',)
+    search_fields = ('product__sku__exact',)
+
+
+@admin.register(ProductStockSummary)
+class ProductStockSummaryAdmin(ReadOnlyAdmin):
+    list_display = ('product', 'total_quantity', 'location_count', 'below_reorder_count')
+    list_select_related = ('product',)
+    search_fields = ('product__sku__exact',)
+
+
+class StockTransferForm(forms.ModelForm):
+    class Meta:
+        model = StockTransfer
+        fields = ['product', 'from_location', 'to_location', 'quantity']
+
+    def clean(self):
+        data = super().clean()
+        product, source, quantity = data.get('product'), data.get('from_location'), data.get('quantity')
+        if source is not None and source == data.get('to_location'):
+            raise forms.ValidationError("Transfer source and destination must differ.")
+        if product is not None and source is not None and quantity is not None:
+            available = Stock.objects.filter(product=product, location=source).values_list('quantity', flat=True).first()
+            if (available or 0) < quantity:
+                raise forms.ValidationError(f"Only {available or 0} in stock at {source}.")
+        return data
+
+
+@admin.register(StockTransfer)
+class StockTransferAdmin(LargeTableAdmin):
+    """
+    Saving a new transfer moves the stock (base.signals); existing ones are
+    history, corrected by a transfer the other way.
+    """
+    form = StockTransferForm
+    list_display = ('transfer_date', 'product', 'from_location', 'to_location', 'quantity')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+    search_fields = ('product__sku__exact', 'from_location__exact', 'to_location__exact')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'product', 'supplier', 'quantity', 'expected_date', 'status')
+    list_select_related = ('product',)
+    list_filter = ('status',)
+    raw_id_fields = ('product',)
+    search_fields = ('product__sku__exact', 'supplier__exact')
+
+
+@admin.register(DropShipment)
+class DropShipmentAdmin(LargeTableAdmin):
+    list_display = ('id', 'product', 'customer_name', 'shipped')
+    list_select_related = ('product',)
+    list_filter = ('shipped',)
+    raw_id_fields = ('product',)
+    search_fields = ('product__sku__exact', 'customer_name__exact')
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(LargeTableAdmin):
+    list_display = ('product', 'month', 'predicted_demand')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+    search_fields = ('product__sku__exact',)
+
+
+@admin.register(GoodsReceivedNote)
+class GoodsReceivedNoteAdmin(LargeTableAdmin):
+    list_display = ('id', 'purchase_order', 'received_quantity', 'received_date', 'matched', 'processed')
+    list_select_related = ('purchase_order__product',)
+    raw_id_fields = ('purchase_order',)
+    search_fields = ('purchase_order__product__sku__exact', 'purchase_order__supplier__exact')
+
+
+@admin.register(SalesOrder)
+class SalesOrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'product', 'customer_name', 'quantity', 'status', 'priority', 'location', 'order_date')
+    list_select_related = ('product',)
+    list_filter = ('status',)
+    raw_id_fields = ('product',)
+    search_fields = ('product__sku__exact', 'customer_name__exact')
+
+
+@admin.register(SalesOrderAllocation)
+class SalesOrderAllocationAdmin(ReadOnlyAdmin):
+    list_display = ('allocated_at', 'sales_order', 'location', 'quantity')
+    list_select_related = ('sales_order__product',)
+    search_fields = ('sales_order__customer_name__exact', 'location__exact')
+
+
+@admin.register(SalesInvoice)
+class SalesInvoiceAdmin(LargeTableAdmin):
+    list_display = ('id', 'sales_order', 'invoice_date', 'quantity', 'processed')
+    list_select_related = ('sales_order__product',)
+    raw_id_fields = ('sales_order',)
+    search_fields = ('sales_order__product__sku__exact', 'sales_order__customer_name__exact')
+
+
+@admin.register(Job)
+class JobAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'kind', 'object_id', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('object_id__exact',)
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(ReadOnlyAdmin):
+    list_display = ('key', 'owner', 'status_code', 'created_at', 'expires_at')
+    search_fields = ('key__exact',)
+
+
+@admin.register(SalesDailyRollup)
+class SalesDailyRollupAdmin(ReadOnlyAdmin):
+    list_display = ('day', 'product', 'orders', 'quantity', 'revenue', 'invoiced_quantity')
+    list_select_related = ('product',)
+    search_fields = ('product__sku__exact',)
+
+
+@admin.register(SalesMonthlyRollup)
+class SalesMonthlyRollupAdmin(ReadOnlyAdmin):
+    list_display = ('month', 'product', 'orders', 'quantity', 'revenue', 'invoiced_quantity')
+    list_select_related = ('product',)
+    search_fields = ('product__sku__exact',)
@@ -0,0 +1,52 @@
+# base/async_views.py
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from .models import Product, Stock
+from .serializers import ProductSerializer
+from .services import areorder_report
+
+# -------------------------------
+# ASYNC READ ENDPOINTS
+# -------------------------------
+# Plain Django async views for the hottest scanner lookups. Under ASGI a
+# request waiting on the database doesn't hold a worker thread.
+
+
+@require_GET
+async def stock_lookup(request):
+    """
+    GET /api/async/stock/?product=<id>[&location=<name>]
+    """
+    product = request.GET.get('product', '')
+    if not product.isdigit():
+        return JsonResponse({'product': ["A valid integer is required."]}, status=400)
+
+    rows = Stock.objects.filter(product_id=int(product))
+    location = request.GET.get('location')
+    if location:
+        rows = rows.filter(location=location)
+    data = [
+        row async for row in rows.values('id', 'product', 'quantity', 'reorder_level', 'location')
+    ]
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def product_by_sku(request, sku):
+    """
+    GET /api/async/products/<sku>/
+    """
+    try:
+        product = await Product.objects.aget(sku=sku)
+    except Product.DoesNotExist:
+        return JsonResponse({'detail': "Not found."}, status=404)
+    return JsonResponse(ProductSerializer(product).data)
+
+
+@require_GET
+async def reorder_list(request):
+    """
+    GET /api/async/stock/reorder/[?location=<name>]
+    """
+    return JsonResponse(await areorder_report(request.GET.get('location')), safe=False)
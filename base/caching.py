@@ -0,0 +1,85 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .pagination import stream_requested
+
+# -------------------------------
+# VERSIONED RESPONSE CACHE
+# -------------------------------
+# Cached entries live under a per-namespace version number. Invalidating
+# a namespace is one cache.incr; the stale entries simply expire.
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+PRODUCT_CACHE_NAMESPACE = 'catalog'
+
+
+def cache_version_key(namespace):
+    return f'{namespace}:version'
+
+
+def cache_version(namespace):
+    return cache.get_or_set(cache_version_key(namespace), 1, None)
+
+
+async def acache_version(namespace):
+    return await cache.aget_or_set(cache_version_key(namespace), 1, None)
+
+
+def invalidate_cache_namespace(namespace):
+    def bump():
+        try:
+            cache.incr(cache_version_key(namespace))
+        except ValueError:
+            pass  # Nothing cached yet.
+    # After commit, so a concurrent reader can't re-cache the old rows
+    # under the new version.
+    transaction.on_commit(bump)
+
+
+class CachedResponseMixin:
+    """
+    Caches list/retrieve response data per URL and serves it with a strong
+    ETag. A matching If-None-Match gets a 304 straight from the cache,
+    without touching the database or the serializer.
+
+    Set `cache_namespace` on the view and invalidate it from signals.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        if stream_requested(request):
+            return super().list(request, *args, **kwargs)
+        return self._cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def _cached_response(self, request, build):
+        key = 'response:{}:{}:{}:{}'.format(
+            self.cache_namespace,
+            cache_version(self.cache_namespace),
+            request.accepted_renderer.format,
+            request.build_absolute_uri(),
+        )
+        entry = cache.get(key)
+        state = 'HIT'
+        if entry is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = '"{}"'.format(hashlib.sha1(JSONRenderer().render(response.data)).hexdigest())
+            entry = (etag, response.data)
+            cache.set(key, entry, RESPONSE_CACHE_TIMEOUT)
+            state = 'MISS'
+
+        etag, data = entry
+        headers = {'ETag': etag, 'X-Cache': state}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
@@ -0,0 +1,199 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from .pagination import stream_requested
+
+# ---------------------------------
+# VALUES() LIST SERIALIZATION
+# ---------------------------------
+# A ModelSerializer builds a model instance per row and runs every field's
+# to_representation. For plain column fields the JSON renderer already
+# produces the same output from the raw value, so list responses read
+# values() dicts and only convert the fields whose representation differs
+# (decimals and datetimes). Serializers with computed fields fall back to
+# the regular path.
+
+CONVERTED_FIELDS = (serializers.DecimalField, serializers.DateTimeField)
+
+
+class NotValuesSerializable(Exception):
+    pass
+
+
+def _datetime_converter(field):
+    """
+    DateTimeField.to_representation with the timezone looked up once per
+    response instead of once per value (the common ISO 8601, aware case;
+    anything else goes through the field).
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if not timezone.is_aware(value):
+            return field.to_representation(value)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+class ValuesSerializer:
+    """
+    Read-only representation of values() rows, producing the same output
+    as `serializer_class` (nested ModelSerializer fields included, read
+    through joined lookups such as product__name).
+    """
+
+    def __init__(self, serializer_class):
+        self.columns = self._columns(serializer_class())
+        self.lookups = list(self._lookups(self.columns))
+
+    @classmethod
+    def _columns(cls, serializer, prefix=''):
+        model = serializer.Meta.model
+        columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ModelSerializer):
+                columns.append((name, None, None, cls._columns(field, f'{prefix}{field.source}__')))
+                continue
+            if isinstance(field, serializers.BaseSerializer) or field.source == '*' or '.' in field.source:
+                raise NotValuesSerializable(name)
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise NotValuesSerializable(name)
+            if not model_field.concrete:
+                raise NotValuesSerializable(name)
+            converted = field if isinstance(field, CONVERTED_FIELDS) else None
+            columns.append((name, prefix + field.source, converted, None))
+        return columns
+
+    @classmethod
+    def _lookups(cls, columns):
+        for _, lookup, _, children in columns:
+            if children is None:
+                yield lookup
+            else:
+                yield from cls._lookups(children)
+
+    @classmethod
+    def _plan(cls, columns):
+        plan = []
+        for name, lookup, field, children in columns:
+            if children is not None:
+                plan.append((name, None, None, cls._plan(children)))
+            elif isinstance(field, serializers.DateTimeField):
+                plan.append((name, lookup, _datetime_converter(field), None))
+            else:
+                plan.append((name, lookup, field.to_representation if field is not None else None, None))
+        return plan
+
+    def represent(self, rows):
+        """Yield the representation of each values() row."""
+        plan = self._plan(self.columns)
+        for row in rows:
+            yield self._build(plan, row)
+
+    @classmethod
+    def _build(cls, plan, row):
+        data = {}
+        for name, lookup, convert, children in plan:
+            if children is not None:
+                data[name] = cls._build(children, row)
+                continue
+            value = row[lookup]
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+
+_values_serializers = {}
+_expanded_serializers = {}
+
+
+def values_serializer_for(serializer_class):
+    """Cached ValuesSerializer for `serializer_class`, or None if unsupported."""
+    if serializer_class not in _values_serializers:
+        try:
+            _values_serializers[serializer_class] = ValuesSerializer(serializer_class)
+        except NotValuesSerializable:
+            _values_serializers[serializer_class] = None
+    return _values_serializers[serializer_class]
+
+
+def expanded_serializer(serializer_class, nested):
+    """Subclass of `serializer_class` with the given {field: serializer class} inlined."""
+    key = (serializer_class, tuple(sorted(nested)))
+    if key not in _expanded_serializers:
+        attrs = {name: nested_class(read_only=True) for name, nested_class in nested.items()}
+        _expanded_serializers[key] = type(f'Expanded{serializer_class.__name__}', (serializer_class,), attrs)
+    return _expanded_serializers[key]
+
+
+class FastListMixin:
+    """
+    List (and ?stream=true) responses from values() rows instead of model
+    instances; the output is unchanged.
+
+    `expandable_fields = {'product': ProductSerializer}` adds
+    `?expand=product` to GET requests: the related object is inlined in
+    place of its id, from the same query (a join in lists,
+    select_related in detail views).
+    """
+    expandable_fields = {}
+
+    def get_expand(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method != 'GET':
+            return {}
+        names = [name for name in request.query_params.get('expand', '').split(',') if name]
+        unknown = sorted(set(names) - set(self.expandable_fields))
+        if unknown:
+            raise ValidationError({'expand': f"Cannot expand: {', '.join(unknown)}."})
+        return {name: self.expandable_fields[name] for name in names}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = self.get_expand()
+        return queryset.select_related(*expand) if expand else queryset
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        expand = self.get_expand()
+        return expanded_serializer(serializer_class, expand) if expand else serializer_class
+
+    def list(self, request, *args, **kwargs):
+        values = values_serializer_for(self.get_serializer_class())
+        if values is None or stream_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*values.lookups, *self._ordering_lookups(queryset, values))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(list(values.represent(rows)))
+        return self.get_paginated_response(list(values.represent(page)))
+
+    def _ordering_lookups(self, queryset, values):
+        # Cursor pagination reads its position from the row's ordering keys.
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is None:
+            return []
+        ordering = get_ordering(self.request, queryset, self)
+        return [key.lstrip('-') for key in ordering if key.lstrip('-') not in values.lookups]
+
+    def stream_representations(self, queryset):
+        values = values_serializer_for(self.get_serializer_class())
+        if values is None:
+            yield from super().stream_representations(queryset)
+            return
+        yield from values.represent(queryset.values(*values.lookups).iterator(chunk_size=self.stream_chunk_size))
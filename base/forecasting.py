@@ -0,0 +1,107 @@
+import datetime
+
+import numpy as np
+
+from .models import DemandForecast, Product, SalesMonthlyRollup
+
+# ---------------------------------
+# BATCH DEMAND FORECASTING
+# ---------------------------------
+# Sales history is read from the monthly sales rollups into a products x
+# months matrix; every method below works on whole columns, so the cost
+# grows with the number of months, not with one Python loop per product.
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def monthly_demand_matrix(history_months, until=None):
+    """
+    Returns (product_ids, months, matrix) where matrix[i, j] is the quantity
+    of product_ids[i] sold in months[j]. The last month is the one before
+    `until` (default: the current month), so partial months are left out.
+    """
+    until = (until or datetime.date.today()).replace(day=1)
+    months = [add_months(until, offset) for offset in range(-history_months, 0)]
+    product_ids = np.fromiter(Product.objects.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+    matrix = np.zeros((len(product_ids), len(months)), dtype=np.float64)
+
+    rows = (
+        SalesMonthlyRollup.objects.filter(month__gte=months[0], month__lt=until, quantity__gt=0)
+        .values_list('product_id', 'month', 'quantity')
+    )
+    sales = list(rows)
+    if sales:
+        column = {month: index for index, month in enumerate(months)}
+        product_id, month, quantity = zip(*sales)
+        matrix[np.searchsorted(product_ids, product_id), [column[m] for m in month]] = quantity
+    return product_ids, months, matrix
+
+
+def moving_average(matrix, horizon, window=3):
+    level = matrix[:, -window:].mean(axis=1)
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def exponential_smoothing(matrix, horizon, alpha=0.3):
+    # Simple exponential smoothing in closed form: the final level is a
+    # weighted sum of the history, so one matrix-vector product does it.
+    n = matrix.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (n - 1)  # the first observation seeds the level
+    level = matrix @ weights
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def seasonal_naive(matrix, horizon, season=12):
+    if matrix.shape[1] < season:
+        raise ValueError(f"seasonal_naive needs at least {season} months of history")
+    last_season = matrix[:, -season:]
+    return last_season[:, np.arange(horizon) % season]
+
+
+METHODS = {
+    'moving_average': moving_average,
+    'exponential_smoothing': exponential_smoothing,
+    'seasonal_naive': seasonal_naive,
+}
+# The keyword parameters each method takes.
+METHOD_PARAMS = {
+    'moving_average': ('window',),
+    'exponential_smoothing': ('alpha',),
+    'seasonal_naive': ('season',),
+}
+
+
+def forecast_demand(method='exponential_smoothing', history_months=24, horizon=3, until=None, **params):
+    """
+    Forecast the next `horizon` months for every product and upsert the
+    result into DemandForecast. Returns the number of rows written.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown forecasting method {method!r}; choose one of {', '.join(METHODS)}")
+    unexpected = sorted(set(params) - set(METHOD_PARAMS[method]))
+    if unexpected:
+        raise ValueError(f"{method} does not take {', '.join(unexpected)}")
+
+    product_ids, months, matrix = monthly_demand_matrix(history_months, until)
+    if not len(product_ids):
+        return 0
+    forecast = METHODS[method](matrix, horizon, **params)
+    forecast = np.clip(np.rint(forecast), 0, None).astype(np.int64)
+
+    future = [add_months(months[-1], offset) for offset in range(1, horizon + 1)]
+    DemandForecast.objects.bulk_create(
+        [
+            DemandForecast(product_id=int(product_id), month=month, predicted_demand=int(quantity))
+            for product_id, row in zip(product_ids, forecast)
+            for month, quantity in zip(future, row)
+        ],
+        batch_size=2000,
+        update_conflicts=True,
+        unique_fields=['product', 'month'],
+        update_fields=['predicted_demand'],
+    )
+    return forecast.size
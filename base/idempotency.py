@@ -0,0 +1,126 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# -------------------------------
+# IDEMPOTENCY-KEY REPLAY
+# -------------------------------
+# A create request sent with an `Idempotency-Key` header runs once per
+# (user, key). The key row is inserted first, in the same transaction as
+# the create, and the response is stored on it before commit; so a retry
+# either finds the stored response (one indexed lookup, replayed without
+# validation, saves or signals) or, if it raced the original, waits on the
+# unique index and then replays. Failed requests (exceptions, non-2xx)
+# roll the key back, so the client can fix the request and retry with it.
+#
+# Reusing a key for a different request (path or body) is a 422. Keys
+# expire after IDEMPOTENCY_KEY_TTL seconds; `manage.py
+# purge_idempotency_keys` deletes expired rows.
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def request_fingerprint(request):
+    """Hash of the method, path and parsed body, to spot a key reused for another request."""
+    data = request.data
+    if hasattr(data, 'lists'):  # QueryDict
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def idempotent_response(request, handler):
+    """
+    `handler()` run at most once per Idempotency-Key; retries get the
+    stored response back. Without the header, just `handler()`.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({IDEMPOTENCY_HEADER: f"Must be 1 to {MAX_KEY_LENGTH} characters."})
+
+    owner = request.user.pk or 0
+    fingerprint = request_fingerprint(request)
+    now = timezone.now()
+    stored = IdempotencyKey.objects.filter(owner=owner, key=key).first()
+    if stored is not None:
+        if stored.expires_at > now:
+            return _replay(stored, fingerprint)
+        IdempotencyKey.objects.filter(pk=stored.pk, expires_at__lte=now).delete()
+
+    try:
+        with transaction.atomic():
+            # Written first: on SQLite this takes the write lock before the
+            # handler's reads, and elsewhere a concurrent retry blocks here.
+            record = IdempotencyKey.objects.create(
+                owner=owner, key=key, fingerprint=fingerprint, created_at=now,
+                expires_at=now + datetime.timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+            )
+            response = handler()
+            if status.is_success(response.status_code):
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=['status_code', 'response'])
+            else:
+                record.delete()
+            return response
+    except IntegrityError:
+        stored = IdempotencyKey.objects.filter(owner=owner, key=key).first()
+        if stored is None:
+            raise
+        return _replay(stored, fingerprint)
+
+
+def _replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {'detail': f"This {IDEMPOTENCY_HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(stored.response, status=stored.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """Decorator for POST actions that create rows: honour Idempotency-Key."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        return idempotent_response(request, lambda: view_method(self, request, *args, **kwargs))
+    return wrapper
+
+
+class IdempotentCreateMixin:
+    """
+    `create` honours the Idempotency-Key header (see idempotent_response).
+    """
+
+    def create(self, request, *args, **kwargs):
+        return idempotent_response(
+            request, lambda: super(IdempotentCreateMixin, self).create(request, *args, **kwargs)
+        )
+
+
+def purge_expired_idempotency_keys(batch_size=1000):
+    """Delete expired keys in index-ordered batches. Returns the number deleted."""
+    total = 0
+    while True:
+        expired = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not expired:
+            return total
+        total += IdempotencyKey.objects.filter(pk__in=expired).delete()[0]
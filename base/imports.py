@@ -0,0 +1,148 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.parsers import BaseParser
+
+from .caching import PRODUCT_CACHE_NAMESPACE, invalidate_cache_namespace
+from .models import Product
+from .search import reindex_products
+
+# ---------------------------------
+# STREAMING PRODUCT IMPORT
+# ---------------------------------
+# Rows are read lazily from CSV or NDJSON, validated with field instances
+# built once (no ProductSerializer, and no per-row UniqueValidator query
+# on sku), and upserted by sku one chunk at a time, so memory stays flat
+# however long the file is. Each chunk commits on its own: re-running a
+# partly loaded file is safe because it is an upsert.
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+PRODUCT_IMPORT_FIELDS = {
+    'sku': serializers.CharField(max_length=100),
+    'name': serializers.CharField(max_length=200),
+    'description': serializers.CharField(allow_blank=True, required=False, default=''),
+    'unit_price': serializers.DecimalField(max_digits=10, decimal_places=2),
+}
+PRODUCT_UPDATE_FIELDS = ['name', 'description', 'unit_price']
+
+
+def iter_text_lines(stream, encoding='utf-8-sig'):
+    """Decode a binary stream line by line (utf-8-sig drops an Excel BOM)."""
+    return codecs.iterdecode(iter(stream.readline, b''), encoding)
+
+
+def read_csv(lines):
+    """Yield (line number, row dict) from CSV text lines with a header row."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(lines):
+    """Yield (line number, object) from NDJSON text lines, skipping blanks."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, serializers.ValidationError(f'Invalid JSON: {exc}')
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def validate_product_row(data):
+    """Return the cleaned field values of one row or raise ValidationError."""
+    if isinstance(data, serializers.ValidationError):
+        raise data
+    if not isinstance(data, dict):
+        raise serializers.ValidationError('Expected an object.')
+    values, errors = {}, {}
+    for name, field in PRODUCT_IMPORT_FIELDS.items():
+        try:
+            values[name] = field.run_validation(data.get(name, empty))
+        except serializers.ValidationError as exc:
+            errors[name] = exc.detail
+    if errors:
+        raise serializers.ValidationError(errors)
+    return values
+
+
+def _upsert_products(chunk):
+    """Upsert one chunk ({sku: values}); return how many SKUs were new."""
+    with transaction.atomic():
+        existing = set(Product.objects.filter(sku__in=chunk).values_list('sku', flat=True))
+        Product.objects.bulk_create(
+            [Product(**values) for values in chunk.values()],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=PRODUCT_UPDATE_FIELDS,
+        )
+        # bulk_create skips post_save, so drop the cached catalog and
+        # reindex the chunk for search here.
+        invalidate_cache_namespace(PRODUCT_CACHE_NAMESPACE)
+        reindex_products(Product.objects.filter(sku__in=chunk))
+    return len(chunk) - len(existing)
+
+
+def import_products(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Upsert products by sku from an iterable of (line number, row) pairs as
+    produced by read_csv/read_ndjson.
+
+    Returns a report: rows read, created, updated, failed, and the first
+    MAX_REPORTED_ERRORS row errors as {'line', 'sku', 'errors'}. Within a
+    chunk the last row for a repeated sku wins.
+    """
+    report = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        chunk = {}
+        for number, data in batch:
+            report['rows'] += 1
+            try:
+                values = validate_product_row(data)
+            except serializers.ValidationError as exc:
+                report['failed'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    sku = data.get('sku') if isinstance(data, dict) else None
+                    report['errors'].append({'line': number, 'sku': sku, 'errors': exc.detail})
+                continue
+            chunk[values['sku']] = values
+        if chunk:
+            created = _upsert_products(chunk)
+            report['created'] += created
+            report['updated'] += len(chunk) - created
+    return report
+
+
+class ProductRowsParser(BaseParser):
+    """
+    Parses the request body into a lazy iterator of rows for
+    import_products instead of loading it into memory.
+    """
+    reader = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self.reader(iter_text_lines(stream))
+
+
+class CSVRowsParser(ProductRowsParser):
+    media_type = 'text/csv'
+    reader = staticmethod(read_csv)
+
+
+class NDJSONRowsParser(ProductRowsParser):
+    media_type = 'application/x-ndjson'
+    reader = staticmethod(read_ndjson)
@@ -0,0 +1,193 @@
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------
+# PER-REQUEST SQL INSTRUMENTATION
+# ---------------------------------
+# Queries are timed through connection.execute_wrapper(), which works with
+# DEBUG off (connection.queries does not). Statements are grouped by shape
+# (the SQL text before parameters are bound, with IN lists and VALUES
+# tuples collapsed); one shape repeated many times in a request is the
+# signature of an N+1, e.g. `self.product.name` in a model's __str__ while
+# listing rows.
+
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 5)
+SLOWEST_PER_REQUEST = 3
+SLOWEST_PER_VIEW = 5
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_PLACEHOLDER_GROUPS = re.compile(r'\((?:%s, )*%s\)(?:, \((?:%s, )*%s\))*')
+
+
+def query_shape(sql):
+    return _PLACEHOLDER_GROUPS.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts, times and groups the statements of one
+    request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.slowest = []  # min-heap of (seconds, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.shapes[query_shape(sql)] += 1
+            if len(self.slowest) < SLOWEST_PER_REQUEST:
+                heapq.heappush(self.slowest, (elapsed, sql))
+            else:
+                heapq.heappushpop(self.slowest, (elapsed, sql))
+
+    def repeated_shapes(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def server_timing(self, total):
+        def desc(text):
+            return text.replace('\\', '').replace('"', "'")[:80]
+
+        entries = [
+            f'total;dur={total * 1000:.2f}',
+            f'sql;dur={self.duration * 1000:.2f};desc="{self.count} queries"',
+        ]
+        for i, (elapsed, sql) in enumerate(sorted(self.slowest, reverse=True), start=1):
+            entries.append(f'sql-slow-{i};dur={elapsed * 1000:.2f};desc="{desc(sql)}"')
+        repeated = self.repeated_shapes()
+        if repeated:
+            entries.append(f'n-plus-one;desc="{len(repeated)} shapes, worst x{repeated[0][1]}"')
+        return ', '.join(entries)
+
+
+def _bucket(value, bounds):
+    for bound in bounds:
+        if value <= bound:
+            return f'<={bound}'
+    return f'>{bounds[-1]}'
+
+
+class SQLMetrics:
+    """
+    In-process aggregate per view (one per worker process; reset on
+    restart or with reset()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, total, recorder):
+        repeated = recorder.repeated_shapes()
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = {
+                    'requests': 0,
+                    'queries': 0,
+                    'sql_ms': 0.0,
+                    'total_ms': 0.0,
+                    'latency_ms': Counter(),
+                    'queries_per_request': Counter(),
+                    'n_plus_one_requests': 0,
+                    'n_plus_one_shapes': Counter(),
+                    'slowest': [],
+                }
+            stats['requests'] += 1
+            stats['queries'] += recorder.count
+            stats['sql_ms'] += recorder.duration * 1000
+            stats['total_ms'] += total * 1000
+            stats['latency_ms'][_bucket(total * 1000, LATENCY_BUCKETS_MS)] += 1
+            stats['queries_per_request'][_bucket(recorder.count, QUERY_COUNT_BUCKETS)] += 1
+            if repeated:
+                stats['n_plus_one_requests'] += 1
+                for shape, n in repeated:
+                    stats['n_plus_one_shapes'][shape] = max(stats['n_plus_one_shapes'][shape], n)
+            for elapsed, sql in recorder.slowest:
+                item = (round(elapsed * 1000, 3), sql)
+                if len(stats['slowest']) < SLOWEST_PER_VIEW:
+                    heapq.heappush(stats['slowest'], item)
+                else:
+                    heapq.heappushpop(stats['slowest'], item)
+
+    def snapshot(self):
+        with self._lock:
+            views = {}
+            for view, stats in self._views.items():
+                n = stats['requests']
+                views[view] = {
+                    'requests': n,
+                    'avg_queries': round(stats['queries'] / n, 2),
+                    'avg_sql_ms': round(stats['sql_ms'] / n, 3),
+                    'avg_total_ms': round(stats['total_ms'] / n, 3),
+                    'latency_ms': dict(stats['latency_ms']),
+                    'queries_per_request': dict(stats['queries_per_request']),
+                    'n_plus_one_requests': stats['n_plus_one_requests'],
+                    'n_plus_one_shapes': [
+                        {'sql': shape, 'max_repeats': repeats}
+                        for shape, repeats in stats['n_plus_one_shapes'].most_common(SLOWEST_PER_VIEW)
+                    ],
+                    'slowest': [
+                        {'ms': ms, 'sql': sql} for ms, sql in sorted(stats['slowest'], reverse=True)
+                    ],
+                }
+        return dict(sorted(views.items(), key=lambda item: -item[1]['avg_sql_ms'] * item[1]['requests']))
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+metrics = SQLMetrics()
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Opt-in (settings.SQL_INSTRUMENTATION): adds Server-Timing headers with
+    the query count, SQL time and slowest statements of each request,
+    aggregates them per view for /api/_metrics/, and logs likely N+1
+    patterns. Queries run while a streaming response is consumed happen
+    after the middleware returns and are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = f"{request.method} {match.view_name if match else '<unresolved>'}"
+        response['Server-Timing'] = recorder.server_timing(total)
+        metrics.record(view, total, recorder)
+
+        repeated = recorder.repeated_shapes()
+        if repeated:
+            shape, n = repeated[0]
+            logger.warning("Possible N+1 in %s: %d queries, %r ran %d times", view, recorder.count, shape, n)
+        return response
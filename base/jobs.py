@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .services import post_goods_received, post_sales_invoices, take_write_lock
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------
+# DB-BACKED JOB QUEUE
+# ---------------------------------
+# Signal handlers insert a Job row in the same transaction as the GRN or
+# invoice that needs it, so a committed row always has its job and a rolled
+# back one never does. Workers (threads or processes, no broker) take
+# PENDING jobs in batches and run each batch in one short transaction:
+# the handlers post the whole batch with set-based statements, and the
+# batch's jobs are claimed inside that transaction (SQLite: under the write
+# lock; elsewhere: rows locked with SKIP LOCKED), so no job runs twice and
+# a crashed batch stays PENDING.
+#
+# A handler takes a list of object ids and returns {object_id: error} for
+# the ones it couldn't process; it must skip ids that were already done.
+
+def _post_grns(grn_ids):
+    post_goods_received(grn_ids)
+    return {}
+
+
+JOB_HANDLERS = {
+    'post_grn': _post_grns,
+    'post_invoice': post_sales_invoices,
+}
+
+# 'thread': run jobs on daemon threads in every web process (default).
+# 'external': only `manage.py run_jobs` runs them.
+JOB_WORKER = getattr(settings, 'JOB_WORKER', 'thread')
+JOB_WORKER_THREADS = getattr(settings, 'JOB_WORKER_THREADS', 1)
+JOB_BATCH_SIZE = getattr(settings, 'JOB_BATCH_SIZE', 50)
+# Seconds a woken worker waits for more jobs, so a burst of requests is
+# posted in a few batches instead of one transaction per request.
+JOB_BATCH_DELAY = getattr(settings, 'JOB_BATCH_DELAY', 0.05)
+JOB_POLL_INTERVAL = getattr(settings, 'JOB_POLL_INTERVAL', 5)
+
+
+def enqueue_job(kind, object_id):
+    """
+    Queue `kind` for `object_id`; a no-op if that job already exists. The
+    in-process worker is woken when the current transaction commits.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    Job.objects.bulk_create([Job(kind=kind, object_id=object_id)], ignore_conflicts=True)
+    _wake_on_commit()
+
+
+def retry_job(job_id):
+    """
+    Put a FAILED job back in the queue. Returns False if it isn't FAILED.
+    """
+    retried = Job.objects.filter(pk=job_id, status='FAILED').update(status='PENDING')
+    if retried:
+        _wake_on_commit()
+    return bool(retried)
+
+
+def _wake_on_commit():
+    if JOB_WORKER == 'thread':
+        transaction.on_commit(job_worker.wake)
+
+
+def run_jobs(limit=JOB_BATCH_SIZE):
+    """
+    Run one batch of PENDING jobs, oldest first. Returns how many this
+    worker claimed and ran, not counting any another worker got to first.
+    """
+    jobs = Job.objects.filter(status='PENDING').order_by('pk').values_list('pk', 'kind')[:limit]
+    by_kind = defaultdict(list)
+    for pk, kind in jobs:
+        by_kind[kind].append(pk)
+    return sum(_run_batch(kind, pks) for kind, pks in by_kind.items())
+
+
+def _run_batch(kind, pks):
+    """Claim and run the still-PENDING jobs among `pks`; returns how many."""
+    with transaction.atomic():
+        take_write_lock()
+        claimable = Job.objects.filter(pk__in=pks, status='PENDING')
+        if connection.features.has_select_for_update_skip_locked:
+            claimable = claimable.select_for_update(skip_locked=True)
+        claimed = dict(claimable.values_list('object_id', 'pk'))
+        if not claimed:
+            return 0
+
+        finished = {'finished_at': timezone.now(), 'attempts': F('attempts') + 1}
+        try:
+            with transaction.atomic():
+                errors = JOB_HANDLERS[kind](list(claimed))
+        except Exception as exc:  # noqa: BLE001 - recorded on the jobs
+            logger.warning("%s batch of %d jobs failed: %s", kind, len(claimed), exc)
+            errors = dict.fromkeys(claimed, f"{type(exc).__name__}: {exc}")
+
+        for object_id, error in errors.items():
+            logger.warning("Job %s %s #%s failed: %s", claimed[object_id], kind, object_id, error)
+            Job.objects.filter(pk=claimed[object_id]).update(status='FAILED', error=error, **finished)
+        done = [pk for object_id, pk in claimed.items() if object_id not in errors]
+        Job.objects.filter(pk__in=done).update(status='DONE', error='', **finished)
+    return len(claimed)
+
+
+def drain_jobs(limit=JOB_BATCH_SIZE):
+    """
+    Run batches until a batch claims nothing (the queue is empty, or the
+    rest is taken by other workers). Returns the number of jobs run.
+    """
+    total = 0
+    while True:
+        count = run_jobs(limit)
+        if not count:
+            return total
+        total += count
+
+
+def work(poll_interval=JOB_POLL_INTERVAL, limit=JOB_BATCH_SIZE):
+    """
+    Worker loop for `manage.py run_jobs`: drain, then poll.
+    """
+    while True:
+        try:
+            if drain_jobs(limit):
+                continue
+        except Exception:  # noqa: BLE001 - keep the worker alive
+            logger.exception("Job batch failed")
+            connection.close()
+        time.sleep(poll_interval)
+
+
+class JobWorker:
+    """
+    In-process worker: `threads` daemon threads that drain the queue
+    `batch_delay` seconds after being woken (by a commit that queued a job)
+    and every `poll_interval` seconds, which also picks up jobs queued by
+    other processes.
+    """
+
+    def __init__(self, threads=JOB_WORKER_THREADS, batch_delay=JOB_BATCH_DELAY, poll_interval=JOB_POLL_INTERVAL):
+        self.threads = threads
+        self.batch_delay = batch_delay
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def wake(self):
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _ensure_started(self):
+        if len(self._workers) == self.threads and all(t.is_alive() for t in self._workers):
+            return
+        with self._lock:
+            self._workers = [t for t in self._workers if t.is_alive()]
+            while len(self._workers) < self.threads:
+                thread = threading.Thread(target=self._work, name=f'ims-jobs-{len(self._workers)}', daemon=True)
+                thread.start()
+                self._workers.append(thread)
+
+    def _work(self):
+        while True:
+            if self._wakeup.wait(self.poll_interval):
+                time.sleep(self.batch_delay)
+            self._wakeup.clear()
+            try:
+                drain_jobs()
+            except Exception:  # noqa: BLE001 - keep the worker alive
+                logger.exception("Job batch failed")
+                connection.close()
+
+
+job_worker = JobWorker()
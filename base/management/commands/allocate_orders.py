@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from base.services import ALLOCATION_POLICIES, allocate_sales_orders
+
+
+class Command(BaseCommand):
+    help = "Allocate stock to every PENDING sales order in one pass and report shortfalls."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', choices=ALLOCATION_POLICIES, default='fifo')
+        parser.add_argument('--no-split', action='store_true', help="Fill each order from a single location.")
+        parser.add_argument('--dry-run', action='store_true', help="Report without writing anything.")
+
+    def handle(self, *args, **options):
+        report = allocate_sales_orders(
+            options['policy'], allow_split=not options['no_split'], dry_run=options['dry_run']
+        )
+        for shortfall in report['shortfalls']:
+            self.stderr.write(
+                f"SO #{shortfall['sales_order']}: product {shortfall['product']} "
+                f"needs {shortfall['requested']}, {shortfall['available']} available"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['orders']} pending orders: {report['allocated']} allocated "
+            f"({report['units']} units), {report['short']} short ({report['short_units']} units)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.forecasting import METHODS, forecast_demand
+
+
+class Command(BaseCommand):
+    help = "Forecast monthly demand for every product from the monthly sales rollups and upsert DemandForecast."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=sorted(METHODS), default='exponential_smoothing')
+        parser.add_argument('--history', type=int, default=24, help="Months of sales history to use.")
+        parser.add_argument('--horizon', type=int, default=3, help="Months ahead to forecast.")
+        parser.add_argument('--window', type=int, help="moving_average window (months).")
+        parser.add_argument('--alpha', type=float, help="exponential_smoothing factor, 0 < alpha <= 1.")
+        parser.add_argument('--season', type=int, help="seasonal_naive season length (months).")
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name]
+            for name in ('window', 'alpha', 'season')
+            if options[name] is not None
+        }
+        try:
+            written = forecast_demand(
+                options['method'], options['history'], options['horizon'], **params
+            )
+        except (TypeError, ValueError) as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} demand forecasts."))
@@ -0,0 +1,41 @@
+import csv
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.imports import IMPORT_CHUNK_SIZE, READERS, import_products, iter_text_lines
+
+
+class Command(BaseCommand):
+    help = "Upsert products by SKU from a CSV (with header row) or NDJSON file, streamed in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument('--format', choices=sorted(READERS), help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError("Pass --format csv or --format ndjson.")
+
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            report = import_products(READERS[fmt](iter_text_lines(stream)), options['chunk_size'])
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(exc)
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']} ({error['sku']}): {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} rows: {report['created']} created, "
+            f"{report['updated']} updated, {report['failed']} failed."
+        ))
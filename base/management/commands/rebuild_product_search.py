@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.search import REINDEX_CHUNK_SIZE, rebuild_product_search, search_index_enabled
+
+
+class Command(BaseCommand):
+    help = "Refill the product full-text search index from the product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REINDEX_CHUNK_SIZE, help="Products per INSERT.")
+
+    def handle(self, *args, **options):
+        if not search_index_enabled():
+            self.stdout.write("No search index on this database (needs SQLite with FTS5); search scans the table.")
+            return
+        start = time.perf_counter()
+        count = rebuild_product_search(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} products in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,40 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from base.jobs import JOB_BATCH_SIZE, JOB_POLL_INTERVAL, drain_jobs, work
+
+
+class Command(BaseCommand):
+    help = "Run queued stock-posting jobs (base.jobs) in one or more worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=JOB_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=JOB_POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = drain_jobs(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} jobs."))
+            return
+
+        worker_args = (options['poll_interval'], options['batch_size'])
+        if options['processes'] <= 1:
+            work(*worker_args)
+            return
+
+        # Forked children must not share the parent's DB connection.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=work, args=worker_args, name=f'ims-jobs-{i}', daemon=True)
+            for i in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} job workers.")
+        for process in processes:
+            process.join()
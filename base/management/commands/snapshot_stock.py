@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.services import take_stock_snapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshot stock balances that moved since the last snapshot (run periodically, e.g. nightly)."
+
+    def handle(self, *args, **options):
+        written = take_stock_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} stock snapshots."))
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import Permission
+from django.core.management.base import BaseCommand
+
+from base.roles import sync_default_groups
+
+
+class Command(BaseCommand):
+    help = "Sync the default groups and their permissions, writing only the rows that differ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Show the diff without writing it.")
+
+    def handle(self, *args, **options):
+        diff = sync_default_groups(dry_run=options['dry_run'])
+        if not diff:
+            self.stdout.write("Groups are up to date.")
+            return
+
+        changed = set().union(*(added | removed for added, removed in diff.values()))
+        names = {
+            pk: f"{app_label}.{codename}"
+            for pk, app_label, codename in Permission.objects.filter(pk__in=changed).values_list(
+                'pk', 'content_type__app_label', 'codename'
+            )
+        }
+        for group, (added, removed) in diff.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(group))
+            for pk in sorted(added, key=names.get):
+                self.stdout.write(self.style.SUCCESS(f"  + {names[pk]}"))
+            for pk in sorted(removed, key=names.get):
+                self.stdout.write(self.style.ERROR(f"  - {names[pk]}"))
+        if options['dry_run']:
+            self.stdout.write("Dry run: nothing written.")
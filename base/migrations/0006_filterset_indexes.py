@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:26
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_stock(apps, schema_editor):
+    """
+    Fold duplicate (product, location) Stock rows into one before the
+    unique constraint is added.
+    """
+    Stock = apps.get_model('base', 'Stock')
+    duplicates = (
+        Stock.objects.values('product_id', 'location')
+        .annotate(rows=Count('id'), total=Sum('quantity'))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        rows = Stock.objects.filter(product_id=dup['product_id'], location=dup['location']).order_by('id')
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        Stock.objects.filter(pk=keep.pk).update(quantity=dup['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_goodsreceivednote_matched_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='demandforecast',
+            index=models.Index(fields=['month'], name='base_demand_month_f1f4b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demandforecast',
+            index=models.Index(fields=['predicted_demand'], name='base_demand_predict_9a33ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dropshipment',
+            index=models.Index(fields=['customer_name'], name='base_dropsh_custome_9af786_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dropshipment',
+            index=models.Index(condition=models.Q(('shipped', False)), fields=['id'], name='dropship_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goodsreceivednote',
+            index=models.Index(fields=['received_date'], name='base_goodsr_receive_f20832_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='base_produc_name_220298_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'expected_date'], name='base_purcha_status_abc8da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier'], name='base_purcha_supplie_03023c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['expected_date'], name='base_purcha_expecte_db5f4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesinvoice',
+            index=models.Index(fields=['invoice_date'], name='base_salesi_invoice_e0e05e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['status', 'order_date'], name='base_saleso_status_efb591_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['product', 'order_date'], name='base_saleso_product_8fb9f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['customer_name'], name='base_saleso_custome_18cc64_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['order_date'], name='base_saleso_order_d_83be1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['location'], name='base_stock_locatio_0d308c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['quantity'], name='base_stock_quantit_3d8d75_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransfer',
+            index=models.Index(fields=['product', 'transfer_date'], name='base_stockt_product_7f4925_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransfer',
+            index=models.Index(fields=['from_location'], name='base_stockt_from_lo_2bd61d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransfer',
+            index=models.Index(fields=['to_location'], name='base_stockt_to_loca_5b4782_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransfer',
+            index=models.Index(fields=['transfer_date'], name='base_stockt_transfe_d69778_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_stock, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='stock',
+            constraint=models.UniqueConstraint(fields=('product', 'location'), name='unique_stock_product_location'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+
+def backfill_stock_summary(apps, schema_editor):
+    Stock = apps.get_model('base', 'Stock')
+    ProductStockSummary = apps.get_model('base', 'ProductStockSummary')
+    totals = (
+        Stock.objects.values('product_id')
+        .annotate(
+            total=Sum('quantity'),
+            locations=Count('id'),
+            below=Count('id', filter=Q(quantity__lte=F('reorder_level'))),
+        )
+    )
+    ProductStockSummary.objects.bulk_create([
+        ProductStockSummary(
+            product_id=row['product_id'],
+            total_quantity=row['total'],
+            location_count=row['locations'],
+            below_reorder_count=row['below'],
+        )
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_filterset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_summary', serialize=False, to='base.product')),
+                ('total_quantity', models.PositiveIntegerField(default=0)),
+                ('location_count', models.PositiveIntegerField(default=0)),
+                ('below_reorder_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_stock_summary, migrations.RunPython.noop),
+    ]
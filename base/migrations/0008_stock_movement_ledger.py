@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """
+    Seed the ledger with the current quantity of every Stock row so that
+    balances derived from movements match Stock from day one.
+    """
+    Stock = apps.get_model('base', 'Stock')
+    StockMovement = apps.get_model('base', 'StockMovement')
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, location=location, quantity=quantity, reason='OPENING')
+        for product_id, location, quantity in Stock.objects.values_list('product_id', 'location', 'quantity')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_productstocksummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(choices=[('OPENING', 'Opening balance'), ('GRN', 'Goods received'), ('INVOICE', 'Sales invoice'), ('TRANSFER', 'Stock transfer'), ('ADJUSTMENT', 'Manual adjustment')], max_length=10)),
+                ('reference_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='base.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'location', 'created_at'], name='base_stockm_product_7db8b8_idx'), models.Index(fields=['location', 'created_at'], name='base_stockm_locatio_4b2957_idx'), models.Index(fields=['reason', 'created_at'], name='base_stockm_reason_27ff7d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.PositiveBigIntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='base.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'location', 'taken_at'], name='base_stocks_product_fac98b_idx'), models.Index(fields=['last_movement_id'], name='base_stocks_last_mo_4608ac_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_stock_movement_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['location'], name='stock_reorder_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_stock_reorder_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesorder',
+            name='location',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='salesorder',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('ALLOCATED', 'Allocated'), ('INVOICED', 'Invoiced'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('OPENING', 'Opening balance'), ('GRN', 'Goods received'), ('INVOICE', 'Sales invoice'), ('TRANSFER', 'Stock transfer'), ('ADJUSTMENT', 'Manual adjustment'), ('ALLOCATION', 'Sales order allocation')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='SalesOrderAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=100)),
+                ('quantity', models.PositiveIntegerField()),
+                ('allocated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sales_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='base.salesorder')),
+            ],
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:37
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    SalesOrder = apps.get_model('base', 'SalesOrder')
+    SalesInvoice = apps.get_model('base', 'SalesInvoice')
+    SalesDailyRollup = apps.get_model('base', 'SalesDailyRollup')
+    SalesMonthlyRollup = apps.get_model('base', 'SalesMonthlyRollup')
+
+    daily = {}
+    ordered = (
+        SalesOrder.objects.exclude(status='FAILED')
+        .values_list('product_id', 'order_date')
+        .annotate(
+            order_count=Count('id'),
+            units=Sum('quantity'),
+            sales=Sum(F('quantity') * F('product__unit_price'), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    for product_id, day, orders, quantity, revenue in ordered:
+        daily[product_id, day] = SalesDailyRollup(
+            product_id=product_id, day=day, orders=orders, quantity=quantity, revenue=revenue,
+        )
+    invoiced = (
+        SalesInvoice.objects.values_list('sales_order__product_id', 'sales_order__order_date')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+    )
+    for product_id, day, quantity in invoiced:
+        daily.setdefault((product_id, day), SalesDailyRollup(product_id=product_id, day=day)).invoiced_quantity = quantity
+
+    monthly = defaultdict(lambda: defaultdict(int))
+    for (product_id, day), row in daily.items():
+        for name in ('orders', 'quantity', 'revenue', 'invoiced_quantity'):
+            monthly[product_id, day.replace(day=1)][name] += getattr(row, name)
+    SalesDailyRollup.objects.bulk_create(daily.values(), batch_size=1000)
+    SalesMonthlyRollup.objects.bulk_create([
+        SalesMonthlyRollup(product_id=product_id, month=month, **totals)
+        for (product_id, month), totals in monthly.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoiced_quantity', models.IntegerField(default=0)),
+                ('day', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='base_salesd_day_6ae8e2_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='unique_sales_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoiced_quantity', models.IntegerField(default=0)),
+                ('month', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='base_salesm_month_e4d257_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'month'), name='unique_sales_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:52
+
+from django.db import migrations
+
+
+def has_fts5(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+SEARCH_TABLES = {
+    'base_product_name_search': ('name',),
+    'base_product_search': ('name', 'sku', 'description'),
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Without FTS5, base.search falls back to icontains and needs no tables.
+    if not has_fts5(schema_editor):
+        return
+    for table, fields in SEARCH_TABLES.items():
+        columns = ', '.join(fields)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5("
+            f"{columns}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6')"
+        )
+        schema_editor.execute(f"INSERT INTO {table} (rowid, {columns}) SELECT id, {columns} FROM base_product")
+
+
+def drop_search_index(apps, schema_editor):
+    for table in SEARCH_TABLES:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
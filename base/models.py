@@ -1,5 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # -------------------------------
 # PRODUCT MASTER
@@ -11,6 +13,11 @@ class Product(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -23,6 +30,22 @@ class Stock(models.Model):
     quantity = models.PositiveIntegerField()
     reorder_level = models.PositiveIntegerField(default=10)
     location = models.CharField(max_length=100)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'location'], name='unique_stock_product_location'),
+        ]
+        indexes = [
+            models.Index(fields=['location']),
+            models.Index(fields=['quantity']),
+            # Holds only the rows at or below their reorder level, so the
+            # reorder dashboard never scans healthy stock.
+            models.Index(
+                fields=['location'],
+                condition=models.Q(quantity__lte=models.F('reorder_level')),
+                name='stock_reorder_idx',
+            ),
+        ]
+
 
     def needs_reorder(self):
         return self.quantity <= self.reorder_level
@@ -31,6 +54,82 @@ class Stock(models.Model):
         return f"{self.product.name} - {self.quantity}"
 
 
+# -------------------------------
+# STOCK MOVEMENT LEDGER
+# -------------------------------
+class StockMovement(models.Model):
+    """
+    Append-only record of every change to a Stock row. Rows are never
+    updated or deleted; `quantity` is the signed delta.
+    """
+    REASON_CHOICES = [
+        ('OPENING', 'Opening balance'),
+        ('GRN', 'Goods received'),
+        ('INVOICE', 'Sales invoice'),
+        ('TRANSFER', 'Stock transfer'),
+        ('ADJUSTMENT', 'Manual adjustment'),
+        ('ALLOCATION', 'Sales order allocation'),
+    ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="movements")
+    location = models.CharField(max_length=100)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    reference_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'location', 'created_at']),
+            models.Index(fields=['location', 'created_at']),
+            models.Index(fields=['reason', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.location}: {self.quantity:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """
+    Balance of one (product, location) after every movement up to and
+    including `last_movement_id`. Written periodically by `snapshot_stock`.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="snapshots")
+    location = models.CharField(max_length=100)
+    quantity = models.IntegerField()
+    last_movement_id = models.PositiveBigIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'location', 'taken_at']),
+            models.Index(fields=['last_movement_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.location}: {self.quantity} on {self.taken_at:%Y-%m-%d}"
+
+
+# -------------------------------
+# STOCK SUMMARY (PER PRODUCT)
+# -------------------------------
+class ProductStockSummary(models.Model):
+    """
+    Running totals of a product's Stock rows, kept up to date by
+    base.services so dashboards read one row instead of every location.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="stock_summary")
+    total_quantity = models.PositiveIntegerField(default=0)
+    location_count = models.PositiveIntegerField(default=0)
+    below_reorder_count = models.PositiveIntegerField(default=0)
+
+    @property
+    def needs_reorder(self):
+        return self.below_reorder_count > 0
+
+    def __str__(self):
+        return f"{self.product.name} - {self.total_quantity} in {self.location_count} locations"
+
+
 # -------------------------------
 # STOCK TRANSFER
 # -------------------------------
@@ -41,6 +140,14 @@ class StockTransfer(models.Model):
     quantity = models.PositiveIntegerField()
     transfer_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'transfer_date']),
+            models.Index(fields=['from_location']),
+            models.Index(fields=['to_location']),
+            models.Index(fields=['transfer_date']),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.quantity} from {self.from_location} to {self.to_location}"
 
@@ -56,6 +163,14 @@ class DropShipment(models.Model):
     address = models.TextField()
     shipped = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer_name']),
+            # Only unshipped rows are ever worked through; a partial index
+            # keeps the lookup bounded by the open backlog.
+            models.Index(fields=['id'], condition=models.Q(shipped=False), name='dropship_pending_idx'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} to {self.customer_name}"
 
@@ -76,6 +191,10 @@ class DemandForecast(models.Model):
     class Meta:
         unique_together = ('product', 'month')
         ordering = ['month']
+        indexes = [
+            models.Index(fields=['month']),
+            models.Index(fields=['predicted_demand']),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.month.strftime('%B %Y')} : {self.predicted_demand}"
@@ -97,6 +216,13 @@ class PurchaseOrder(models.Model):
     expected_date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expected_date']),
+            models.Index(fields=['supplier']),
+            models.Index(fields=['expected_date']),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.quantity} ({self.status})"
 
@@ -117,7 +243,9 @@ from datetime import date
 class SalesOrder(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
+        ('ALLOCATED', 'Allocated'),
         ('INVOICED', 'Invoiced'),
+        ('COMPLETED', 'Completed'),
         ('FAILED', 'Failed')
     ]
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sales_orders")
@@ -125,11 +253,36 @@ class SalesOrder(models.Model):
     customer_name = models.CharField(max_length=200)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     order_date = models.DateField(default=date.today)  # ✅ no auto_now_add
+    priority = models.PositiveSmallIntegerField(default=0)  # higher ships first
+    location = models.CharField(max_length=100, blank=True)  # preferred fulfilment location
+
+    # What the sales rollups count an order by (base.services.record_sales_order_change).
+    ROLLUP_FIELDS = ('product_id', 'order_date', 'quantity', 'status')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'order_date']),
+            models.Index(fields=['product', 'order_date']),
+            models.Index(fields=['customer_name']),
+            models.Index(fields=['order_date']),
+        ]
 
     def __str__(self):
         return f"SO - {self.product.name} ({self.quantity})"
 
 
+# SALES ORDER ALLOCATION
+class SalesOrderAllocation(models.Model):
+    """Stock reserved for a sales order at one location (see allocate_sales_orders)."""
+    sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name="allocations")
+    location = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField()
+    allocated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"SO #{self.sales_order_id} - {self.quantity} @ {self.location}"
+
+
 # GOODS RECEIVED NOTE
 class GoodsReceivedNote(models.Model):
     purchase_order = models.OneToOneField(PurchaseOrder, on_delete=models.CASCADE, related_name="grn")
@@ -138,6 +291,11 @@ class GoodsReceivedNote(models.Model):
     matched = models.BooleanField(default=False)      # ✅ GRN matched
     processed = models.BooleanField(default=False)    # ✅ Prevent double-processing
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['received_date']),
+        ]
+
     def __str__(self):
         return f"GRN - {self.purchase_order.product.name} ({self.received_quantity})"
 
@@ -149,5 +307,116 @@ class SalesInvoice(models.Model):
     quantity = models.PositiveIntegerField(default=0)
     processed = models.BooleanField(default=False)   # ✅ Prevent double-processing
 
+    ROLLUP_FIELDS = ('sales_order_id', 'quantity')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['invoice_date']),
+        ]
+
     def __str__(self):
         return f"Invoice - {self.sales_order.product.name} ({self.quantity})"
+
+
+# -------------------------------
+# SALES ROLLUPS
+# -------------------------------
+# Per product and order date (day / month): what SalesOrder aggregates to,
+# kept up to date by base.signals so sales reports never read the order
+# table. FAILED orders are left out; invoiced_quantity counts the invoices
+# of the period's orders.
+class SalesRollup(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoiced_quantity = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class SalesDailyRollup(SalesRollup):
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_sales_daily_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.quantity}"
+
+
+class SalesMonthlyRollup(SalesRollup):
+    month = models.DateField()  # first day of the month
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'month'], name='unique_sales_monthly_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} in {self.month:%Y-%m}: {self.quantity}"
+
+
+# -------------------------------
+# BACKGROUND JOBS
+# -------------------------------
+class Job(models.Model):
+    """Queued side effect of a saved row (see base.jobs); one per (kind, object_id)."""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    kind = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_job_kind_object'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} ({self.status})"
+
+
+# -------------------------------
+# IDEMPOTENCY KEYS
+# -------------------------------
+class IdempotencyKey(models.Model):
+    """Stored response of a create request, replayed for retries with the same key (see base.idempotency)."""
+    owner = models.PositiveBigIntegerField(default=0)  # user pk; 0 = anonymous
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'owner'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
@@ -0,0 +1,160 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# -------------------------------
+# CURSOR PAGINATION (DEFAULT)
+# -------------------------------
+class StandardCursorPagination(CursorPagination):
+    """
+    Keyset pagination: each page is a `WHERE key < cursor LIMIT n` on an
+    indexed column, so deep pages cost the same as the first one.
+
+    Views pick the key with `cursor_ordering`; the default is newest id first.
+    A key of several fields, e.g. ('-order_date', '-id'), must end in a
+    unique one. The cursor holds the values of all of them and a page
+    filters on the whole tuple, so rows tied on the leading field (every
+    order of one day) are paged by the next field, never skipped or
+    repeated. DRF's stock cursor keeps only the first field and walks ties
+    with an offset, which it caps at `offset_cutoff`.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering is None:
+            return super().get_ordering(request, queryset, view)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [key[1:] if key.startswith('-') else f'-{key}' for key in ordering]
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self._after(queryset.model, current_position, reverse))
+
+        # One extra row tells whether there is a following page.
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following_position, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _after(self, model, position, reverse):
+        """
+        Rows past `position` in page order: the first key field strictly
+        past it, or equal on the fields before and past it on the next one.
+        """
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            keys = []
+            for key, value in zip(self.ordering, values):
+                name = key.lstrip('-')
+                field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                descending = key.startswith('-') != reverse
+                keys.append((name, 'lt' if descending else 'gt', field.to_python(value)))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # The leading `first <= x` (or >=) lets the index range-scan.
+        first, op, value = keys[0]
+        condition = Q(**{f'{first}__{op}e': value})
+        past = Q()
+        for index, (name, op, value) in enumerate(keys):
+            past |= Q(**{n: v for n, _, v in keys[:index]}, **{f'{name}__{op}': value})
+        return condition & past
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for key in ordering:
+            name = key.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(str(value))
+        return json.dumps(values, separators=(',', ':'))
+
+
+# -------------------------------
+# STREAMED LIST RESPONSES (OPT-IN)
+# -------------------------------
+STREAM_VALUES = ('1', 'true', 'yes')
+
+
+def stream_requested(request):
+    """Whether the request asks for a streamed list (`?stream=true`)."""
+    return request.query_params.get('stream', '').lower() in STREAM_VALUES
+
+
+class StreamingListMixin:
+    """
+    `?stream=true` on a list endpoint writes the whole filtered queryset as
+    one JSON array, serialized chunk by chunk from `queryset.iterator()`,
+    instead of a cursor page. Memory stays bounded by `stream_chunk_size`.
+    """
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if not stream_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            self._stream_json(queryset), content_type='application/json'
+        )
+
+    def stream_representations(self, queryset):
+        # One serializer instance for the whole stream; building a new
+        # ListSerializer per chunk leaves reference cycles behind for the GC.
+        serializer = self.get_serializer()
+        for obj in queryset.iterator(chunk_size=self.stream_chunk_size):
+            yield serializer.to_representation(obj)
+
+    def _stream_json(self, queryset):
+        encoder = JSONEncoder()
+        chunk = []
+        separator = ''
+        yield '['
+        for item in self.stream_representations(queryset):
+            chunk.append(encoder.encode(item))
+            if len(chunk) >= self.stream_chunk_size:
+                yield separator + ','.join(chunk)
+                chunk = []
+                separator = ','
+        if chunk:
+            yield separator + ','.join(chunk)
+        yield ']'
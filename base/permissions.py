@@ -1,5 +1,32 @@
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+
+def role_cache_key(user_id):
+    return f'user:{user_id}:roles'
+
+
+def get_roles(request):
+    """
+    Group names of the requesting user, from a per-user cache that
+    base.signals clears whenever group membership changes. Not from JWT
+    claims: a refreshed access token carries the claims of the refresh
+    token, so revoked roles would outlive the change.
+    """
+    user = request.user
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    key = role_cache_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, roles, ROLE_CACHE_TIMEOUT)
+    return roles
+
+
 class IsAdmin(BasePermission):
     """
     Full access if user is superuser or staff.
@@ -15,7 +42,7 @@ class IsInventoryManager(BasePermission):
     def has_permission(self, request, view):
         if request.user.is_staff:
             return True  # Admin gets full access
-        return request.user.groups.filter(name='InventoryManager').exists()
+        return 'InventoryManager' in get_roles(request)
 
 
 class IsSales(BasePermission):
@@ -25,7 +52,7 @@ class IsSales(BasePermission):
     def has_permission(self, request, view):
         if request.user.is_staff:
             return True  # Admin gets full access
-        return request.user.groups.filter(name='Sales').exists()
+        return 'Sales' in get_roles(request)
 
 
 class ReadOnly(BasePermission):
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from .models import DemandForecast, DropShipment, Product, PurchaseOrder, Stock, StockTransfer
+
+# ---------------------------------
+# DEFAULT GROUPS & PERMISSIONS
+# ---------------------------------
+# Admin gets every permission, Viewer every view_* permission; the others
+# get all permissions on their models.
+GROUP_MODELS = {
+    "InventoryManager": [Product, Stock, PurchaseOrder, DemandForecast],
+    "Logistics": [StockTransfer, DropShipment],
+}
+DEFAULT_GROUPS = ["Admin", "InventoryManager", "Logistics", "Viewer"]
+
+
+def desired_group_permissions():
+    """
+    {group name: set of permission ids}, computed from one Permission query.
+    """
+    content_types = ContentType.objects.get_for_models(
+        *[model for models in GROUP_MODELS.values() for model in models]
+    )
+    permissions = list(Permission.objects.values_list('id', 'codename', 'content_type_id'))
+
+    desired = {
+        "Admin": {pk for pk, _, _ in permissions},
+        "Viewer": {pk for pk, codename, _ in permissions if codename.startswith("view_")},
+    }
+    for name, models in GROUP_MODELS.items():
+        type_ids = {content_types[model].pk for model in models}
+        desired[name] = {pk for pk, _, type_id in permissions if type_id in type_ids}
+    return desired
+
+
+def sync_default_groups(dry_run=False):
+    """
+    Bring the default groups in line with `desired_group_permissions()`,
+    inserting and deleting only the rows that differ. Returns
+    {group name: (added permission ids, removed permission ids)} for the
+    groups that changed (or would change, with dry_run).
+    """
+    desired = desired_group_permissions()
+    GroupPermission = Group.permissions.through
+
+    with transaction.atomic():
+        groups = dict(Group.objects.filter(name__in=DEFAULT_GROUPS).values_list('name', 'id'))
+        missing = [name for name in DEFAULT_GROUPS if name not in groups]
+        if missing and not dry_run:
+            Group.objects.bulk_create([Group(name=name) for name in missing])
+            groups = dict(Group.objects.filter(name__in=DEFAULT_GROUPS).values_list('name', 'id'))
+
+        current = {name: set() for name in DEFAULT_GROUPS}
+        names_by_id = {pk: name for name, pk in groups.items()}
+        for group_id, permission_id in GroupPermission.objects.filter(
+            group_id__in=groups.values()
+        ).values_list('group_id', 'permission_id'):
+            current[names_by_id[group_id]].add(permission_id)
+
+        diff = {}
+        for name in DEFAULT_GROUPS:
+            added = desired[name] - current[name]
+            removed = current[name] - desired[name]
+            if added or removed or name in missing:
+                diff[name] = (added, removed)
+
+        if not dry_run:
+            GroupPermission.objects.bulk_create([
+                GroupPermission(group_id=groups[name], permission_id=permission_id)
+                for name, (added, _) in diff.items()
+                for permission_id in added
+            ])
+            for name, (_, removed) in diff.items():
+                if removed:
+                    GroupPermission.objects.filter(
+                        group_id=groups[name], permission_id__in=removed
+                    ).delete()
+    return diff
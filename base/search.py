@@ -0,0 +1,206 @@
+import functools
+import re
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Product
+
+# ---------------------------------
+# PRODUCT SEARCH INDEX
+# ---------------------------------
+# On SQLite with FTS5, migration 0014 creates two FTS5 tables keyed by
+# rowid = product id, both with prefix indexes for 2 to 6 characters:
+# `base_product_search` over name, sku and description, and
+# `base_product_name_search` over the name alone. The Product save/delete
+# signals and the bulk import keep them in step; `manage.py
+# rebuild_product_search` refills them after writes that skip those
+# (queryset.update(), raw SQL).
+#
+# Words match whole, except the last one, which matches as a prefix (the
+# one still being typed). A search for `q` returns, best first:
+#   1. SKU prefix matches, from a range scan of the unique sku index (as
+#      typed and upper-cased), an exact SKU first;
+#   2. products with every word in the name, from the name-only table;
+#   3. products with every word somewhere in name, sku or description;
+# shortest name first within 2 and 3, among the first SEARCH_CANDIDATES
+# matches of each.
+#
+# Every full-text query is a MATCH with a LIMIT, which FTS5 answers
+# lazily from the terms' index entries, so it doesn't slow down as more
+# products match. Hence:
+# - no bm25(): it counts every matching row to weight the terms;
+# - a separate name table rather than a `name : (...)` column filter,
+#   which reads every product that has all the words in any column to
+#   find the few that have them in the name;
+# - a last word longer than the longest indexed prefix would make FTS5
+#   merge the entries of every term it prefixes, so it matches as a
+#   whole word first and then on its first MAX_INDEXED_PREFIX characters.
+#
+# Other backends (or SQLite built without FTS5) match each word with
+# icontains on the three fields and rank by where it matched; that is a
+# table scan, not an index lookup.
+
+# FTS5 table -> the Product fields it indexes, best-ranked table first.
+SEARCH_TABLES = {
+    'base_product_name_search': ('name',),
+    'base_product_search': ('name', 'sku', 'description'),
+}
+SEARCH_FIELDS = ('name', 'sku', 'description')
+MAX_INDEXED_PREFIX = 6  # prefix = '2 3 4 5 6' in migration 0014
+SEARCH_CANDIDATES = 100
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_QUERY_WORDS = 8
+REINDEX_CHUNK_SIZE = 10000
+
+# What FTS5's unicode61 tokenizer treats as a token: letters and digits.
+WORD_RE = re.compile(r'[^\W_]+')
+# Sorts after any other character, so [prefix, prefix + SKU_RANGE_END)
+# covers every string starting with prefix.
+SKU_RANGE_END = '\U0010ffff'
+
+
+@functools.cache
+def _sqlite_has_fts5():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def search_index_enabled():
+    return connection.vendor == 'sqlite' and _sqlite_has_fts5()
+
+
+def reindex_products(queryset):
+    """Write the index rows of the products in `queryset`, replacing any old ones."""
+    if not search_index_enabled():
+        return
+    rows = list(queryset.values('pk', *SEARCH_FIELDS))
+    with connection.cursor() as cursor:
+        for table, fields in SEARCH_TABLES.items():
+            cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(row['pk'],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, {', '.join(fields)}) VALUES ({', '.join(['%s'] * (1 + len(fields)))})",
+                [(row['pk'], *(row[field] for field in fields)) for row in rows],
+            )
+
+
+def unindex_products(product_ids):
+    if not search_index_enabled():
+        return
+    with connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+
+def rebuild_product_search(chunk_size=REINDEX_CHUNK_SIZE):
+    """
+    Refill the index tables from the product table, a pk range at a time,
+    in one transaction. Returns the number of products indexed (0 without
+    FTS5).
+    """
+    if not search_index_enabled():
+        return 0
+    quote = connection.ops.quote_name
+    product_table = quote(Product._meta.db_table)
+    pk = quote(Product._meta.pk.column)
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        last = 0
+        while True:
+            cursor.execute(
+                f"SELECT MAX({pk}) FROM (SELECT {pk} FROM {product_table} WHERE {pk} > %s ORDER BY {pk} LIMIT %s)",
+                [last, chunk_size],
+            )
+            upto = cursor.fetchone()[0]
+            if upto is None:
+                break
+            for table, fields in SEARCH_TABLES.items():
+                columns = ', '.join(quote(Product._meta.get_field(field).column) for field in fields)
+                cursor.execute(
+                    f"INSERT INTO {table} (rowid, {', '.join(fields)}) "
+                    f"SELECT {pk}, {columns} FROM {product_table} WHERE {pk} > %s AND {pk} <= %s",
+                    [last, upto],
+                )
+            total += cursor.rowcount
+            last = upto
+        # Merge the per-chunk segments so queries read one b-tree per term.
+        for table in SEARCH_TABLES:
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+    return total
+
+
+def search_products(query, limit=SEARCH_LIMIT):
+    """Products matching `query`, best match first, at most `limit`."""
+    words = WORD_RE.findall(query)[:MAX_QUERY_WORDS]
+    query = query.strip()
+    if not words:
+        return []
+    if search_index_enabled():
+        ids = _sku_prefix_matches(query, limit)
+        if len(ids) < limit:
+            ids += [pk for pk in _full_text_matches(words, limit + len(ids)) if pk not in ids][:limit - len(ids)]
+    else:
+        ids = _search_fallback(query, words, limit)
+    products = Product.objects.in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+def _sku_prefix_matches(query, limit):
+    if any(char.isspace() for char in query):
+        return []
+    matches = set()
+    for prefix in {query, query.upper()}:
+        matches.update(
+            Product.objects.filter(sku__gte=prefix, sku__lt=prefix + SKU_RANGE_END)
+            .order_by('sku').values_list('sku', 'pk')[:limit]
+        )
+    exact = {query, query.upper()}
+    return [pk for sku, pk in sorted(matches, key=lambda match: (match[0] not in exact, match[0]))][:limit]
+
+
+def _match_expressions(words):
+    # Words are letters and digits only, so quoting them is enough.
+    *whole, last = (f'"{word}"' for word in words)
+    if len(words[-1]) == 1:
+        return [' '.join([*whole, last])]  # a one-letter prefix matches too much to be useful
+    if len(words[-1]) <= MAX_INDEXED_PREFIX:
+        return [' '.join([*whole, f'{last}*'])]
+    return [' '.join([*whole, last]), ' '.join([*whole, f'"{words[-1][:MAX_INDEXED_PREFIX]}"*'])]
+
+
+def _full_text_matches(words, limit):
+    found = {}
+    with connection.cursor() as cursor:
+        for expression in _match_expressions(words):
+            for table in SEARCH_TABLES:
+                cursor.execute(
+                    f"SELECT rowid, length(name) FROM {table} WHERE {table} MATCH %s LIMIT %s",
+                    [expression, max(limit, SEARCH_CANDIDATES)],
+                )
+                for pk, _ in sorted(cursor.fetchall(), key=lambda row: (row[1], row[0])):
+                    found.setdefault(pk, None)
+                if len(found) >= limit:
+                    return list(found)[:limit]
+    return list(found)
+
+
+def _search_fallback(query, words, limit):
+    match = Q()
+    for word in words:
+        match &= Q(name__icontains=word) | Q(sku__icontains=word) | Q(description__icontains=word)
+    rank = Case(
+        When(sku__iexact=query, then=Value(0)),
+        When(sku__istartswith=query, then=Value(1)),
+        When(name__istartswith=words[0], then=Value(2)),
+        When(name__icontains=words[0], then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    )
+    return list(
+        Product.objects.filter(match).annotate(search_rank=rank)
+        .order_by('search_rank', 'name', 'pk').values_list('pk', flat=True)[:limit]
+    )
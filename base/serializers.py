@@ -1,9 +1,14 @@
 # base/serializers.py
+import datetime
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import GoodsReceivedNote, Product, SalesInvoice, SalesOrder, Stock, StockTransfer, PurchaseOrder, DropShipment, DemandForecast
+from .forecasting import METHOD_PARAMS, METHODS
+from .search import MAX_SEARCH_LIMIT, SEARCH_LIMIT
+from .services import ALLOCATION_POLICIES, MAX_REPORT_DAYS
+from .models import GoodsReceivedNote, Job, Product, ProductStockSummary, SalesInvoice, SalesOrder, Stock, StockMovement, StockTransfer, PurchaseOrder, DropShipment, DemandForecast
 
 # -------------------------------
 # PRODUCT SERIALIZER
@@ -14,6 +19,11 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'sku', 'description', 'unit_price', 'created_at']
 
 
+class ProductSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_SEARCH_LIMIT, default=SEARCH_LIMIT)
+
+
 # -------------------------------
 # STOCK SERIALIZER
 # -------------------------------
@@ -23,6 +33,32 @@ class StockSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'quantity', 'reorder_level', 'location']
 
 
+# -------------------------------
+# STOCK MOVEMENT SERIALIZERS
+# -------------------------------
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'product', 'location', 'quantity', 'reason', 'reference_id', 'created_at']
+
+
+class StockBalanceQuerySerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    location = serializers.CharField()
+    at = serializers.DateTimeField()
+
+
+# -------------------------------
+# STOCK SUMMARY SERIALIZER
+# -------------------------------
+class ProductStockSummarySerializer(serializers.ModelSerializer):
+    needs_reorder = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = ProductStockSummary
+        fields = ['product', 'total_quantity', 'location_count', 'below_reorder_count', 'needs_reorder']
+
+
 # -------------------------------
 # STOCK TRANSFER SERIALIZER
 # -------------------------------
@@ -32,6 +68,27 @@ class StockTransferSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'from_location', 'to_location', 'quantity', 'transfer_date']
 
 
+class StockTransferItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class StockTransferBatchSerializer(serializers.Serializer):
+    from_location = serializers.CharField(max_length=100)
+    to_location = serializers.CharField(max_length=100)
+    items = StockTransferItemSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        if attrs['from_location'] == attrs['to_location']:
+            raise serializers.ValidationError("Transfer source and destination must differ.")
+        product_ids = {item['product'] for item in attrs['items']}
+        known = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        unknown = sorted(product_ids - known)
+        if unknown:
+            raise serializers.ValidationError({'items': f"Unknown products: {unknown}"})
+        return attrs
+
+
 # -------------------------------
 # PURCHASE ORDER SERIALIZER
 # -------------------------------
@@ -67,6 +124,26 @@ class DemandForecastSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'month', 'predicted_demand']
 
 
+class ForecastRunSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=sorted(METHODS), default='exponential_smoothing')
+    history = serializers.IntegerField(min_value=1, max_value=120, default=24)
+    horizon = serializers.IntegerField(min_value=1, max_value=24, default=3)
+    window = serializers.IntegerField(min_value=1, required=False)
+    alpha = serializers.FloatField(min_value=0.01, max_value=1, required=False)
+    season = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        method = attrs['method']
+        errors = {
+            name: f"Not a parameter of {method}."
+            for name in ('window', 'alpha', 'season')
+            if name in attrs and name not in METHOD_PARAMS[method]
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
 # -------------------------------
 # USER REGISTER SERIALIZER
 # -------------------------------
@@ -103,20 +180,113 @@ class LoginSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
         token['username'] = user.username
-        token['role'] = user.groups.first().name if user.groups.exists() else None
+        token['role'] = user.groups.order_by('pk').values_list('name', flat=True).first()
         return token
 
 class GoodsReceivedNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = GoodsReceivedNote
-        fields = ['id', 'purchase_order', 'received_quantity', 'received_date']
+        fields = ['id', 'purchase_order', 'received_quantity', 'received_date', 'matched']
+
+
+class GoodsReceivedNoteBulkListSerializer(serializers.ListSerializer):
+    """
+    Validates the whole batch with two queries instead of two per row.
+    """
+
+    def validate(self, attrs):
+        po_ids = [row['purchase_order'] for row in attrs]
+        known = set(PurchaseOrder.objects.filter(pk__in=po_ids).values_list('pk', flat=True))
+        taken = set(
+            GoodsReceivedNote.objects.filter(purchase_order_id__in=po_ids)
+            .values_list('purchase_order_id', flat=True)
+        )
+
+        errors = {}
+        seen = set()
+        for index, po_id in enumerate(po_ids):
+            if po_id not in known:
+                errors[index] = f"Purchase order {po_id} does not exist."
+            elif po_id in taken:
+                errors[index] = f"Purchase order {po_id} already has a GRN."
+            elif po_id in seen:
+                errors[index] = f"Purchase order {po_id} appears more than once in the batch."
+            seen.add(po_id)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class GoodsReceivedNoteBulkSerializer(serializers.Serializer):
+    purchase_order = serializers.IntegerField()
+    received_quantity = serializers.IntegerField(min_value=0)
+    matched = serializers.BooleanField(default=False)
+
+    class Meta:
+        list_serializer_class = GoodsReceivedNoteBulkListSerializer
 
 class SalesOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesOrder
-        fields = ['id', 'product', 'quantity', 'customer_name', 'status', 'order_date']
+        fields = ['id', 'product', 'quantity', 'customer_name', 'status', 'order_date', 'priority', 'location']
+
+
+class AllocationRunSerializer(serializers.Serializer):
+    policy = serializers.ChoiceField(choices=ALLOCATION_POLICIES, default='fifo')
+    allow_split = serializers.BooleanField(default=True)
+    dry_run = serializers.BooleanField(default=False)
 
 class SalesInvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesInvoice
         fields = ['id', 'sales_order', 'quantity', 'invoice_date']
+
+
+# -------------------------------
+# BACKGROUND JOB SERIALIZER
+# -------------------------------
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'object_id', 'status', 'attempts', 'error', 'created_at', 'finished_at']
+
+
+# -------------------------------
+# SALES REPORT SERIALIZERS
+# -------------------------------
+class SalesReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(choices=['day', 'month'], default='day')
+    product = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        attrs.setdefault('end', datetime.date.today())
+        attrs.setdefault('start', attrs['end'] - datetime.timedelta(days=29))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': "Must not be after end."})
+        if attrs['granularity'] == 'day' and (attrs['end'] - attrs['start']).days >= MAX_REPORT_DAYS:
+            raise serializers.ValidationError(
+                {'granularity': f"Daily reports cover at most {MAX_REPORT_DAYS} days; use granularity=month."}
+            )
+        return attrs
+
+
+class SalesRollupTotalsSerializer(serializers.Serializer):
+    orders = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=16, decimal_places=2)
+    invoiced_quantity = serializers.IntegerField()
+
+
+class SalesRollupPeriodSerializer(SalesRollupTotalsSerializer):
+    period = serializers.DateField()
+
+
+class SalesReportSerializer(serializers.Serializer):
+    granularity = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    product = serializers.IntegerField(allow_null=True)
+    totals = SalesRollupTotalsSerializer()
+    series = SalesRollupPeriodSerializer(many=True)
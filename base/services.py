@@ -0,0 +1,860 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import acache_version, cache_version, invalidate_cache_namespace
+from .models import (
+    GoodsReceivedNote,
+    Product,
+    ProductStockSummary,
+    PurchaseOrder,
+    SalesDailyRollup,
+    SalesInvoice,
+    SalesMonthlyRollup,
+    SalesOrder,
+    SalesOrderAllocation,
+    Stock,
+    StockMovement,
+    StockSnapshot,
+    StockTransfer,
+)
+
+# -----------------------------
+# CONFIGURABLE MAIN WAREHOUSE
+# -----------------------------
+DEFAULT_WAREHOUSE = getattr(settings, "DEFAULT_WAREHOUSE", "Main Warehouse")
+
+# {location: {other_location: distance}} used by the 'nearest' allocation
+# policy; unknown pairs rank after every known one.
+LOCATION_DISTANCES = getattr(settings, "LOCATION_DISTANCES", {})
+
+# Seconds a cached reorder report may be served; changes invalidate it sooner.
+REORDER_CACHE_TIMEOUT = getattr(settings, "REORDER_CACHE_TIMEOUT", 300)
+REORDER_CACHE_NAMESPACE = 'stock:reorder'
+
+
+# ---------------------------------
+# STOCK MUTATION SERVICE
+# ---------------------------------
+# Every change to Stock.quantity goes through these helpers. Each one is a
+# single conditional UPDATE, so concurrent callers never read-modify-write
+# and can never drive a quantity below zero.
+
+def add_stock(product_id, location, quantity, reason='ADJUSTMENT', reference_id=None):
+    """
+    Add `quantity` units at `location`, creating the Stock row if missing.
+    """
+    with transaction.atomic():
+        if _shift_stock(product_id, location, quantity, reason, reference_id):
+            return True
+
+        try:
+            with transaction.atomic():
+                # Created empty so the quantity itself is posted (and logged)
+                # by the UPDATE below like any other movement.
+                Stock.objects.create(product_id=product_id, location=location, quantity=0)
+        except IntegrityError:
+            pass  # Another writer created the row first.
+        _shift_stock(product_id, location, quantity, reason, reference_id)
+    return True
+
+
+def remove_stock(product_id, location, quantity, reason='ADJUSTMENT', reference_id=None):
+    """
+    Take `quantity` units from `location` only if enough are on hand.
+    Returns False (and changes nothing) when the row is missing or short.
+    """
+    with transaction.atomic():
+        return _shift_stock(
+            product_id, location, -quantity, reason, reference_id, quantity__gte=quantity
+        )
+
+
+def _shift_stock(product_id, location, delta, reason, reference_id, **conditions):
+    rows = Stock.objects.filter(product_id=product_id, location=location)
+    if not rows.filter(**conditions).update(quantity=F('quantity') + delta):
+        return False
+
+    # The row is write-locked now, so reading it back is race-free; it tells
+    # us whether this change crossed the reorder level.
+    quantity, reorder_level = rows.values_list('quantity', 'reorder_level').get()
+    was_below = quantity - delta <= reorder_level
+    is_below = quantity <= reorder_level
+    _bump_stock_summary(product_id, quantity=delta, below_reorder=int(is_below) - int(was_below))
+    if was_below or is_below:
+        invalidate_reorder_report()
+    StockMovement.objects.create(
+        product_id=product_id, location=location, quantity=delta,
+        reason=reason, reference_id=reference_id,
+    )
+    return True
+
+
+def take_write_lock():
+    """
+    Call first inside transaction.atomic() when the transaction reads before
+    it writes. On SQLite it starts as a reader, and upgrading to the write
+    lock later fails at once ("database is locked") if another connection
+    is writing; any UPDATE, even one matching no rows, takes the write lock
+    up front instead (waiting up to the busy timeout). Other backends lock
+    rows as they go.
+    """
+    if connection.vendor == 'sqlite':
+        Stock.objects.filter(pk__lt=0).update(quantity=0)
+
+
+# ---------------------------------
+# PER-PRODUCT STOCK SUMMARY
+# ---------------------------------
+def _bump_stock_summary(product_id, quantity=0, below_reorder=0):
+    updated = ProductStockSummary.objects.filter(product_id=product_id).update(
+        total_quantity=F('total_quantity') + quantity,
+        below_reorder_count=F('below_reorder_count') + below_reorder,
+    )
+    if not updated:
+        refresh_stock_summary([product_id])
+
+
+def refresh_stock_summary(product_ids):
+    """
+    Recompute the summary rows of the given products from their Stock rows
+    (one grouped query, one upsert). Used for bulk writes and manual edits.
+    """
+    product_ids = set(product_ids)
+    summaries = {pid: ProductStockSummary(product_id=pid) for pid in product_ids}
+    totals = (
+        Stock.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(
+            total=Sum('quantity'),
+            locations=Count('id'),
+            below=Count('id', filter=Q(quantity__lte=F('reorder_level'))),
+        )
+    )
+    for row in totals:
+        summary = summaries[row['product_id']]
+        summary.total_quantity = row['total']
+        summary.location_count = row['locations']
+        summary.below_reorder_count = row['below']
+
+    ProductStockSummary.objects.bulk_create(
+        summaries.values(),
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['total_quantity', 'location_count', 'below_reorder_count'],
+    )
+
+
+# ---------------------------------
+# GRN / INVOICE STOCK POSTING
+# ---------------------------------
+# Set-based: a whole batch of GRNs or invoices is posted with a handful of
+# statements (base.jobs runs them in batches; the GRN bulk endpoint posts
+# its own). Rows already posted are skipped, so posting twice is harmless.
+# Call inside transaction.atomic(), after take_write_lock() on SQLite.
+
+def post_goods_received(grn_ids, location=DEFAULT_WAREHOUSE):
+    """
+    Add matched, unposted GRNs to stock at `location` and complete their
+    purchase orders. Returns the ids of the GRNs posted.
+    """
+    grns = {
+        po_id: (pk, quantity)
+        for po_id, pk, quantity in GoodsReceivedNote.objects.filter(
+            pk__in=grn_ids, matched=True, processed=False
+        ).values_list('purchase_order_id', 'pk', 'received_quantity')
+    }
+    open_pos = dict(
+        PurchaseOrder.objects.select_for_update()
+        .filter(pk__in=grns)
+        .exclude(status='COMPLETED')
+        .values_list('pk', 'product_id')
+    )
+    if not open_pos:
+        return []
+
+    received = defaultdict(int)
+    for po_id, product_id in open_pos.items():
+        received[product_id] += grns[po_id][1]
+
+    touched = list(received)
+    stocks = list(Stock.objects.filter(product_id__in=received, location=location))
+    for stock in stocks:
+        stock.quantity = F('quantity') + received.pop(stock.product_id, 0)
+    Stock.objects.bulk_update(stocks, ['quantity'])
+    Stock.objects.bulk_create([
+        Stock(product_id=product_id, location=location, quantity=quantity)
+        for product_id, quantity in received.items()
+    ])
+    refresh_stock_summary(touched)
+    invalidate_reorder_report()
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=product_id, location=location, quantity=grns[po_id][1],
+            reason='GRN', reference_id=grns[po_id][0],
+        )
+        for po_id, product_id in open_pos.items()
+    ])
+
+    PurchaseOrder.objects.filter(pk__in=open_pos).update(status='COMPLETED')
+    posted = [grns[po_id][0] for po_id in open_pos]
+    GoodsReceivedNote.objects.filter(pk__in=posted).update(processed=True)
+    return posted
+
+
+def post_sales_invoices(invoice_ids, location=DEFAULT_WAREHOUSE):
+    """
+    Take each unposted invoice's order quantity from stock at `location`
+    (nothing for orders already ALLOCATED) and complete the order. Invoices
+    are served oldest first; one that can't be covered is left unposted.
+    Returns {invoice_id: error} for those.
+    """
+    invoices = list(
+        SalesInvoice.objects.filter(pk__in=invoice_ids, processed=False).order_by('pk').values_list(
+            'pk', 'sales_order_id', 'sales_order__status',
+            'sales_order__product_id', 'sales_order__product__name', 'sales_order__quantity',
+        )
+    )
+    stock_rows = Stock.objects.filter(
+        product_id__in={invoice[3] for invoice in invoices}, location=location
+    ).order_by('product_id')
+    if connection.features.has_select_for_update:
+        stock_rows = stock_rows.select_for_update()
+    on_hand = {product_id: [pk, quantity] for pk, product_id, quantity in stock_rows.values_list('pk', 'product_id', 'quantity')}
+
+    posted, completed, errors = [], [], {}
+    taken = defaultdict(int)  # stock pk -> units
+    movements = []
+    for invoice_id, order_id, status, product_id, name, quantity in invoices:
+        if status != 'ALLOCATED':  # allocated orders already hold their stock
+            stock = on_hand.get(product_id)
+            if stock is None:
+                errors[invoice_id] = f"No stock found for product {name} in {location}"
+                continue
+            if stock[1] < quantity:
+                errors[invoice_id] = f"Insufficient stock for product {name}"
+                continue
+            stock[1] -= quantity
+            taken[stock[0]] += quantity
+            movements.append(StockMovement(
+                product_id=product_id, location=location, quantity=-quantity,
+                reason='INVOICE', reference_id=invoice_id,
+            ))
+        posted.append(invoice_id)
+        completed.append(order_id)
+
+    if taken:
+        # Deltas: the CHECK on Stock.quantity stays the backstop.
+        Stock.objects.bulk_update(
+            [Stock(pk=pk, quantity=F('quantity') - quantity) for pk, quantity in taken.items()], ['quantity']
+        )
+        StockMovement.objects.bulk_create(movements)
+        refresh_stock_summary({movement.product_id for movement in movements})
+        invalidate_reorder_report()
+    if posted:
+        SalesInvoice.objects.filter(pk__in=posted).update(processed=True)
+        SalesOrder.objects.filter(pk__in=completed).update(status='COMPLETED')
+    return errors
+
+
+# ---------------------------------
+# BULK GRN POSTING
+# ---------------------------------
+def receive_goods_bulk(rows, location=DEFAULT_WAREHOUSE):
+    """
+    Insert a validated batch of GRNs and post the matched ones to stock
+    with set-based statements, all in one transaction.
+
+    `rows` are dicts with purchase_order (id), received_quantity and matched.
+    Returns the created GoodsReceivedNote objects.
+    """
+    with transaction.atomic():
+        grns = GoodsReceivedNote.objects.bulk_create([
+            GoodsReceivedNote(
+                purchase_order_id=row['purchase_order'],
+                received_quantity=row['received_quantity'],
+                matched=row.get('matched', False),
+            )
+            for row in rows
+        ])
+        posted = set(post_goods_received([grn.pk for grn in grns if grn.matched], location))
+        for grn in grns:
+            grn.processed = grn.pk in posted
+    return grns
+
+
+# ---------------------------------
+# STOCK TRANSFERS
+# ---------------------------------
+def execute_transfers(from_location, to_location, items):
+    """
+    Debit `from_location` and credit `to_location` for every
+    (product_id, quantity, transfer_id) in `items`, in one transaction.
+    Raises ValueError, moving nothing, if any product is short at the source.
+
+    Rows are locked and updated in one global order, (product_id, location),
+    so two transfers running in opposite directions can't deadlock.
+    """
+    if from_location == to_location:
+        raise ValueError("Transfer source and destination must differ")
+
+    moves = []
+    for product_id, quantity, transfer_id in items:
+        moves.append((product_id, from_location, -quantity, transfer_id))
+        moves.append((product_id, to_location, quantity, transfer_id))
+    moves.sort(key=lambda move: (move[0], move[1]))
+
+    with transaction.atomic():
+        _lock_stock_rows({(product_id, location) for product_id, location, _, _ in moves})
+        for product_id, location, delta, transfer_id in moves:
+            if delta > 0:
+                add_stock(product_id, location, delta, 'TRANSFER', transfer_id)
+            elif not _shift_stock(product_id, location, delta, 'TRANSFER', transfer_id, quantity__gte=-delta):
+                raise ValueError(f"Insufficient stock for product {product_id} in {location}")
+
+
+def transfer_stock_batch(from_location, to_location, items):
+    """
+    Record and execute one StockTransfer per (product_id, quantity) in a
+    single transaction. Returns the created transfers.
+    """
+    with transaction.atomic():
+        transfers = StockTransfer.objects.bulk_create([
+            StockTransfer(
+                product_id=product_id, from_location=from_location,
+                to_location=to_location, quantity=quantity,
+            )
+            for product_id, quantity in items
+        ])
+        execute_transfers(
+            from_location, to_location,
+            [(t.product_id, t.quantity, t.pk) for t in transfers],
+        )
+    return transfers
+
+
+def _lock_stock_rows(keys):
+    if not connection.features.has_select_for_update:
+        # SQLite: the first UPDATE takes the database write lock; a SELECT
+        # first would only take a shared lock that can't be upgraded safely.
+        return
+    match = Q()
+    for product_id, location in keys:
+        match |= Q(product_id=product_id, location=location)
+    list(
+        Stock.objects.select_for_update().filter(match)
+        .order_by('product_id', 'location').values_list('pk', flat=True)
+    )
+
+
+# ---------------------------------
+# BATCH SALES ORDER ALLOCATION
+# ---------------------------------
+# All pending orders and the Stock rows of their products are read once;
+# allocation runs in memory and the result is written back with a handful
+# of bulk statements, whatever the number of orders.
+# The stock stays reserved until the order is invoiced; release_allocations
+# gives it back when an allocated order is deleted, failed or changed
+# (base.signals).
+
+ALLOCATION_POLICIES = ('fifo', 'priority', 'nearest')
+MAX_REPORTED_SHORTFALLS = 1000
+
+_ALLOCATION_ORDERING = {
+    'fifo': ('order_date', 'pk'),
+    'priority': ('-priority', 'order_date', 'pk'),
+    'nearest': ('order_date', 'pk'),
+}
+
+
+def allocate_sales_orders(policy='fifo', allow_split=True, dry_run=False):
+    """
+    Reserve stock for every PENDING sales order and mark the ones that are
+    fully covered ALLOCATED; the rest stay PENDING and are reported as
+    shortfalls. Orders are served by `policy`:
+
+    - fifo: oldest order_date first, from DEFAULT_WAREHOUSE first;
+    - priority: highest SalesOrder.priority first, then oldest;
+    - nearest: oldest first, each from its own location, then the closest
+      ones according to settings.LOCATION_DISTANCES.
+
+    With allow_split=False an order is only taken from a single location.
+    dry_run computes the report without writing anything.
+    """
+    if policy not in ALLOCATION_POLICIES:
+        raise ValueError(f"Unknown allocation policy {policy!r}; expected one of {', '.join(ALLOCATION_POLICIES)}")
+
+    with transaction.atomic():
+        pending = SalesOrder.objects.filter(status='PENDING')
+        stock_rows = Stock.objects.filter(product__in=pending.values('product'), quantity__gt=0)
+        if connection.features.has_select_for_update:
+            pending = pending.select_for_update()
+            stock_rows = stock_rows.select_for_update().order_by('product_id', 'location')
+        elif not dry_run:
+            take_write_lock()
+
+        orders = list(
+            pending.order_by(*_ALLOCATION_ORDERING[policy])
+            .values_list('pk', 'product_id', 'quantity', 'location')
+        )
+        available = defaultdict(dict)  # product_id -> {location: [stock_pk, quantity]}
+        for pk, product_id, location, quantity in stock_rows.values_list('pk', 'product_id', 'location', 'quantity'):
+            available[product_id][location] = [pk, quantity]
+
+        allocations, shortfalls = [], []
+        short_units = 0
+        for order_id, product_id, quantity, preferred in orders:
+            at = available.get(product_id, {})
+            picks = _pick_locations(at, quantity, policy, preferred, allow_split)
+            if picks is None:
+                short_units += quantity
+                if len(shortfalls) < MAX_REPORTED_SHORTFALLS:
+                    shortfalls.append({
+                        'sales_order': order_id,
+                        'product': product_id,
+                        'requested': quantity,
+                        'available': sum(row[1] for row in at.values()),
+                    })
+                continue
+            for location, taken in picks:
+                at[location][1] -= taken
+                allocations.append((order_id, product_id, location, taken))
+
+        allocated = len({allocation[0] for allocation in allocations})
+        report = {
+            'policy': policy,
+            'orders': len(orders),
+            'allocated': allocated,
+            'units': sum(allocation[3] for allocation in allocations),
+            'short': len(orders) - allocated,
+            'short_units': short_units,
+            'shortfalls': shortfalls,
+        }
+        if not dry_run and allocations:
+            _write_allocations(allocations, available)
+    return report
+
+
+def release_allocations(order_ids):
+    """
+    Give back the stock reserved for these orders: each allocation's units
+    go back to its location (with a reversing ALLOCATION movement) and the
+    allocation rows are deleted. Returns the number of units released.
+    """
+    with transaction.atomic():
+        rows = list(
+            SalesOrderAllocation.objects.filter(sales_order_id__in=order_ids)
+            .order_by('sales_order__product_id', 'location')  # lock order, as in execute_transfers
+            .values_list('pk', 'sales_order_id', 'sales_order__product_id', 'location', 'quantity')
+        )
+        for _, order_id, product_id, location, quantity in rows:
+            add_stock(product_id, location, quantity, 'ALLOCATION', order_id)
+        SalesOrderAllocation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return sum(row[4] for row in rows)
+
+
+def _pick_locations(at, quantity, policy, preferred, allow_split):
+    """[(location, units)] covering `quantity`, or None if it can't be covered."""
+    locations = sorted(
+        (location for location, (_, on_hand) in at.items() if on_hand > 0),
+        key=lambda location: _location_rank(location, at[location][1], policy, preferred),
+    )
+    if not allow_split:
+        for location in locations:
+            if at[location][1] >= quantity:
+                return [(location, quantity)]
+        return None
+
+    picks, remaining = [], quantity
+    for location in locations:
+        taken = min(remaining, at[location][1])
+        picks.append((location, taken))
+        remaining -= taken
+        if not remaining:
+            return picks
+    return None
+
+
+def _location_rank(location, on_hand, policy, preferred):
+    if policy == 'nearest' and preferred:
+        if location == preferred:
+            return (0, 0, -on_hand)
+        distance = LOCATION_DISTANCES.get(preferred, {}).get(location)
+        return (1, distance, -on_hand) if distance is not None else (2, 0, -on_hand)
+    # Main warehouse first, then the fullest locations (fewest splits).
+    return (location != DEFAULT_WAREHOUSE, 0, -on_hand)
+
+
+def _write_allocations(allocations, available):
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    taken = defaultdict(int)  # stock_pk -> units
+    for _, product_id, location, quantity in allocations:
+        taken[available[product_id][location][0]] += quantity
+    last_allocation = SalesOrderAllocation.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    # At 100k+ rows bulk_create()/bulk_update() spend most of their time
+    # building and preparing a model instance per row; plain executemany()
+    # skips that. Deltas, not the in-memory totals, are written, so the CHECK
+    # on Stock.quantity stays the backstop.
+    stock_table, stock_quantity, stock_pk = _sql_names(Stock, 'quantity', 'id')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {stock_table} SET {stock_quantity} = {stock_quantity} - %s WHERE {stock_pk} = %s",
+            [(quantity, pk) for pk, quantity in taken.items()],
+        )
+        _insert_rows(cursor, SalesOrderAllocation, ('sales_order', 'location', 'quantity', 'allocated_at'), [
+            (order_id, location, quantity, now) for order_id, _, location, quantity in allocations
+        ])
+        _insert_rows(cursor, StockMovement, ('product', 'location', 'quantity', 'reason', 'reference_id', 'created_at'), [
+            (product_id, location, -quantity, 'ALLOCATION', order_id, now)
+            for order_id, product_id, location, quantity in allocations
+        ])
+
+    # Flag the orders through a subquery over this run's allocation rows
+    # instead of an IN list of (possibly 100k) order ids.
+    this_run = SalesOrderAllocation.objects.filter(pk__gt=last_allocation).values('sales_order_id')
+    SalesOrder.objects.filter(status='PENDING', pk__in=this_run).update(status='ALLOCATED')
+
+    refresh_stock_summary({product_id for _, product_id, _, _ in allocations})
+    invalidate_reorder_report()
+
+
+def _sql_names(model, *field_names):
+    quote = connection.ops.quote_name
+    return (quote(model._meta.db_table), *(quote(model._meta.get_field(name).column) for name in field_names))
+
+
+def _insert_rows(cursor, model, field_names, rows):
+    table, *columns = _sql_names(model, *field_names)
+    placeholders = ', '.join(['%s'] * len(columns))
+    cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+# ---------------------------------
+# LEDGER SNAPSHOTS & POINT-IN-TIME BALANCES
+# ---------------------------------
+def take_stock_snapshot():
+    """
+    Snapshot every (product, location) that moved since the last run:
+    previous snapshot + movements since it. Keys that did not move keep
+    their older snapshot, which is still exact. Returns rows written.
+    """
+    with transaction.atomic():
+        since = StockSnapshot.objects.aggregate(last=Max('last_movement_id'))['last'] or 0
+        upto = StockMovement.objects.aggregate(last=Max('id'))['last'] or 0
+        if upto <= since:
+            return 0
+
+        previous = StockSnapshot.objects.filter(
+            product_id=OuterRef('product_id'), location=OuterRef('location')
+        ).order_by('-taken_at', '-id').values('quantity')[:1]
+        changes = (
+            StockMovement.objects.filter(id__gt=since, id__lte=upto)
+            .values('product_id', 'location')
+            .annotate(delta=Sum('quantity'), previous=Subquery(previous))
+        )
+        taken_at = timezone.now()
+        snapshots = StockSnapshot.objects.bulk_create([
+            StockSnapshot(
+                product_id=row['product_id'],
+                location=row['location'],
+                quantity=(row['previous'] or 0) + row['delta'],
+                last_movement_id=upto,
+                taken_at=taken_at,
+            )
+            for row in changes.iterator()
+        ], batch_size=1000)
+    return len(snapshots)
+
+
+def stock_balance_at(product_id, location, at):
+    """
+    Quantity on hand at `location` at time `at`: the nearest snapshot
+    taken at or before `at`, plus only the movements recorded after it.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(product_id=product_id, location=location, taken_at__lte=at)
+        .order_by('-taken_at', '-id')
+        .values_list('quantity', 'last_movement_id')
+        .first()
+    )
+    quantity, after_id = snapshot or (0, 0)
+    delta = StockMovement.objects.filter(
+        product_id=product_id, location=location, id__gt=after_id, created_at__lte=at
+    ).aggregate(total=Sum('quantity'))['total']
+    return quantity + (delta or 0)
+
+
+# ---------------------------------
+# REORDER DASHBOARD
+# ---------------------------------
+def reorder_report(location=None):
+    """
+    Stock rows at or below their reorder level, with product name, SKU and
+    the quantity already on open (PENDING) purchase orders - one query,
+    served from cache until Stock or PurchaseOrder changes.
+    """
+    key = _reorder_cache_key(cache_version(REORDER_CACHE_NAMESPACE), location)
+    report = cache.get(key)
+    if report is None:
+        report = list(_reorder_queryset(location))
+        cache.set(key, report, REORDER_CACHE_TIMEOUT)
+    return report
+
+
+async def areorder_report(location=None):
+    """
+    Async twin of reorder_report() for the ASGI read endpoints.
+    """
+    key = _reorder_cache_key(await acache_version(REORDER_CACHE_NAMESPACE), location)
+    report = await cache.aget(key)
+    if report is None:
+        report = [row async for row in _reorder_queryset(location)]
+        await cache.aset(key, report, REORDER_CACHE_TIMEOUT)
+    return report
+
+
+def _reorder_cache_key(version, location):
+    return f'{REORDER_CACHE_NAMESPACE}:{version}:{location or "*"}'
+
+
+def invalidate_reorder_report():
+    invalidate_cache_namespace(REORDER_CACHE_NAMESPACE)
+
+
+def _reorder_queryset(location):
+    open_po_quantity = (
+        PurchaseOrder.objects.filter(product=OuterRef('product'), status='PENDING')
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    rows = Stock.objects.filter(quantity__lte=F('reorder_level'))
+    if location:
+        rows = rows.filter(location=location)
+    return (
+        rows.order_by('product_id', 'location')
+        .annotate(
+            product_name=F('product__name'),
+            sku=F('product__sku'),
+            open_po_quantity=Coalesce(Subquery(open_po_quantity), 0),
+        )
+        .values(
+            'id', 'product', 'product_name', 'sku', 'location',
+            'quantity', 'reorder_level', 'open_po_quantity',
+        )
+    )
+
+
+# ---------------------------------
+# SALES ROLLUPS
+# ---------------------------------
+# Order and invoice saves add their deltas to the product's day and month
+# rows (an upsert doing col = col + delta, in the saving transaction), so
+# reports read rows per period instead of scanning orders. Revenue is
+# quantity x the product's unit_price when the change is recorded; a price
+# change reaches earlier periods on the next rebuild_sales_rollups().
+
+ROLLUP_COUNTERS = ('orders', 'quantity', 'revenue', 'invoiced_quantity')
+ROLLUP_CHUNK_SIZE = 500  # products per rebuild transaction
+MAX_REPORT_DAYS = getattr(settings, "MAX_SALES_REPORT_DAYS", 366)
+
+
+def record_sales_order_change(order_id, old, new, unit_prices=None):
+    """
+    Move an order's contribution from `old` to `new`, both
+    SalesOrder.ROLLUP_FIELDS tuples (None when created / deleted). An
+    invoiced order that changes product or date takes its invoiced
+    quantity along. `unit_prices` ({product_id: price}) saves looking up
+    prices the caller already has.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])  # (product, day) -> [orders, quantity, invoiced]
+    for state, sign in ((old, -1), (new, 1)):
+        if state is not None and state[3] != 'FAILED':
+            deltas[state[0], state[1]][0] += sign
+            deltas[state[0], state[1]][1] += sign * state[2]
+    if old is not None and new is not None and old[:2] != new[:2]:
+        invoiced = SalesInvoice.objects.filter(sales_order_id=order_id).values_list('quantity', flat=True).first()
+        if invoiced:
+            deltas[old[0], old[1]][2] -= invoiced
+            deltas[new[0], new[1]][2] += invoiced
+    bump_sales_rollups(deltas, unit_prices)
+
+
+def record_sales_invoice_change(old, new, order=None):
+    """
+    Same for an invoice: `old` / `new` are (sales_order_id, quantity).
+    `order` is the invoice's SalesOrder if already loaded.
+    """
+    orders = {order.pk: (order.product_id, order.order_date)} if order is not None else {}
+    missing = {state[0] for state in (old, new) if state is not None and state[0] not in orders}
+    if missing:
+        orders.update(
+            (pk, (product_id, day))
+            for pk, product_id, day in SalesOrder.objects.filter(pk__in=missing).values_list('pk', 'product_id', 'order_date')
+        )
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for state, sign in ((old, -1), (new, 1)):
+        if state is not None and state[0] in orders:
+            deltas[orders[state[0]]][2] += sign * state[1]
+    bump_sales_rollups(deltas)
+
+
+def bump_sales_rollups(deltas, unit_prices=None):
+    """
+    Apply {(product_id, day): (orders, quantity, invoiced_quantity)} to the
+    daily and monthly rollups.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    to_decimal = Product._meta.get_field('unit_price').to_python  # unsaved instances may hold strings
+    prices = {product_id: to_decimal(price) for product_id, price in (unit_prices or {}).items()}
+    priced = {product_id for (product_id, _), delta in deltas.items() if delta[1]} - set(prices)
+    if priced:
+        prices.update(Product.objects.filter(pk__in=priced).values_list('pk', 'unit_price'))
+
+    daily, monthly = {}, defaultdict(lambda: [0, 0, 0, 0])
+    for (product_id, day), (orders, quantity, invoiced) in deltas.items():
+        daily[product_id, day] = (orders, quantity, quantity * prices.get(product_id, 0), invoiced)
+        month = monthly[product_id, day.replace(day=1)]
+        for index, value in enumerate(daily[product_id, day]):
+            month[index] += value
+    with transaction.atomic(savepoint=False):  # one commit for both tables
+        _add_to_rollups(SalesDailyRollup, 'day', daily)
+        _add_to_rollups(SalesMonthlyRollup, 'month', monthly)
+
+
+def _add_to_rollups(model, period_field, rows):
+    """Add {(product_id, period): ROLLUP_COUNTERS values} to the rollup rows."""
+    rows = {key: values for key, values in rows.items() if any(values)}
+    if not connection.features.supports_update_conflicts_with_target:
+        for (product_id, period), values in rows.items():
+            _bump_rollup(model, period_field, product_id, period, dict(zip(ROLLUP_COUNTERS, values)))
+        return
+
+    # One upsert statement instead of an UPDATE and, for a new key, an INSERT.
+    table, product, period, *counters = _sql_names(model, 'product', period_field, *ROLLUP_COUNTERS)
+    placeholders = ', '.join(['%s'] * (2 + len(counters)))
+    increments = ', '.join(f"{column} = {table}.{column} + excluded.{column}" for column in counters)
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({product}, {period}, {', '.join(counters)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({product}, {period}) DO UPDATE SET {increments}",
+            [
+                (product_id, ops.adapt_datefield_value(day), orders, quantity,
+                 ops.adapt_decimalfield_value(revenue), invoiced)
+                for (product_id, day), (orders, quantity, revenue, invoiced) in rows.items()
+            ],
+        )
+
+
+def _bump_rollup(model, period_field, product_id, period, changes):
+    changes = {name: value for name, value in changes.items() if value}
+    if not changes:
+        return
+    rows = model.objects.filter(product_id=product_id, **{period_field: period})
+    increments = {name: F(name) + value for name, value in changes.items()}
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(product_id=product_id, **{period_field: period}, **changes)
+    except IntegrityError:  # inserted concurrently
+        rows.update(**increments)
+
+
+def rebuild_sales_rollups(product_ids=None, chunk_size=ROLLUP_CHUNK_SIZE):
+    """
+    Recompute the rollups of `product_ids` (default: every product) from
+    the orders and invoices, `chunk_size` products per transaction.
+    Returns (daily rows, monthly rows) written.
+    """
+    if product_ids is None:
+        product_ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+    product_ids = sorted(set(product_ids))
+    written = (0, 0)
+    for start in range(0, len(product_ids), chunk_size):
+        with transaction.atomic():
+            take_write_lock()
+            daily, monthly = _rebuild_rollup_chunk(product_ids[start:start + chunk_size])
+        written = (written[0] + daily, written[1] + monthly)
+    return written
+
+
+def _rebuild_rollup_chunk(product_ids):
+    SalesDailyRollup.objects.filter(product_id__in=product_ids).delete()
+    SalesMonthlyRollup.objects.filter(product_id__in=product_ids).delete()
+
+    daily = {}  # (product_id, day) -> [orders, quantity, revenue, invoiced_quantity]
+    ordered = (
+        SalesOrder.objects.filter(product_id__in=product_ids)
+        .exclude(status='FAILED')
+        .values_list('product_id', 'order_date')
+        .annotate(
+            # Named apart from the fields: F('quantity') must mean the column.
+            order_count=Count('id'),
+            units=Sum('quantity'),
+            sales=Sum(F('quantity') * F('product__unit_price'), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    for product_id, day, orders, quantity, revenue in ordered:
+        daily[product_id, day] = [orders, quantity, revenue, 0]
+    invoiced = (
+        SalesInvoice.objects.filter(sales_order__product_id__in=product_ids)
+        .values_list('sales_order__product_id', 'sales_order__order_date')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+    )
+    for product_id, day, quantity in invoiced:
+        daily.setdefault((product_id, day), [0, 0, 0, 0])[3] = quantity
+
+    monthly = defaultdict(lambda: [0, 0, 0, 0])
+    for (product_id, day), values in daily.items():
+        month = monthly[product_id, day.replace(day=1)]
+        for index, value in enumerate(values):
+            month[index] += value
+
+    # Plain executemany: building model instances for bulk_create costs
+    # more than the aggregation.
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        for model, period, rows in ((SalesDailyRollup, 'day', daily), (SalesMonthlyRollup, 'month', monthly)):
+            _insert_rows(cursor, model, ('product', period, *ROLLUP_COUNTERS), [
+                (product_id, ops.adapt_datefield_value(date), orders, quantity,
+                 ops.adapt_decimalfield_value(revenue), invoiced)
+                for (product_id, date), (orders, quantity, revenue, invoiced) in rows.items()
+            ])
+    return len(daily), len(monthly)
+
+
+def sales_report(start, end, granularity='day', product=None):
+    """
+    Totals per day or month from `start` to `end` (inclusive), for one
+    product or all of them, read from the rollups only.
+    """
+    if granularity == 'day':
+        period, rows = 'day', SalesDailyRollup.objects.filter(day__range=(start, end))
+    else:
+        period, rows = 'month', SalesMonthlyRollup.objects.filter(month__range=(start.replace(day=1), end))
+    if product is not None:
+        rows = rows.filter(product_id=product)
+    series = [
+        {'period': row.pop(period), **row}
+        for row in rows.values(period).annotate(**{name: Sum(name) for name in ROLLUP_COUNTERS}).order_by(period)
+    ]
+    return {
+        'granularity': granularity,
+        'start': start,
+        'end': end,
+        'product': product,
+        'totals': {name: sum(row[name] for row in series) for name in ROLLUP_COUNTERS},
+        'series': series,
+    }
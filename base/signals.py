@@ -1,26 +1,35 @@
-from django.db.models.signals import post_migrate, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
-from django.conf import settings
+from django.apps import apps
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection, transaction
 
 from .models import (
     Product,
     Stock,
-    StockTransfer,
     PurchaseOrder,
-    DropShipment,
-    DemandForecast,
     GoodsReceivedNote,
+    SalesInvoice,
     SalesOrder,
-    SalesInvoice
+    StockMovement,
+    StockTransfer,
+)
+from .caching import PRODUCT_CACHE_NAMESPACE, invalidate_cache_namespace
+from .jobs import enqueue_job
+from .permissions import role_cache_key
+from .roles import sync_default_groups
+from .search import SEARCH_FIELDS, reindex_products, unindex_products
+from .services import (
+    execute_transfers,
+    invalidate_reorder_report,
+    rebuild_sales_rollups,
+    record_sales_invoice_change,
+    record_sales_order_change,
+    refresh_stock_summary,
+    release_allocations,
+    take_write_lock,
 )
-
-# -----------------------------
-# CONFIGURABLE MAIN WAREHOUSE
-# -----------------------------
-DEFAULT_WAREHOUSE = getattr(settings, "DEFAULT_WAREHOUSE", "Main Warehouse")
 
 
 # ---------------------------------
@@ -31,113 +40,263 @@ def create_default_groups(sender, **kwargs):
     """
     Automatically creates user groups and assigns permissions
     after migrations are applied.
+
+    post_migrate is sent once per app, so only the last app's signal (by
+    then every app's permissions exist) triggers the sync, and the sync
+    only writes rows that differ.
     """
+    migrated = [config for config in apps.get_app_configs() if config.models_module is not None]
+    if sender is not migrated[-1]:
+        return
+    sync_default_groups()
+
 
-    # CREATE GROUPS
-    admin_group, _ = Group.objects.get_or_create(name="Admin")
-    manager_group, _ = Group.objects.get_or_create(name="InventoryManager")
-    logistics_group, _ = Group.objects.get_or_create(name="Logistics")
-    viewer_group, _ = Group.objects.get_or_create(name="Viewer")
+# ---------------------------------
+# GROUP MEMBERSHIP → ROLE CACHE
+# ---------------------------------
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_role_cache_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]  # user.groups.add(...)
+    elif pk_set:
+        user_ids = list(pk_set)  # group.user_set.add(...)
+    else:
+        user_ids = list(instance.user_set.values_list('pk', flat=True))  # group.user_set.clear()
+    _clear_role_cache(user_ids)
 
-    # ADMIN: ALL PERMISSIONS
-    admin_group.permissions.set(Permission.objects.all())
 
-    # INVENTORY MANAGER PERMISSIONS
-    inventory_models = [Product, Stock, PurchaseOrder, DemandForecast]
-    inventory_permissions = Permission.objects.filter(
-        content_type__in=[ContentType.objects.get_for_model(model) for model in inventory_models]
-    )
-    manager_group.permissions.set(inventory_permissions)
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def clear_role_cache_on_group_change(sender, instance, **kwargs):
+    # A rename or delete changes the role of every member (pre_delete, while
+    # the memberships still exist).
+    _clear_role_cache(User.objects.filter(groups=instance).values_list('pk', flat=True))
 
-    # LOGISTICS PERMISSIONS
-    logistics_models = [StockTransfer, DropShipment]
-    logistics_permissions = Permission.objects.filter(
-        content_type__in=[ContentType.objects.get_for_model(model) for model in logistics_models]
-    )
-    logistics_group.permissions.set(logistics_permissions)
 
-    # VIEWER: READ-ONLY
-    viewer_permissions = Permission.objects.filter(codename__startswith="view_")
-    viewer_group.permissions.set(viewer_permissions)
+def _clear_role_cache(user_ids):
+    keys = [role_cache_key(pk) for pk in user_ids]
+    # After commit, so a request running meanwhile can't re-cache the old
+    # roles for ROLE_CACHE_TIMEOUT.
+    transaction.on_commit(lambda: cache.delete_many(keys))
 
 
 # ---------------------------------
-# GRN MATCH → STOCK ADD
+# PRODUCT CHANGE → CATALOG CACHE
 # ---------------------------------
-@receiver(post_save, sender=GoodsReceivedNote)
-def add_stock_on_grn_match(sender, instance, **kwargs):
-    """
-    When a GoodsReceivedNote (GRN) is matched:
-    - Add received quantity to stock
-    - Mark purchase order as COMPLETED
-    - Prevent double-processing
-    """
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    invalidate_cache_namespace(PRODUCT_CACHE_NAMESPACE)
 
-    if instance.matched and not instance.processed:
-        po = instance.purchase_order
 
-        if po.status != 'COMPLETED':
-            with transaction.atomic():
-                stock, _ = Stock.objects.get_or_create(
-                    product=po.product,
-                    location=DEFAULT_WAREHOUSE,
-                    defaults={'quantity': 0}
-                )
-                stock.quantity += instance.received_quantity
-                stock.save()
+# ---------------------------------
+# PRODUCT CHANGE → SEARCH INDEX
+# ---------------------------------
+@receiver(post_save, sender=Product)
+def reindex_product_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or not update_fields.isdisjoint(SEARCH_FIELDS):
+        reindex_products(Product.objects.filter(pk=instance.pk))
 
-                po.status = 'COMPLETED'
-                po.save()
 
-                # Mark GRN as processed to prevent double-processing
-                instance.processed = True
-                instance.save()
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    unindex_products([instance.pk])
 
 
 # ---------------------------------
-# SALES INVOICE → STOCK DEDUCTION
+# GRN MATCH → STOCK ADD (QUEUED)
 # ---------------------------------
-# GRN MATCH → STOCK ADD
+# Stock posting runs on the job workers (base.jobs), not in the request
+# that saved the row; the job reports whether it went through.
 @receiver(post_save, sender=GoodsReceivedNote)
 def add_stock_on_grn_match(sender, instance, **kwargs):
     if instance.matched and not instance.processed:
-        po = instance.purchase_order
-        if po.status != 'COMPLETED':
-            with transaction.atomic():
-                stock, _ = Stock.objects.get_or_create(
-                    product=po.product,
-                    location=DEFAULT_WAREHOUSE,
-                    defaults={'quantity': 0}
-                )
-                stock.quantity += instance.received_quantity
-                stock.save()
+        enqueue_job('post_grn', instance.pk)
 
-                po.status = 'COMPLETED'
-                po.save()
 
-                # Update only processed field to prevent recursion
-                GoodsReceivedNote.objects.filter(pk=instance.pk).update(processed=True)
-
-
-# SALES INVOICE → STOCK DEDUCTION
+# ---------------------------------
+# SALES INVOICE → STOCK DEDUCTION (QUEUED)
+# ---------------------------------
 @receiver(post_save, sender=SalesInvoice)
 def reduce_stock_on_invoice(sender, instance, created, **kwargs):
     if created and not instance.processed:
-        so = instance.sales_order
-        try:
-            stock = Stock.objects.get(product=so.product, location=DEFAULT_WAREHOUSE)
-        except Stock.DoesNotExist:
-            raise ValueError(f"No stock found for product {so.product.name} in {DEFAULT_WAREHOUSE}")
+        enqueue_job('post_invoice', instance.pk)
+
+
+# ---------------------------------
+# SALES ORDER / INVOICE → SALES ROLLUPS
+# ---------------------------------
+# Saves and deletes go through here; queryset.update() only ever moves
+# orders between statuses the rollups count alike, and bulk loads are
+# followed by `manage.py rebuild_sales_rollups`.
+def _deleted_with_product(origin):
+    return isinstance(origin, Product) or getattr(origin, 'model', None) is Product
+
+
+def _saved_row(instance, *fields):
+    """
+    `fields` of the instance's row as currently stored (None if it's gone),
+    write-locked for the rest of the transaction when in one.
+    """
+    rows = type(instance).objects.filter(pk=instance.pk)
+    if connection.in_atomic_block:
+        take_write_lock()
+        if connection.features.has_select_for_update:
+            rows = rows.select_for_update()
+    return rows.values_list(*fields).first()
+
+
+@receiver(pre_save, sender=SalesOrder)
+@receiver(pre_save, sender=SalesInvoice)
+def read_sale_before_save(sender, instance, **kwargs):
+    # What the rollups counted for the row is what's stored now, not what
+    # the instance loaded: it may be stale (refresh_from_db, or changed
+    # elsewhere since). Also read by check_allocation_on_order_save.
+    if not instance._state.adding:
+        instance._saved_state = _saved_row(instance, *sender.ROLLUP_FIELDS)
+
 
-        if stock.quantity < so.quantity:
-            raise ValueError(f"Insufficient stock for product {so.product.name}")
+@receiver(post_save, sender=SalesOrder)
+def update_sales_rollups_on_order_save(sender, instance, created, **kwargs):
+    old = instance.__dict__.pop('_saved_state', None)
+    new = tuple(getattr(instance, name) for name in SalesOrder.ROLLUP_FIELDS)
+    if old is None and not created:
+        rebuild_sales_rollups([instance.product_id])  # inserted by a save() of an unsaved pk
+    elif old != new:
+        product = SalesOrder.product.field.get_cached_value(instance, None)  # set by forms/serializers
+        prices = {product.pk: product.unit_price} if product is not None else None
+        record_sales_order_change(instance.pk, old, new, prices)
 
-        with transaction.atomic():
-            stock.quantity -= so.quantity
-            stock.save()
 
-            so.status = 'COMPLETED'
-            so.save()
+@receiver(post_delete, sender=SalesOrder)
+def update_sales_rollups_on_order_delete(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_product(origin):
+        state = tuple(getattr(instance, name) for name in SalesOrder.ROLLUP_FIELDS)
+        record_sales_order_change(instance.pk, state, None)
 
-            # Update only processed field to prevent recursion
-            SalesInvoice.objects.filter(pk=instance.pk).update(processed=True)
+
+@receiver(post_save, sender=SalesInvoice)
+def update_sales_rollups_on_invoice_save(sender, instance, created, **kwargs):
+    old = instance.__dict__.pop('_saved_state', None)
+    new = tuple(getattr(instance, name) for name in SalesInvoice.ROLLUP_FIELDS)
+    if old is None and not created:
+        rebuild_sales_rollups([instance.sales_order.product_id])
+    elif old != new:
+        record_sales_invoice_change(old, new, instance.sales_order)
+
+
+@receiver(post_delete, sender=SalesInvoice)
+def update_sales_rollups_on_invoice_delete(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_product(origin):
+        state = tuple(getattr(instance, name) for name in SalesInvoice.ROLLUP_FIELDS)
+        record_sales_invoice_change(state, None)
+
+
+# ---------------------------------
+# ALLOCATED ORDER CHANGE → RELEASE STOCK
+# ---------------------------------
+# An ALLOCATED order holds its stock (allocate_sales_orders). Failing it,
+# putting it back to PENDING or changing its product or quantity gives
+# the stock back; a changed order returns to PENDING to be allocated
+# again. Deleting it gives the stock back too, unless its product (and so
+# its Stock rows) is going as well.
+@receiver(pre_save, sender=SalesOrder)
+def check_allocation_on_order_save(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    # The stored row (read_sale_before_save), not what the instance loaded:
+    # it may have been loaded (or refreshed) before the allocation ran.
+    old = instance.__dict__.get('_saved_state')
+    if old is None or old[3] != 'ALLOCATED':
+        return
+    changed = (old[0], old[2]) != (instance.product_id, instance.quantity)
+    if instance.status == 'ALLOCATED' and changed:
+        instance.status = 'PENDING'
+    instance._release_allocation = instance.status in ('PENDING', 'FAILED')
+
+
+@receiver(post_save, sender=SalesOrder)
+def release_allocation_on_order_save(sender, instance, update_fields=None, **kwargs):
+    if not instance.__dict__.pop('_release_allocation', False):
+        return
+    release_allocations([instance.pk])
+    if update_fields is not None and 'status' not in update_fields:
+        SalesOrder.objects.filter(pk=instance.pk).update(status=instance.status)
+
+
+@receiver(pre_delete, sender=SalesOrder)
+def release_allocation_on_order_delete(sender, instance, origin=None, **kwargs):
+    if instance.status == 'ALLOCATED' and not _deleted_with_product(origin):
+        release_allocations([instance.pk])
+
+
+# ---------------------------------
+# STOCK TRANSFER → MOVE STOCK
+# ---------------------------------
+@receiver(post_save, sender=StockTransfer)
+def move_stock_on_transfer(sender, instance, created, **kwargs):
+    if created:
+        execute_transfers(
+            instance.from_location, instance.to_location,
+            [(instance.product_id, instance.quantity, instance.pk)],
+        )
+
+
+# ---------------------------------
+# STOCK SAVE / DELETE → SUMMARY & LEDGER
+# ---------------------------------
+# Manual edits (API, admin) go through save()/delete(); the service paths
+# use UPDATE and keep the summary and the ledger in step themselves.
+# The ledger delta of an edit is taken against the row as it is in the
+# database when saved: the instance may have been loaded before a service
+# moved the stock (or refreshed since), so what it loaded can be stale.
+@receiver(pre_save, sender=Stock)
+def read_stock_before_save(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._saved_state = _saved_row(instance, 'product_id', 'location', 'quantity')
+
+
+@receiver(post_save, sender=Stock)
+def refresh_summary_on_stock_save(sender, instance, **kwargs):
+    product_id, location, quantity = instance.__dict__.pop('_saved_state', None) or (None, None, 0)
+    movements = []
+    if product_id is not None and (product_id, location) != (instance.product_id, instance.location):
+        # Row re-pointed to another product/location: empty the old key.
+        movements.append((product_id, location, -(quantity or 0)))
+        quantity = 0
+    movements.append((instance.product_id, instance.location, instance.quantity - (quantity or 0)))
+
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=pid, location=loc, quantity=delta,
+            reason='ADJUSTMENT', reference_id=instance.pk,
+        )
+        for pid, loc, delta in movements if delta
+    ])
+    refresh_stock_summary({pid for pid, _, _ in movements})
+    invalidate_reorder_report()
+
+
+@receiver(post_delete, sender=Stock)
+def refresh_summary_on_stock_delete(sender, instance, origin=None, **kwargs):
+    # Nothing to keep when the product itself is being deleted.
+    if _deleted_with_product(origin):
+        return
+    if instance.quantity:
+        StockMovement.objects.create(
+            product_id=instance.product_id, location=instance.location,
+            quantity=-instance.quantity, reason='ADJUSTMENT', reference_id=instance.pk,
+        )
+    refresh_stock_summary([instance.product_id])
+    invalidate_reorder_report()
+
+
+# ---------------------------------
+# PURCHASE ORDER CHANGE → REORDER REPORT
+# ---------------------------------
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+def invalidate_reorder_on_purchase_order(sender, instance, **kwargs):
+    invalidate_reorder_report()
@@ -1,3 +1,1183 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import re
+import runpy
+import sqlite3
+import tempfile
+from itertools import combinations
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, models, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models import F, Sum
+from django.contrib.auth.models import Group, Permission, User
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from . import search, services
+from .idempotency import purge_expired_idempotency_keys
+from .instrumentation import QueryRecorder, metrics
+from .forecasting import forecast_demand
+from .jobs import drain_jobs, run_jobs
+from .models import (
+    DemandForecast, GoodsReceivedNote, IdempotencyKey, Job, Product, ProductStockSummary, PurchaseOrder, SalesDailyRollup,
+    SalesInvoice, SalesMonthlyRollup, SalesOrder, SalesOrderAllocation, Stock, StockMovement, StockTransfer,
+)
+from .permissions import IsInventoryManager, get_roles, role_cache_key
+from .roles import DEFAULT_GROUPS, sync_default_groups
+from .services import (
+    DEFAULT_WAREHOUSE, add_stock, allocate_sales_orders, rebuild_sales_rollups, refresh_stock_summary, remove_stock,
+    reorder_report, stock_balance_at, take_stock_snapshot, transfer_stock_batch,
+)
+from .urls import router
+from .write_queue import WriteQueue, write_queue
+
+
+def sample_value(field):
+    """
+    A filter value of the right type for `field`; plans don't depend on it.
+    """
+    if isinstance(field, models.ForeignKey):
+        return 1
+    if isinstance(field, models.BooleanField):
+        return False
+    if isinstance(field, models.DateTimeField):
+        return datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    if isinstance(field, models.DateField):
+        return datetime.date(2026, 1, 1)
+    if isinstance(field, (models.IntegerField, models.DecimalField)):
+        return 1
+    return 'x'
+
+
+# -------------------------------
+# QUERY PLAN REGRESSION SUITE
+# -------------------------------
+@skipUnless(connection.vendor == 'sqlite', 'plan assertions are written against SQLite EXPLAIN output')
+class FilterQueryPlanTests(TestCase):
+    """
+    Every combination of a viewset's `filterset_fields` must be answered
+    through an index. A bare `SCAN <table>` plan line is a full table scan
+    and fails the test; `SCAN <table> USING INDEX` (a partial index) passes.
+    """
+
+    def assertNoFullScan(self, queryset):
+        table = queryset.model._meta.db_table
+        plan = queryset.explain()
+        self.assertIsNone(
+            re.search(rf'\bSCAN {re.escape(table)}(?! USING)\b', plan),
+            f"full scan of {table}:\n{queryset.query}\n{plan}",
+        )
+
+    def test_filterset_combinations_use_indexes(self):
+        for prefix, viewset, _ in router.registry:
+            model = viewset.queryset.model
+            fields = list(viewset.filterset_fields)
+            for size in range(1, len(fields) + 1):
+                for combo in combinations(fields, size):
+                    lookup = {name: sample_value(model._meta.get_field(name)) for name in combo}
+                    with self.subTest(endpoint=prefix, filters=combo):
+                        self.assertNoFullScan(model.objects.filter(**lookup).order_by())
+
+    def test_reorder_report_uses_partial_index(self):
+        rows = Stock.objects.filter(quantity__lte=F('reorder_level'))
+        for queryset in (rows, rows.filter(location='x')):
+            with self.subTest(query=str(queryset.query)):
+                self.assertNoFullScan(queryset)
+                self.assertIn('stock_reorder_idx', queryset.explain())
+
+
+# -------------------------------
+# STOCK MUTATION SERVICE
+# -------------------------------
+class StockServiceTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        self.stock = Stock.objects.create(product=self.product, location="A", quantity=3)
+
+    def test_remove_stock_refuses_to_go_negative(self):
+        movements = StockMovement.objects.count()
+        self.assertFalse(remove_stock(self.product.pk, "A", 4))
+        self.assertFalse(remove_stock(self.product.pk, "missing", 1))
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 3)
+        self.assertEqual(StockMovement.objects.count(), movements)
+
+        self.assertTrue(remove_stock(self.product.pk, "A", 3))
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 0)
+
+    def assertSummaryIsFresh(self, total, below_reorder):
+        summary = ProductStockSummary.objects.filter(product=self.product)
+        fields = ('total_quantity', 'location_count', 'below_reorder_count')
+        maintained = summary.values_list(*fields).get()
+        refresh_stock_summary([self.product.pk])
+        self.assertEqual(maintained, summary.values_list(*fields).get())
+        self.assertEqual((maintained[0], maintained[2]), (total, below_reorder))
+
+    def test_summary_matches_a_refresh_after_every_kind_of_change(self):
+        self.assertSummaryIsFresh(3, 1)
+        add_stock(self.product.pk, "A", 9)
+        self.assertSummaryIsFresh(12, 0)
+        add_stock(self.product.pk, "B", 15)
+        self.assertSummaryIsFresh(27, 0)
+        remove_stock(self.product.pk, "A", 4)
+        self.assertSummaryIsFresh(23, 1)
+        transfer_stock_batch("B", "A", [(self.product.pk, 5)])
+        self.assertSummaryIsFresh(23, 1)
+
+        self.stock.refresh_from_db()
+        self.stock.quantity = 40
+        self.stock.save()
+        self.assertSummaryIsFresh(50, 1)
+        self.stock.location = "C"
+        self.stock.save()
+        self.assertSummaryIsFresh(50, 1)
+        self.stock.delete()
+        self.assertSummaryIsFresh(10, 1)
+
+    def test_ledger_follows_manual_edits_of_a_stale_instance(self):
+        def ledger(location):
+            return StockMovement.objects.filter(product=self.product, location=location).aggregate(
+                total=Sum('quantity'))['total'] or 0
+
+        add_stock(self.product.pk, "A", 10)
+        self.stock.refresh_from_db()
+        self.stock.quantity = 40
+        self.stock.save()
+        self.assertEqual(ledger("A"), 40)
+
+        stale = Stock.objects.get(pk=self.stock.pk)
+        remove_stock(self.product.pk, "A", 15)
+        stale.quantity = 30
+        stale.save()
+        self.assertEqual(ledger("A"), 30)
+
+        stale.location = "B"
+        stale.quantity = 12
+        stale.save()
+        self.assertEqual((ledger("A"), ledger("B")), (0, 12))
+        self.assertEqual(stock_balance_at(self.product.pk, "B", timezone.now()), 12)
+
+    def test_balances_from_several_snapshots_match_the_ledger(self):
+        pid = self.product.pk
+        before_any = timezone.now()
+        add_stock(pid, "A", 5)
+        self.assertEqual(take_stock_snapshot(), 1)
+        first = timezone.now()
+        remove_stock(pid, "A", 2)
+        after_remove = timezone.now()
+        add_stock(pid, "B", 4)
+        self.assertEqual(take_stock_snapshot(), 2)
+        add_stock(pid, "A", 10)
+        between = timezone.now()
+        self.assertEqual(take_stock_snapshot(), 1)  # B didn't move
+        self.assertEqual(take_stock_snapshot(), 0)
+        now = timezone.now()
+
+        balances = [
+            (stock_balance_at(pid, "A", at), stock_balance_at(pid, "B", at))
+            for at in (before_any, first, after_remove, between, now)
+        ]
+        self.assertEqual(balances, [(3, 0), (8, 0), (6, 0), (16, 4), (16, 4)])
+        self.assertEqual(stock_balance_at(pid, "A", now), Stock.objects.get(product=pid, location="A").quantity)
+
+
+class ReorderReportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        self.stock = Stock.objects.create(product=self.product, location="A", quantity=3, reorder_level=10)
+
+    def report(self):
+        return [(row['location'], row['quantity'], row['open_po_quantity']) for row in reorder_report()]
+
+    def change(self, fn, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return fn(*args, **kwargs)
+
+    def test_cached_report_follows_stock_and_purchase_order_changes(self):
+        self.assertEqual(self.report(), [("A", 3, 0)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.report(), [("A", 3, 0)])
+
+        po = self.change(PurchaseOrder.objects.create, product=self.product, quantity=7, supplier="S",
+                         expected_date=datetime.date.today())
+        self.assertEqual(self.report(), [("A", 3, 7)])
+        po.quantity = 9
+        self.change(po.save)
+        self.assertEqual(self.report(), [("A", 3, 9)])
+        self.change(po.delete)
+        self.assertEqual(self.report(), [("A", 3, 0)])
+
+        self.change(add_stock, self.product.pk, "A", 20)  # rises above the reorder level
+        self.assertEqual(self.report(), [])
+        self.change(add_stock, self.product.pk, "A", 1)  # stays above it: the cached report still holds
+        with self.assertNumQueries(0):
+            self.assertEqual(self.report(), [])
+        self.change(remove_stock, self.product.pk, "A", 20)
+        self.assertEqual(self.report(), [("A", 4, 0)])
+
+        self.stock.refresh_from_db()
+        self.stock.reorder_level = 2
+        self.change(self.stock.save)
+        self.assertEqual(self.report(), [])
+        self.stock.reorder_level = 5
+        self.change(self.stock.save)
+        self.assertEqual(self.report(), [("A", 4, 0)])
+        self.change(self.stock.delete)
+        self.assertEqual(self.report(), [])
+
+
+# -------------------------------
+# STOCK TRANSFERS
+# -------------------------------
+class StockTransferTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        Stock.objects.create(product=self.product, location="A", quantity=10)
+
+    def quantities(self):
+        return dict(Stock.objects.filter(product=self.product).values_list('location', 'quantity'))
+
+    def test_create_moves_stock(self):
+        response = self.client.post('/api/transfers/', {
+            'product': self.product.pk, 'from_location': 'A', 'to_location': 'B', 'quantity': 4,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.quantities(), {'A': 6, 'B': 4})
+        self.assertEqual(StockMovement.objects.filter(reason='TRANSFER').count(), 2)
+
+    def test_short_transfer_is_rejected_and_not_recorded(self):
+        response = self.client.post('/api/transfers/', {
+            'product': self.product.pk, 'from_location': 'A', 'to_location': 'B', 'quantity': 11,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(), {'A': 10})
+        self.assertFalse(StockTransfer.objects.exists())
+
+    def test_batch_is_all_or_nothing(self):
+        other = Product.objects.create(name="Gadget", sku="G-1", unit_price=1)
+        Stock.objects.create(product=other, location="A", quantity=1)
+        response = self.client.post('/api/transfers/batch/', {
+            'from_location': 'A', 'to_location': 'B',
+            'items': [{'product': self.product.pk, 'quantity': 5}, {'product': other.pk, 'quantity': 2}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(), {'A': 10})
+
+        response = self.client.post('/api/transfers/batch/', {
+            'from_location': 'A', 'to_location': 'B',
+            'items': [{'product': self.product.pk, 'quantity': 5}, {'product': other.pk, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(self.quantities(), {'A': 5, 'B': 5})
+
+    def test_transfers_cannot_be_edited_or_deleted(self):
+        self.client.post('/api/transfers/', {
+            'product': self.product.pk, 'from_location': 'A', 'to_location': 'B', 'quantity': 4,
+        }, format='json')
+        transfer = StockTransfer.objects.get()
+        url = f'/api/transfers/{transfer.pk}/'
+        self.assertEqual(self.client.patch(url, {'quantity': 9}, format='json').status_code, 405)
+        self.assertEqual(self.client.delete(url).status_code, 405)
+        self.assertEqual(self.quantities(), {'A': 6, 'B': 4})
+
+    def test_admin_add_validates_source_stock(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        form = {'product': self.product.pk, 'from_location': 'A', 'to_location': 'B', 'quantity': 11}
+        response = self.client.post('/admin/base/stocktransfer/add/', form)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Only 10 in stock at A.")
+        self.assertFalse(StockTransfer.objects.exists())
+
+        self.client.post('/admin/base/stocktransfer/add/', {**form, 'quantity': 3})
+        self.assertEqual(self.quantities(), {'A': 7, 'B': 3})
+        transfer = StockTransfer.objects.get()
+        self.client.post(f'/admin/base/stocktransfer/{transfer.pk}/change/', {**form, 'quantity': 9})
+        self.assertEqual(StockTransfer.objects.get().quantity, 3)
+        self.assertEqual(self.client.post(f'/admin/base/stocktransfer/{transfer.pk}/delete/', {'post': 'yes'}).status_code, 403)
+
+
+# -------------------------------
+# PRODUCT RESPONSE CACHE
+# -------------------------------
+class ProductCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        self.url = f'/api/products/{self.product.pk}/'
+
+    def test_conditional_get_and_invalidation(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revalidated.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Widget v2"
+            self.product.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['name'], "Widget v2")
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_only_a_real_stream_request_skips_the_cache(self):
+        for value in ('0', 'false', ''):
+            self.assertEqual(self.client.get('/api/products/', {'stream': value})['X-Cache'], 'MISS')
+            cached = self.client.get('/api/products/', {'stream': value})
+            self.assertEqual(cached['X-Cache'], 'HIT')
+            self.assertEqual(cached.json()['results'][0]['id'], self.product.pk)
+        streamed = self.client.get('/api/products/', {'stream': 'True'})
+        self.assertFalse(streamed.has_header('X-Cache'))
+        self.assertEqual([row['id'] for row in json.loads(b''.join(streamed.streaming_content))], [self.product.pk])
+
+
+class RolePermissionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('manager', password='secret123')
+        self.managers = Group.objects.get(name='InventoryManager')
+        self.sales = Group.objects.create(name='Sales')
+
+    def roles(self):
+        return get_roles(mock.Mock(user=self.user, auth=None))
+
+    def change(self, fn, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            fn(*args)
+
+    def test_membership_changes_clear_the_role_cache(self):
+        self.change(self.user.groups.add, self.managers)
+        self.assertEqual(self.roles(), {'InventoryManager'})
+        with self.assertNumQueries(0):
+            self.roles()
+
+        self.change(self.sales.user_set.add, self.user)
+        self.assertEqual(self.roles(), {'InventoryManager', 'Sales'})
+        self.change(self.managers.user_set.remove, self.user)
+        self.assertEqual(self.roles(), {'Sales'})
+        self.change(self.sales.user_set.clear)
+        self.assertEqual(self.roles(), set())
+        self.change(self.user.groups.set, [self.managers])
+        self.assertEqual(self.roles(), {'InventoryManager'})
+        self.change(self.user.groups.clear)
+        self.assertEqual(self.roles(), set())
+
+    def test_group_rename_and_delete_clear_the_role_cache(self):
+        group = Group.objects.create(name='Auditors')
+        self.change(self.user.groups.add, group)
+        self.assertEqual(self.roles(), {'Auditors'})
+        group.name = 'Auditor'
+        self.change(group.save)
+        self.assertEqual(self.roles(), {'Auditor'})
+        self.change(group.delete)
+        self.assertIsNone(cache.get(role_cache_key(self.user.pk)))
+        self.assertEqual(self.roles(), set())
+
+    def test_roles_cached_during_the_transaction_are_cleared_on_commit(self):
+        self.change(self.user.groups.add, self.managers)
+        self.assertEqual(self.roles(), {'InventoryManager'})
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.groups.remove(self.managers)
+                # A request running meanwhile still sees the committed
+                # membership and caches it.
+                cache.set(role_cache_key(self.user.pk), frozenset({'InventoryManager'}))
+            self.assertEqual(self.roles(), {'InventoryManager'})
+        self.assertEqual(self.roles(), set())
+
+    def test_revoked_role_is_denied_with_a_refreshed_token(self):
+        class Probe(APIView):
+            permission_classes = [IsInventoryManager]
+
+            def get(self, request):
+                return Response({'ok': True})
+
+        self.change(self.user.groups.add, self.managers)
+        client = APIClient()
+        tokens = client.post('/api/login/', {'username': 'manager', 'password': 'secret123'}, format='json').json()
+        probe = Probe.as_view()
+        factory = APIRequestFactory()
+        self.assertEqual(probe(factory.get('/', HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")).status_code, 200)
+
+        self.change(self.user.groups.remove, self.managers)
+        access = client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json').json()['access']
+        self.assertEqual(probe(factory.get('/', HTTP_AUTHORIZATION=f'Bearer {access}')).status_code, 403)
+
+
+class DefaultGroupSyncTests(TestCase):
+
+    def group_permissions(self):
+        return sorted(Group.permissions.through.objects.values_list('group__name', 'permission__codename'))
+
+    def test_second_sync_writes_nothing(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(sync_default_groups(), {})
+        self.assertFalse([q['sql'] for q in captured if q['sql'].startswith(('INSERT', 'DELETE', 'UPDATE'))])
+
+    def test_dry_run_reports_the_diff_without_writing_it(self):
+        view_stock = Permission.objects.get(codename='view_stock')
+        add_product = Permission.objects.get(codename='add_product')
+        viewer = Group.objects.get(name='Viewer')
+        viewer.permissions.remove(view_stock)
+        viewer.permissions.add(add_product)
+        Group.objects.get(name='Logistics').delete()
+        before = self.group_permissions()
+
+        diff = sync_default_groups(dry_run=True)
+        self.assertEqual(set(diff), {'Viewer', 'Logistics'})
+        self.assertEqual(diff['Viewer'], ({view_stock.pk}, {add_product.pk}))
+        self.assertEqual(
+            diff['Logistics'][0],
+            set(Permission.objects.filter(content_type__model__in=['stocktransfer', 'dropshipment'])
+                .values_list('pk', flat=True)),
+        )
+        self.assertEqual(self.group_permissions(), before)
+        self.assertFalse(Group.objects.filter(name='Logistics').exists())
+
+        out = io.StringIO()
+        call_command('sync_groups', dry_run=True, stdout=out)
+        self.assertIn("+ base.view_stock", out.getvalue())
+        self.assertIn("- base.add_product", out.getvalue())
+        self.assertEqual(self.group_permissions(), before)
+
+        self.assertEqual(sync_default_groups(), diff)
+        self.assertEqual(set(Group.objects.filter(name__in=DEFAULT_GROUPS).values_list('name', flat=True)),
+                         set(DEFAULT_GROUPS))
+        self.assertEqual(sync_default_groups(), {})
+
+
+class AsyncReadTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        self.stock = Stock.objects.create(product=self.product, location="A", quantity=3, reorder_level=5)
+        Stock.objects.create(product=self.product, location="B", quantity=20, reorder_level=5)
+
+    def get(self, path, **params):
+        return async_to_sync(self.client.get)(path, params)
+
+    def change(self, fn, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            fn(*args)
+
+    def test_stock_lookup(self):
+        rows = self.get('/api/async/stock/', product=self.product.pk).json()
+        self.assertEqual(sorted((row['location'], row['quantity']) for row in rows), [("A", 3), ("B", 20)])
+        self.change(add_stock, self.product.pk, "A", 4)
+        [row] = self.get('/api/async/stock/', product=self.product.pk, location="A").json()
+        self.assertEqual(row['quantity'], 7)
+        self.assertEqual(self.get('/api/async/stock/', product='x').status_code, 400)
+
+    def test_product_by_sku(self):
+        self.assertEqual(self.get('/api/async/products/W-1/').json()['name'], "Widget")
+        self.product.name = "Widget v2"
+        self.change(self.product.save)
+        self.assertEqual(self.get('/api/async/products/W-1/').json()['name'], "Widget v2")
+        self.assertEqual(self.get('/api/async/products/missing/').status_code, 404)
+
+    def test_reorder_list_shares_the_cache_and_its_invalidation(self):
+        def report(**params):
+            return [(row['location'], row['quantity']) for row in self.get('/api/async/stock/reorder/', **params).json()]
+
+        self.assertEqual(report(), [("A", 3)])
+        self.assertEqual([(row['location'], row['quantity']) for row in reorder_report()], [("A", 3)])
+        with self.assertNumQueries(0):
+            self.assertEqual(report(), [("A", 3)])
+
+        self.change(remove_stock, self.product.pk, "B", 16)
+        self.assertEqual(report(), [("A", 3), ("B", 4)])
+        self.assertEqual(report(location="B"), [("B", 4)])
+        self.change(add_stock, self.product.pk, "A", 10)
+        self.assertEqual(report(), [("B", 4)])
+        self.assertEqual([(row['location'], row['quantity']) for row in reorder_report()], [("B", 4)])
+
+
+class ProductImportTests(TestCase):
+
+    def test_csv_upsert_with_row_errors(self):
+        Product.objects.create(name="Old", sku="A-1", unit_price=1)
+        body = (
+            "sku,name,description,unit_price\n"
+            "A-1,Alpha,,1.50\n"
+            "A-2,,x,2\n"
+            "A-3,Gamma,,3\n"
+        )
+        response = APIClient().post('/api/products/import/', body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['created'], report['updated'], report['failed']), (1, 1, 1))
+        self.assertEqual(report['errors'][0]['line'], 3)
+        self.assertIn('name', report['errors'][0]['errors'])
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'name')),
+            {'A-1': 'Alpha', 'A-3': 'Gamma'},
+        )
+
+
+class ProductSearchTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        Product.objects.create(name="Blue widget", sku="WID-100", description="Zinc plated", unit_price=1)
+        Product.objects.create(name="Widget", sku="WID-1", unit_price=1)
+        Product.objects.create(name="Gear pump", sku="PMP-7", description="Fits the blue widget", unit_price=1)
+
+    def skus(self, q):
+        response = self.client.get('/api/products/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [row['sku'] for row in response.json()]
+
+    @skipUnless(search.search_index_enabled(), 'needs SQLite with FTS5')
+    def test_ranking_and_index_sync(self):
+        self.assertEqual(self.skus('wid-1'), ['WID-1', 'WID-100'])  # SKU prefix, exact first
+        self.assertEqual(self.skus('widg'), ['WID-1', 'WID-100', 'PMP-7'])  # name before description
+        self.assertEqual(self.skus('blue wid'), ['WID-100', 'PMP-7'])
+        self.assertEqual(self.skus('zinc'), ['WID-100'])
+
+        pump = Product.objects.get(sku='PMP-7')
+        pump.name = "Café pump"
+        pump.save()
+        self.assertEqual(self.skus('cafe'), ['PMP-7'])
+        pump.delete()
+        self.assertEqual(self.skus('pump'), [])
+        self.client.post('/api/products/import/', "sku,name,unit_price\nHX-1,Hex bolt,1\n", content_type='text/csv')
+        self.assertEqual(self.skus('hex'), ['HX-1'])
+        self.assertEqual(self.client.get('/api/products/search/', {'q': 'x', 'limit': 500}).status_code, 400)
+
+    def test_fallback_without_index(self):
+        with mock.patch.object(search, 'search_index_enabled', return_value=False):
+            self.assertEqual(self.skus('WID-1'), ['WID-1', 'WID-100'])
+            self.assertEqual(self.skus('blue widget'), ['WID-100', 'PMP-7'])
+
+
+class ExportTests(TestCase):
+
+    def test_sales_order_export_is_filtered_and_joined(self):
+        product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        SalesOrder.objects.create(product=product, quantity=2, customer_name="ACME")
+        SalesOrder.objects.create(product=product, quantity=3, customer_name="Other")
+
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/sales-orders/export/?customer_name=ACME')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(lines[0], 'id,order_date,customer_name,status,product_id,sku,product_name,quantity')
+        self.assertEqual(len(lines), 2)
+        self.assertIn(',ACME,PENDING,', lines[1])
+        self.assertTrue(lines[1].endswith(',W-1,Widget,2'))
+
+
+@override_settings(SQL_INSTRUMENTATION=True)
+class SQLInstrumentationTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.products = Product.objects.bulk_create(
+            [Product(name=f"P{i}", sku=f"I-{i}", unit_price=1) for i in range(6)]
+        )
+
+    def test_repeated_query_shape_is_flagged(self):
+        Stock.objects.bulk_create([Stock(product=p, location="A", quantity=1) for p in self.products])
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            [str(stock) for stock in Stock.objects.all()]  # product.name per row
+
+        self.assertEqual(recorder.count, 7)
+        [(shape, repeats)] = recorder.repeated_shapes()
+        self.assertEqual(repeats, 6)
+        self.assertIn('"base_product"', shape)
+
+    def test_server_timing_and_metrics_endpoint(self):
+        client = APIClient()
+        response = client.get('/api/stock/')
+        self.assertIn('sql;dur=', response['Server-Timing'])
+
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        views = client.get('/api/_metrics/').json()['views']
+        self.assertEqual(views['GET stock-list']['requests'], 1)
+        self.assertGreaterEqual(views['GET stock-list']['avg_queries'], 1)
+
+
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+
+    def add_invoices(self, n):
+        for i in range(n):
+            product = Product.objects.create(name=f"P{i}", sku=f"ADM-{SalesOrder.objects.count()}", unit_price=1)
+            order = SalesOrder.objects.create(product=product, quantity=1, customer_name="ACME")
+            SalesInvoice.objects.bulk_create([SalesInvoice(sales_order=order, quantity=1, processed=True)])
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return [query['sql'] for query in captured]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_invoices(2)
+        few = len(self.changelist_queries('/admin/base/salesinvoice/'))
+        self.add_invoices(10)
+        self.assertEqual(len(self.changelist_queries('/admin/base/salesinvoice/')), few)
+
+    def test_large_unfiltered_changelist_skips_count(self):
+        self.add_invoices(2)
+        with mock.patch('base.admin.ESTIMATE_COUNT_ABOVE', 0):
+            queries = self.changelist_queries('/admin/base/salesinvoice/')
+        self.assertFalse([sql for sql in queries if 'COUNT(*)' in sql and 'base_salesinvoice' in sql])
+
+
+class FastListTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price="2.50")
+        self.stock = Stock.objects.create(product=self.product, location="A", quantity=3)
+        StockMovement.objects.create(product=self.product, location="A", quantity=3, reason="OPENING")
+
+    def test_values_list_matches_serializer_output(self):
+        client = APIClient()
+        for prefix in ('stock', 'stock-movements'):
+            for item in client.get(f'/api/{prefix}/').json()['results']:
+                self.assertEqual(item, client.get(f"/api/{prefix}/{item['id']}/").json())
+
+    def test_expand_product_inlines_it_in_one_query(self):
+        client = APIClient()
+        with self.assertNumQueries(1):
+            [item] = client.get('/api/stock/?expand=product').json()['results']
+        self.assertEqual(item['product'], client.get(f'/api/products/{self.product.pk}/').json())
+        detail = client.get(f'/api/stock/{self.stock.pk}/?expand=product').json()
+        self.assertEqual(detail, item)
+        self.assertEqual(client.get('/api/stock/?expand=supplier').status_code, 400)
+
+
+class CursorPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+
+    def walk(self, url, direction='next'):
+        ids, pages = [], 0
+        while url:
+            page = self.client.get(url).json()
+            ids += [row['id'] for row in page['results']]
+            url = page[direction]
+            pages += 1
+            self.assertLess(pages, 100, "pagination does not end")
+        return ids
+
+    def test_every_row_once_when_the_leading_key_ties(self):
+        # More ties than DRF's offset_cutoff (1000) on one order date.
+        day, other = datetime.date(2026, 3, 1), datetime.date(2026, 2, 1)
+        SalesOrder.objects.bulk_create(
+            [SalesOrder(product=self.product, quantity=1, customer_name="A", order_date=day) for _ in range(1250)]
+            + [SalesOrder(product=self.product, quantity=1, customer_name="B", order_date=other) for _ in range(30)]
+        )
+        expected = list(SalesOrder.objects.order_by('-order_date', '-id').values_list('pk', flat=True))
+
+        forward = self.walk('/api/sales-orders/?page_size=100')
+        self.assertEqual(forward, expected)
+        last = self.client.get('/api/sales-orders/?page_size=100').json()
+        while last['next']:
+            last = self.client.get(last['next']).json()
+        backward = self.walk(last['previous'], 'previous')
+        self.assertEqual(sorted(backward + [row['id'] for row in last['results']]), sorted(expected))
+        self.assertEqual(len(set(backward)), len(backward))
+
+        streamed = self.client.get('/api/sales-orders/?stream=true')
+        ids = [row['id'] for row in json.loads(b''.join(streamed.streaming_content))]
+        self.assertEqual(sorted(ids), sorted(expected))
+
+    def test_transfers_with_identical_timestamps(self):
+        StockTransfer.objects.bulk_create([
+            StockTransfer(product=self.product, from_location="A", to_location="B", quantity=1) for _ in range(1250)
+        ])
+        StockTransfer.objects.update(transfer_date=timezone.now())
+        expected = sorted(StockTransfer.objects.values_list('pk', flat=True))
+
+        ids = self.walk('/api/transfers/?page_size=100')
+        self.assertEqual(ids, expected[::-1])
+        streamed = self.client.get('/api/transfers/?stream=1')
+        self.assertEqual(sorted(row['id'] for row in json.loads(b''.join(streamed.streaming_content))), expected)
+        self.assertEqual(self.client.get('/api/transfers/?cursor=bogus').status_code, 404)
+
+
+class SalesOrderAllocationTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        Stock.objects.create(product=self.product, location=DEFAULT_WAREHOUSE, quantity=5)
+        Stock.objects.create(product=self.product, location="North", quantity=4)
+
+    def order(self, quantity, days_ago=0, **fields):
+        return SalesOrder.objects.create(
+            product=self.product, quantity=quantity, customer_name="ACME",
+            order_date=datetime.date.today() - datetime.timedelta(days=days_ago), **fields,
+        )
+
+    def quantities(self):
+        return dict(Stock.objects.filter(product=self.product).values_list('location', 'quantity'))
+
+    def test_fifo_splits_reports_shortfalls_and_invoices_allocated_orders(self):
+        newest, oldest = self.order(3), self.order(7, days_ago=2)
+        with self.assertNumQueries(12):
+            report = allocate_sales_orders('fifo')
+
+        self.assertEqual((report['allocated'], report['short'], report['units']), (1, 1, 7))
+        self.assertEqual(report['shortfalls'], [
+            {'sales_order': newest.pk, 'product': self.product.pk, 'requested': 3, 'available': 2},
+        ])
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 0, 'North': 2})
+        self.assertEqual(
+            sorted(oldest.allocations.values_list('location', 'quantity')),
+            [(DEFAULT_WAREHOUSE, 5), ('North', 2)],
+        )
+        self.assertEqual(StockMovement.objects.filter(reason='ALLOCATION').count(), 2)
+        self.assertEqual(
+            dict(SalesOrder.objects.values_list('pk', 'status')),
+            {oldest.pk: 'ALLOCATED', newest.pk: 'PENDING'},
+        )
+
+        SalesInvoice.objects.create(sales_order=oldest, quantity=7)
+        drain_jobs()
+        oldest.refresh_from_db()
+        self.assertEqual(oldest.status, 'COMPLETED')
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 0, 'North': 2})
+
+    def test_priority_nearest_and_no_split(self):
+        urgent = self.order(4, priority=5)
+        self.order(4, days_ago=3)
+        report = allocate_sales_orders('priority', allow_split=False, dry_run=True)
+        self.assertEqual((report['allocated'], report['short']), (2, 0))
+        self.assertFalse(SalesOrderAllocation.objects.exists())
+
+        local = self.order(1, location='North')
+        report = APIClient().post('/api/sales-orders/allocate/', {'policy': 'nearest'}, format='json').json()
+        self.assertEqual((report['orders'], report['allocated']), (3, 3))
+        self.assertEqual(list(local.allocations.values_list('location', flat=True)), ['North'])
+        self.assertEqual(
+            sorted(urgent.allocations.values_list('location', 'quantity')),
+            [(DEFAULT_WAREHOUSE, 1), ('North', 3)],
+        )
+
+    def test_deleting_failing_or_resizing_an_allocated_order_releases_its_stock(self):
+        client = APIClient()
+        deleted, failed, resized = self.order(3), self.order(2), self.order(4)
+        allocate_sales_orders('fifo')
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 0, 'North': 0})
+
+        self.assertEqual(client.delete(f'/api/sales-orders/{deleted.pk}/').status_code, 204)
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 3, 'North': 0})
+        client.patch(f'/api/sales-orders/{failed.pk}/', {'status': 'FAILED'}, format='json')
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 5, 'North': 0})
+
+        response = client.patch(f'/api/sales-orders/{resized.pk}/', {'quantity': 5}, format='json')
+        self.assertEqual(response.json()['status'], 'PENDING')
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 5, 'North': 4})
+        self.assertFalse(SalesOrderAllocation.objects.exists())
+        self.assertEqual(StockMovement.objects.filter(reason='ALLOCATION').aggregate(net=Sum('quantity'))['net'], 0)
+
+        SalesInvoice.objects.create(sales_order=resized, quantity=5)
+        drain_jobs()  # no longer allocated: invoicing takes the new quantity from stock
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 0, 'North': 4})
+
+    def test_changing_a_refreshed_or_stale_allocated_order_releases_its_stock(self):
+        refreshed, stale = self.order(3), self.order(2)
+        stale = SalesOrder.objects.get(pk=stale.pk)  # loaded while still PENDING
+        allocate_sales_orders('fifo')
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 0, 'North': 4})
+
+        refreshed.refresh_from_db()
+        self.assertEqual(refreshed.status, 'ALLOCATED')
+        refreshed.status = 'FAILED'
+        refreshed.save()
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 3, 'North': 4})
+
+        stale.quantity = 1
+        stale.save()
+        self.assertEqual(SalesOrder.objects.get(pk=stale.pk).status, 'PENDING')
+        self.assertEqual(self.quantities(), {DEFAULT_WAREHOUSE: 5, 'North': 4})
+        self.assertFalse(SalesOrderAllocation.objects.exists())
+
+
+class GoodsReceivedBulkTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.widget = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        self.gadget = Product.objects.create(name="Gadget", sku="G-1", unit_price=1)
+        Stock.objects.create(product=self.widget, location=DEFAULT_WAREHOUSE, quantity=5)
+        self.pos = [
+            PurchaseOrder.objects.create(product=product, quantity=quantity, supplier="S",
+                                         expected_date=datetime.date.today())
+            for product, quantity in ((self.widget, 4), (self.widget, 6), (self.gadget, 3), (self.gadget, 8))
+        ]
+
+    def post(self, rows):
+        return self.client.post('/api/grn/bulk/', rows, format='json')
+
+    def test_posts_matched_grns_to_stock_summary_and_ledger(self):
+        response = self.post([
+            {'purchase_order': self.pos[0].pk, 'received_quantity': 4, 'matched': True},
+            {'purchase_order': self.pos[1].pk, 'received_quantity': 6, 'matched': True},
+            {'purchase_order': self.pos[2].pk, 'received_quantity': 3, 'matched': True},
+            {'purchase_order': self.pos[3].pk, 'received_quantity': 8},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([grn['matched'] for grn in response.json()], [True, True, True, False])
+
+        on_hand = dict(Stock.objects.filter(location=DEFAULT_WAREHOUSE).values_list('product', 'quantity'))
+        self.assertEqual(on_hand, {self.widget.pk: 15, self.gadget.pk: 3})
+        totals = dict(ProductStockSummary.objects.values_list('product', 'total_quantity'))
+        self.assertEqual(totals, on_hand)
+        ledger = dict(StockMovement.objects.values('product').annotate(total=Sum('quantity'))
+                      .values_list('product', 'total'))
+        self.assertEqual(ledger, on_hand)
+        self.assertEqual(StockMovement.objects.filter(reason='GRN').count(), 3)
+        self.assertEqual(
+            list(PurchaseOrder.objects.order_by('pk').values_list('status', flat=True)),
+            ['COMPLETED', 'COMPLETED', 'COMPLETED', 'PENDING'],
+        )
+        self.assertEqual(GoodsReceivedNote.objects.filter(processed=True).count(), 3)
+
+    def test_rejects_duplicate_unknown_and_already_received_orders(self):
+        GoodsReceivedNote.objects.create(purchase_order=self.pos[2], received_quantity=3)
+        response = self.post([
+            {'purchase_order': self.pos[0].pk, 'received_quantity': 4, 'matched': True},
+            {'purchase_order': self.pos[0].pk, 'received_quantity': 4, 'matched': True},
+            {'purchase_order': 999999, 'received_quantity': 1},
+            {'purchase_order': self.pos[2].pk, 'received_quantity': 3},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = json.dumps(response.json())
+        self.assertIn(f"Purchase order {self.pos[0].pk} appears more than once in the batch.", errors)
+        self.assertIn("Purchase order 999999 does not exist.", errors)
+        self.assertIn(f"Purchase order {self.pos[2].pk} already has a GRN.", errors)
+        self.assertEqual(GoodsReceivedNote.objects.count(), 1)
+
+    def test_a_failure_while_posting_rolls_back_the_whole_batch(self):
+        real_post = services.post_goods_received
+
+        def post_then_fail(*args, **kwargs):
+            real_post(*args, **kwargs)
+            raise RuntimeError("posting failed")
+
+        movements = StockMovement.objects.count()
+        with mock.patch.object(services, 'post_goods_received', side_effect=post_then_fail):
+            with self.assertRaises(RuntimeError):
+                self.post([
+                    {'purchase_order': self.pos[0].pk, 'received_quantity': 4, 'matched': True},
+                    {'purchase_order': self.pos[2].pk, 'received_quantity': 3, 'matched': True},
+                ])
+        self.assertFalse(GoodsReceivedNote.objects.exists())
+        self.assertEqual(dict(Stock.objects.values_list('product', 'quantity')), {self.widget.pk: 5})
+        self.assertEqual(ProductStockSummary.objects.get(product=self.widget).total_quantity, 5)
+        self.assertEqual(StockMovement.objects.count(), movements)
+        self.assertFalse(PurchaseOrder.objects.filter(status='COMPLETED').exists())
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        Stock.objects.create(product=self.product, location=DEFAULT_WAREHOUSE, quantity=5)
+
+    def on_hand(self):
+        return Stock.objects.get(product=self.product, location=DEFAULT_WAREHOUSE).quantity
+
+    def test_postings_run_on_the_worker_once(self):
+        order = SalesOrder.objects.create(product=self.product, quantity=2, customer_name="ACME")
+        invoice = self.client.post('/api/sales-invoices/', {'sales_order': order.pk, 'quantity': 2}, format='json')
+        po = PurchaseOrder.objects.create(product=self.product, quantity=4, supplier="S", expected_date=datetime.date.today())
+        grn = GoodsReceivedNote.objects.create(purchase_order=po, received_quantity=4, matched=True)
+        grn.save()  # a second save doesn't queue a second job
+        self.assertEqual(invoice.status_code, 201)
+        self.assertEqual(self.on_hand(), 5)
+
+        self.assertEqual(drain_jobs(), 2)
+        self.assertEqual(self.on_hand(), 5 - 2 + 4)
+        self.assertEqual(drain_jobs(), 0)
+        job = self.client.get(f"/api/jobs/?kind=post_invoice&object_id={invoice.json()['id']}").json()['results'][0]
+        self.assertEqual((job['status'], job['attempts']), ('DONE', 1))
+        self.assertEqual(SalesOrder.objects.get(pk=order.pk).status, 'COMPLETED')
+
+    def test_failed_posting_is_recorded_and_can_be_retried(self):
+        order = SalesOrder.objects.create(product=self.product, quantity=8, customer_name="ACME")
+        invoice = SalesInvoice.objects.create(sales_order=order, quantity=8)
+        with self.assertLogs('base.jobs', 'WARNING'):
+            drain_jobs()
+        job = Job.objects.get(kind='post_invoice', object_id=invoice.pk)
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn("Insufficient stock", job.error)
+        self.assertEqual(self.on_hand(), 5)
+        self.assertFalse(SalesInvoice.objects.get(pk=invoice.pk).processed)
+
+        add_stock(self.product.pk, DEFAULT_WAREHOUSE, 5)
+        self.assertEqual(self.client.post(f'/api/jobs/{job.pk}/retry/').json()['status'], 'PENDING')
+        self.assertEqual(self.client.post(f'/api/jobs/{job.pk}/retry/').status_code, 409)
+        drain_jobs()
+        self.assertEqual(self.on_hand(), 2)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'DONE')
+
+    def test_jobs_taken_by_another_worker_are_not_counted(self):
+        order = SalesOrder.objects.create(product=self.product, quantity=2, customer_name="ACME")
+        SalesInvoice.objects.create(sales_order=order, quantity=2)
+
+        def other_worker_runs_it():
+            Job.objects.filter(status='PENDING').update(status='DONE')
+
+        # Another worker finishes the job between this one reading and claiming it.
+        with mock.patch('base.jobs.take_write_lock', side_effect=other_worker_runs_it):
+            self.assertEqual(run_jobs(), 0)
+        self.assertEqual(self.on_hand(), 5)
+
+
+class WriteQueueTests(TransactionTestCase):
+
+    def test_a_failing_job_rolls_back_only_itself(self):
+        queue = WriteQueue(max_wait=0.2)
+
+        def create(sku, fail=False):
+            Product.objects.create(name=sku, sku=sku, unit_price=1)
+            if fail:
+                raise ValueError(sku)
+            return sku
+
+        futures = [queue.submit(create, 'A'), queue.submit(create, 'B', fail=True), queue.submit(create, 'C')]
+        self.assertEqual(futures[0].result(), 'A')
+        with self.assertRaisesMessage(ValueError, 'B'):
+            futures[1].result()
+        self.assertEqual(futures[2].result(), 'C')
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['A', 'C'])
+
+    def test_invoice_and_grn_creates_go_through_the_queue(self):
+        product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        Stock.objects.create(product=product, location=DEFAULT_WAREHOUSE, quantity=5)
+        order = SalesOrder.objects.create(product=product, quantity=2, customer_name="ACME")
+        po = PurchaseOrder.objects.create(product=product, quantity=4, supplier="S", expected_date=datetime.date.today())
+        client = APIClient()
+
+        with mock.patch('base.write_queue.SQLITE_WRITE_QUEUE', True), \
+                mock.patch.object(write_queue, 'run', wraps=write_queue.run) as run:
+            invoice = client.post('/api/sales-invoices/', {'sales_order': order.pk, 'quantity': 2}, format='json')
+            grn = client.post('/api/grn/', {'purchase_order': po.pk, 'received_quantity': 4, 'matched': True},
+                              format='json')
+            short = client.post('/api/sales-invoices/', {'sales_order': order.pk, 'quantity': 0}, format='json')
+        self.assertEqual((invoice.status_code, grn.status_code, short.status_code), (201, 201, 400))
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(sorted(Job.objects.values_list('kind', 'object_id')),
+                         [('post_grn', grn.json()['id']), ('post_invoice', invoice.json()['id'])])
+
+    def test_production_profile_is_applied_to_connections(self):
+        with mock.patch.dict(os.environ, {'IMS_SQLITE_PROFILE': 'production'}):
+            profile = runpy.run_path(str(Path(__file__).resolve().parent.parent / 'ims' / 'settings.py'))
+        self.assertTrue(profile['SQLITE_WRITE_QUEUE'])
+        database = profile['DATABASES']['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 600)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.sqlite3')
+            probe = DatabaseWrapper({**connection.settings_dict, **database, 'NAME': path}, alias='profile')
+            connections['profile'] = probe
+            try:
+                with probe.cursor() as cursor:
+                    pragmas = {}
+                    for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        pragmas[pragma] = cursor.fetchone()[0]
+                self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000})
+
+                # BEGIN IMMEDIATE: the write lock is held from the start of
+                # the transaction, before it writes anything.
+                other = sqlite3.connect(path, timeout=0)
+                try:
+                    with transaction.atomic(using='profile'):
+                        probe.cursor().execute('SELECT 1')
+                        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+                            other.execute('CREATE TABLE t (x)')
+                    other.execute('CREATE TABLE t (x)')
+                finally:
+                    other.close()
+            finally:
+                probe.close()
+                del connections['profile']
+
+
+class IdempotencyKeyTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+
+    def post_invoice(self, key, quantity=2, order=None):
+        order = order or SalesOrder.objects.create(product=self.product, quantity=2, customer_name="ACME")
+        return self.client.post('/api/sales-invoices/', {'sales_order': order.pk, 'quantity': quantity},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        order = SalesOrder.objects.create(product=self.product, quantity=2, customer_name="ACME")
+        first = self.post_invoice('scan-1', order=order)
+        with self.assertNumQueries(1):
+            retry = self.post_invoice('scan-1', order=order)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(SalesInvoice.objects.count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(self.post_invoice('scan-1', order=order, quantity=1).status_code, 422)
+        self.assertEqual(self.post_invoice('scan-2').status_code, 201)
+        self.assertEqual(SalesInvoice.objects.count(), 2)
+
+    def test_failed_requests_and_expired_keys_are_not_replayed(self):
+        order = SalesOrder.objects.create(product=self.product, quantity=2, customer_name="ACME")
+        self.assertEqual(self.post_invoice('scan-1', order=order, quantity=-1).status_code, 400)
+        self.assertEqual(self.post_invoice('scan-1', order=order).status_code, 201)
+
+        IdempotencyKey.objects.update(expires_at=F('created_at'))
+        self.assertEqual(self.post_invoice('scan-1').status_code, 201)
+        self.assertEqual(SalesInvoice.objects.count(), 2)
+        IdempotencyKey.objects.update(expires_at=F('created_at'))
+        self.assertEqual(purge_expired_idempotency_keys(), 1)
+
+
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.widget = Product.objects.create(name="Widget", sku="W-1", unit_price="2.50")
+        self.gadget = Product.objects.create(name="Gadget", sku="G-1", unit_price="10.00")
+
+    def rollups(self):
+        fields = ('product_id', 'orders', 'quantity', 'revenue', 'invoiced_quantity')
+        return (
+            sorted(SalesDailyRollup.objects.values_list('day', *fields)),
+            sorted(SalesMonthlyRollup.objects.values_list('month', *fields)),
+        )
+
+    def test_rollups_follow_order_changes_and_match_a_rebuild(self):
+        jan, feb = datetime.date(2026, 1, 10), datetime.date(2026, 2, 3)
+        first = SalesOrder.objects.create(product=self.widget, quantity=4, customer_name="A", order_date=jan)
+        moved = SalesOrder.objects.create(product=self.widget, quantity=2, customer_name="B", order_date=jan)
+        failed = SalesOrder.objects.create(product=self.gadget, quantity=1, customer_name="C", order_date=feb)
+        deleted = SalesOrder.objects.create(product=self.gadget, quantity=5, customer_name="D", order_date=feb)
+        self.client.post('/api/sales-invoices/', {'sales_order': moved.pk, 'quantity': 2}, format='json')
+
+        first = SalesOrder.objects.get(pk=first.pk)
+        first.quantity = 3
+        first.save()
+        self.client.patch(f'/api/sales-orders/{moved.pk}/', {'product': self.gadget.pk, 'order_date': feb}, format='json')
+        self.client.patch(f'/api/sales-orders/{failed.pk}/', {'status': 'FAILED'}, format='json')
+        SalesOrder.objects.get(pk=deleted.pk).delete()
+
+        daily, monthly = self.rollups()
+        self.assertIn((feb, self.gadget.pk, 1, 2, 20, 2), daily)
+        self.assertEqual(SalesMonthlyRollup.objects.get(product=self.widget, month=jan.replace(day=1)).revenue, 7.5)
+
+        rebuild_sales_rollups()
+        self.assertEqual(self.rollups(), (daily, monthly))
+
+    def test_saving_a_refreshed_or_stale_instance_moves_the_rollups_once(self):
+        day = datetime.date(2026, 4, 2)
+        order = SalesOrder.objects.create(product=self.widget, quantity=4, customer_name="A", order_date=day)
+        invoice = SalesInvoice.objects.create(sales_order=order, quantity=1)
+        stale = SalesOrder.objects.get(pk=order.pk)
+        stale_invoice = SalesInvoice.objects.get(pk=invoice.pk)
+
+        fresh = SalesOrder.objects.get(pk=order.pk)
+        fresh.quantity = 6
+        fresh.save()
+        order.refresh_from_db()
+        order.customer_name = "B"
+        order.save()  # rollup fields unchanged since the refresh
+        stale.quantity = 2
+        stale.save()  # loaded at 4, stored as 6
+        stale_invoice.quantity = 2
+        stale_invoice.save()
+
+        daily, monthly = self.rollups()
+        self.assertEqual(SalesDailyRollup.objects.get(product=self.widget, day=day).quantity, 2)
+        rebuild_sales_rollups()
+        self.assertEqual(self.rollups(), (daily, monthly))
+
+    def test_report_reads_only_the_rollups(self):
+        for day in (1, 2, 20):
+            SalesOrder.objects.create(product=self.widget, quantity=2, customer_name="A",
+                                      order_date=datetime.date(2026, 3, day))
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/reports/sales/?start=2026-03-01&end=2026-03-10')
+        self.assertFalse([q['sql'] for q in captured if 'base_salesorder' in q['sql']])
+        self.assertEqual(response.json()['totals'], {
+            'orders': 2, 'quantity': 4, 'revenue': '10.00', 'invoiced_quantity': 0,
+        })
+        self.assertEqual([row['period'] for row in response.json()['series']], ['2026-03-01', '2026-03-02'])
+
+        monthly = self.client.get(
+            f'/api/reports/sales/?start=2026-03-15&end=2026-03-31&granularity=month&product={self.widget.pk}'
+        ).json()
+        self.assertEqual([(row['period'], row['orders']) for row in monthly['series']], [('2026-03-01', 3)])
+        self.assertEqual(self.client.get('/api/reports/sales/?start=2025-01-01&end=2026-03-01').status_code, 400)
+
+
+class ForecastTests(TestCase):
+
+    def setUp(self):
+        self.widget = Product.objects.create(name="Widget", sku="W-1", unit_price=1)
+        self.gadget = Product.objects.create(name="Gadget", sku="G-1", unit_price=1)
+        for month, quantity in ((1, 4), (2, 2), (3, 6)):
+            SalesOrder.objects.create(product=self.widget, quantity=quantity, customer_name="A",
+                                      order_date=datetime.date(2026, month, 15))
+
+    def forecasts(self, product):
+        return list(DemandForecast.objects.filter(product=product).order_by('month')
+                    .values_list('month', 'predicted_demand'))
+
+    def test_forecast_demand_per_method(self):
+        until = datetime.date(2026, 4, 10)
+        self.assertEqual(forecast_demand('moving_average', 3, 2, until, window=2), 4)
+        self.assertEqual(self.forecasts(self.widget), [(datetime.date(2026, 4, 1), 4), (datetime.date(2026, 5, 1), 4)])
+        self.assertEqual(self.forecasts(self.gadget), [(datetime.date(2026, 4, 1), 0), (datetime.date(2026, 5, 1), 0)])
+
+        forecast_demand('seasonal_naive', 3, 3, until, season=3)
+        self.assertEqual([demand for _, demand in self.forecasts(self.widget)], [4, 2, 6])
+
+        with self.assertRaises(ValueError):
+            forecast_demand('exponential_smoothing', 3, 2, until, window=3)
+        with self.assertRaises(ValueError):
+            forecast_demand('seasonal_naive', 3, 2, until, season=12)
+
+    def test_generate_rejects_parameters_of_other_methods(self):
+        client = APIClient()
+        response = client.post('/api/forecast/generate/', {'method': 'exponential_smoothing', 'window': 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('window', response.json())
+        response = client.post('/api/forecast/generate/', {'method': 'moving_average', 'window': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'written': 6})
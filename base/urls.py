@@ -3,11 +3,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from base import async_views
+
 # ✅ EXPLICIT IMPORTS (THIS FIXES THE ERROR)
 from base.views import (
     
     ProductViewSet,
     StockViewSet,
+    ProductStockSummaryViewSet,
+    StockMovementViewSet,
     StockTransferViewSet,
     PurchaseOrderViewSet,
     DropShipmentViewSet,
@@ -15,12 +19,17 @@ from base.views import (
     GoodsReceivedNoteViewSet,
     SalesOrderViewSet,
     SalesInvoiceViewSet,
-    RegisterView
+    JobViewSet,
+    RegisterView,
+    SalesReportView,
+    SQLMetricsView,
 )
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet)
 router.register(r'stock', StockViewSet)
+router.register(r'stock-summary', ProductStockSummaryViewSet)
+router.register(r'stock-movements', StockMovementViewSet)
 router.register(r'transfers', StockTransferViewSet)
 router.register(r'purchase-orders', PurchaseOrderViewSet)
 router.register(r'dropship', DropShipmentViewSet)
@@ -28,11 +37,19 @@ router.register(r'forecast', DemandForecastViewSet)
 router.register(r'grn', GoodsReceivedNoteViewSet)
 router.register(r'sales-orders', SalesOrderViewSet)
 router.register(r'sales-invoices', SalesInvoiceViewSet)
+router.register(r'jobs', JobViewSet)
 
 
 urlpatterns = [
     path('', include(router.urls)),
       path('register/', RegisterView.as_view(), name='register'),
+    path('_metrics/', SQLMetricsView.as_view(), name='sql-metrics'),
+    path('reports/sales/', SalesReportView.as_view(), name='sales-report'),
+
+    # Async read endpoints (served without a worker thread under ASGI)
+    path('async/stock/', async_views.stock_lookup, name='async-stock'),
+    path('async/stock/reorder/', async_views.reorder_list, name='async-stock-reorder'),
+    path('async/products/<str:sku>/', async_views.product_by_sku, name='async-product-by-sku'),
 
     # Inventory APIs
 ]
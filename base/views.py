@@ -1,26 +1,58 @@
 # base/views.py
-from rest_framework import viewsets, generics, status
+import csv
+
+from rest_framework import viewsets, generics, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
 
-from .models import GoodsReceivedNote, Product, SalesInvoice, SalesOrder, Stock, StockTransfer, PurchaseOrder, DropShipment, DemandForecast
+from .models import GoodsReceivedNote, Job, Product, ProductStockSummary, SalesInvoice, SalesOrder, Stock, StockMovement, StockTransfer, PurchaseOrder, DropShipment, DemandForecast
 from .serializers import (
+    AllocationRunSerializer,
     GoodsReceivedNoteSerializer,
+    GoodsReceivedNoteBulkSerializer,
+    JobSerializer,
+    ProductSearchQuerySerializer,
     ProductSerializer,
+    ProductStockSummarySerializer,
     SalesInvoiceSerializer,
     SalesOrderSerializer,
+    SalesReportQuerySerializer,
+    SalesReportSerializer,
     StockSerializer,
+    StockBalanceQuerySerializer,
+    StockMovementSerializer,
     StockTransferSerializer,
+    StockTransferBatchSerializer,
     PurchaseOrderSerializer,
     DropShipmentSerializer,
     DemandForecastSerializer,
+    ForecastRunSerializer,
     RegisterSerializer,
     LoginSerializer,
 )
+from .caching import PRODUCT_CACHE_NAMESPACE, CachedResponseMixin
+from .exports import ExportMixin
+from .fastpath import FastListMixin
+from .forecasting import forecast_demand
+from .idempotency import IdempotentCreateMixin, idempotent
+from .imports import CSVRowsParser, NDJSONRowsParser, import_products
+from .instrumentation import metrics
+from .jobs import retry_job
+from .pagination import StreamingListMixin
+from .search import search_products
+from .services import (
+    allocate_sales_orders, receive_goods_bulk, reorder_report, sales_report, stock_balance_at, transfer_stock_batch,
+)
+from .write_queue import run_write
 
 # -------------------------------
 # PRODUCT
@@ -40,44 +72,165 @@ from .serializers import (
 # -------------------------------
 # PRODUCT
 # -------------------------------
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(IdempotentCreateMixin, CachedResponseMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
+    cache_namespace = PRODUCT_CACHE_NAMESPACE
     serializer_class = ProductSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['name', 'sku']  # You can add more fields if needed
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[CSVRowsParser, NDJSONRowsParser])
+    def bulk_import(self, request):
+        """
+        Upsert products by sku from a CSV (text/csv, with a header row) or
+        NDJSON (application/x-ndjson) body, streamed in chunks. Returns
+        counts and a per-row error report.
+        """
+        rows = request.data if not isinstance(request.data, dict) else ()  # empty body
+        try:
+            report = import_products(rows)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError(f"Malformed import file: {exc}")
+        return Response(report)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked search over name, sku and description: ?q=<words>&limit=<n>.
+        The last word matches as a prefix, as does a SKU, for typeahead.
+        """
+        query = ProductSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return Response(ProductSerializer(search_products(params['q'], params['limit']), many=True).data)
+
 # -------------------------------
 # STOCK
 # -------------------------------
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(IdempotentCreateMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Stock.objects.all()
     serializer_class = StockSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'location', 'quantity']
+    expandable_fields = {'product': ProductSerializer}
+
+    @action(detail=False, methods=['get'])
+    def reorder(self, request):
+        """
+        Stock at or below its reorder level (optionally ?location=<name>),
+        with product details and quantities already on open purchase orders.
+        """
+        return Response(reorder_report(request.query_params.get('location')))
+
+    @action(detail=False, methods=['get'])
+    def balance(self, request):
+        """
+        Point-in-time balance: ?product=<id>&location=<name>&at=<datetime>.
+        """
+        query = StockBalanceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return Response({
+            'product': params['product'],
+            'location': params['location'],
+            'at': params['at'],
+            'quantity': stock_balance_at(params['product'], params['location'], params['at']),
+        })
+
+# -------------------------------
+# STOCK MOVEMENT LEDGER (READ-ONLY)
+# -------------------------------
+class StockMovementViewSet(FastListMixin, StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = StockMovement.objects.all()
+    serializer_class = StockMovementSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['product', 'location', 'reason']
+
+# -------------------------------
+# STOCK SUMMARY (READ-ONLY)
+# -------------------------------
+class ProductStockSummaryViewSet(FastListMixin, StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Per-product stock totals; the detail route is keyed by product id.
+    """
+    queryset = ProductStockSummary.objects.all()
+    serializer_class = ProductStockSummarySerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['product']
+    cursor_ordering = 'pk'
 
 # -------------------------------
 # STOCK TRANSFER
 # -------------------------------
-class StockTransferViewSet(viewsets.ModelViewSet):
+class StockTransferViewSet(IdempotentCreateMixin, ExportMixin, FastListMixin, StreamingListMixin,
+                           mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Create and read only: creating a transfer moves the stock, so a wrong
+    one is corrected by a transfer the other way, not by editing it.
+    """
     queryset = StockTransfer.objects.all()
     serializer_class = StockTransferSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'from_location', 'to_location', 'transfer_date']
+    expandable_fields = {'product': ProductSerializer}
+    cursor_ordering = ('-transfer_date', '-id')
+    export_filename = 'transfers'
+    export_columns = (
+        ('id', 'id'),
+        ('transfer_date', 'transfer_date'),
+        ('product_id', 'product_id'),
+        ('sku', 'product__sku'),
+        ('product_name', 'product__name'),
+        ('from_location', 'from_location'),
+        ('to_location', 'to_location'),
+        ('quantity', 'quantity'),
+    )
+
+    def perform_create(self, serializer):
+        # Saving executes the transfer (base.signals); keep the record and
+        # the stock movement in one transaction.
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except ValueError as exc:
+            raise ValidationError({'detail': str(exc)})
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def batch(self, request):
+        """
+        Move many products between two locations in one transaction.
+        """
+        batch = StockTransferBatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        data = batch.validated_data
+        try:
+            transfers = transfer_stock_batch(
+                data['from_location'], data['to_location'],
+                [(item['product'], item['quantity']) for item in data['items']],
+            )
+        except ValueError as exc:
+            raise ValidationError({'detail': str(exc)})
+        return Response(
+            StockTransferSerializer(transfers, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
 
 # -------------------------------
 # PURCHASE ORDER
 # -------------------------------
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
+class PurchaseOrderViewSet(IdempotentCreateMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'supplier', 'status', 'expected_date']  # use 'status' instead of 'received'
+    expandable_fields = {'product': ProductSerializer}
 
 
 # -------------------------------
 # DROPSHIP
 # -------------------------------
-class DropShipmentViewSet(viewsets.ModelViewSet):
+class DropShipmentViewSet(IdempotentCreateMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = DropShipment.objects.all()
     serializer_class = DropShipmentSerializer
     filter_backends = [DjangoFilterBackend]
@@ -86,17 +239,34 @@ class DropShipmentViewSet(viewsets.ModelViewSet):
 # -------------------------------
 # DEMAND FORECAST
 # -------------------------------
-class DemandForecastViewSet(viewsets.ModelViewSet):
+class DemandForecastViewSet(IdempotentCreateMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = DemandForecast.objects.all()
     serializer_class = DemandForecastSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'month', 'predicted_demand']
+    expandable_fields = {'product': ProductSerializer}
+
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """
+        Recompute forecasts for every product from sales history.
+        """
+        run = ForecastRunSerializer(data=request.data)
+        run.is_valid(raise_exception=True)
+        params = dict(run.validated_data)
+        try:
+            written = forecast_demand(
+                params.pop('method'), params.pop('history'), params.pop('horizon'), **params
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'written': written})
 
 
 # -------------------------------
 # REGISTER USER (Admin Only)
 # -------------------------------
-class RegisterView(generics.CreateAPIView):
+class RegisterView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [IsAdminUser]  # Only admin can register new users
 
@@ -111,6 +281,28 @@ class RegisterView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
+# -------------------------------
+# SQL METRICS (Admin Only)
+# -------------------------------
+class SQLMetricsView(APIView):
+    """
+    Per-view query counts, SQL time, latency histograms, slowest statements
+    and likely N+1 shapes collected by SQLInstrumentationMiddleware in this
+    process. DELETE resets them.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'enabled': settings.SQL_INSTRUMENTATION,
+            'views': metrics.snapshot(),
+        })
+
+    def delete(self, request):
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # -------------------------------
 # LOGIN USER
 # -------------------------------
@@ -118,22 +310,136 @@ class LoginView(TokenObtainPairView):
     serializer_class = LoginSerializer
 
 
-class GoodsReceivedNoteViewSet(viewsets.ModelViewSet):
+class AtomicSaveMixin:
+    """
+    Saves the row and what its signals write (the stock-posting job, the
+    sales rollups) in one transaction: one commit per request, and never a
+    row without its job or rollup.
+    """
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+
+class QueuedCreateMixin(AtomicSaveMixin):
+    """
+    Runs the create on the group-commit write queue when it's enabled
+    (base.write_queue), so bursts of short creates share a commit.
+    """
+
+    def perform_create(self, serializer):
+        run_write(super().perform_create, serializer)
+
+
+class GoodsReceivedNoteViewSet(IdempotentCreateMixin, QueuedCreateMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = GoodsReceivedNote.objects.all()
     serializer_class = GoodsReceivedNoteSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['purchase_order', 'received_date']
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @idempotent
+    def bulk(self, request):
+        """
+        Create a batch of GRNs and post matched ones to stock in one transaction.
+        """
+        serializer = GoodsReceivedNoteBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        grns = run_write(receive_goods_bulk, serializer.validated_data)
+        return Response(
+            GoodsReceivedNoteSerializer(grns, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
 
-class SalesOrderViewSet(viewsets.ModelViewSet):
+class SalesOrderViewSet(IdempotentCreateMixin, AtomicSaveMixin, ExportMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = SalesOrder.objects.all()
     serializer_class = SalesOrderSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'customer_name', 'status', 'order_date']
+    expandable_fields = {'product': ProductSerializer}
+    cursor_ordering = ('-order_date', '-id')
+    export_filename = 'sales-orders'
+    export_columns = (
+        ('id', 'id'),
+        ('order_date', 'order_date'),
+        ('customer_name', 'customer_name'),
+        ('status', 'status'),
+        ('product_id', 'product_id'),
+        ('sku', 'product__sku'),
+        ('product_name', 'product__name'),
+        ('quantity', 'quantity'),
+    )
+
+    @action(detail=False, methods=['post'])
+    def allocate(self, request):
+        """
+        Allocate stock to every pending order in one pass (policy fifo,
+        priority or nearest). Returns counts and the shortfalls.
+        """
+        run = AllocationRunSerializer(data=request.data)
+        run.is_valid(raise_exception=True)
+        return Response(allocate_sales_orders(**run.validated_data))
 
 
-class SalesInvoiceViewSet(viewsets.ModelViewSet):
+class SalesInvoiceViewSet(IdempotentCreateMixin, QueuedCreateMixin, ExportMixin, FastListMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = SalesInvoice.objects.all()
     serializer_class = SalesInvoiceSerializer
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['sales_order', 'invoice_date']
\ No newline at end of file
+    filterset_fields = ['sales_order', 'invoice_date']
+    export_filename = 'sales-invoices'
+    export_columns = (
+        ('id', 'id'),
+        ('invoice_date', 'invoice_date'),
+        ('sales_order_id', 'sales_order_id'),
+        ('customer_name', 'sales_order__customer_name'),
+        ('product_id', 'sales_order__product_id'),
+        ('sku', 'sales_order__product__sku'),
+        ('product_name', 'sales_order__product__name'),
+        ('quantity', 'quantity'),
+        ('processed', 'processed'),
+    )
+
+# -------------------------------
+# BACKGROUND JOBS (READ-ONLY + RETRY)
+# -------------------------------
+class JobViewSet(FastListMixin, StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Status of queued stock posting, e.g. ?kind=post_invoice&object_id=<invoice id>.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['kind', 'object_id', 'status']
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """
+        Queue a FAILED job again (e.g. once the missing stock has arrived).
+        """
+        job = self.get_object()
+        if not retry_job(job.pk):
+            return Response({'detail': f"Only FAILED jobs can be retried; this one is {job.status}."},
+                            status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data)
+
+# -------------------------------
+# SALES REPORT (ROLLUPS)
+# -------------------------------
+class SalesReportView(APIView):
+    """
+    Orders, quantity, revenue and invoiced quantity per day or month:
+    ?start=&end=&granularity=day|month&product=<id>. Reads only the sales
+    rollups, so the cost follows the date range, not the order table.
+    """
+
+    def get(self, request):
+        query = SalesReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(SalesReportSerializer(sales_report(**query.validated_data)).data)
@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+# ---------------------------------
+# IN-PROCESS WRITE QUEUE (GROUP COMMIT)
+# ---------------------------------
+# SQLite allows one writer at a time, and every commit costs a journal
+# sync. Instead of many threads fighting for the write lock with one short
+# transaction each, callers hand their write to a single writer thread that
+# runs whatever is queued inside one transaction, each job in its own
+# savepoint, and commits once for the whole group.
+#
+# The invoice and GRN create endpoints write through `run_write`, which
+# uses the queue when SQLITE_WRITE_QUEUE is on (the production SQLite
+# profile turns it on) and otherwise writes in place.
+
+SQLITE_WRITE_QUEUE = getattr(settings, 'SQLITE_WRITE_QUEUE', False)
+
+
+class WriteQueue:
+    """
+    `run(fn, *args)` executes `fn` on the writer thread and returns its
+    result (or raises its exception) once the group containing it has
+    committed. A failing job rolls back only its own savepoint.
+
+    Call it outside transaction.atomic(): the job runs on the writer's
+    connection, not the caller's.
+    """
+
+    def __init__(self, max_batch=128, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self._ensure_started()
+        self._jobs.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._work, name='ims-write-queue', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._jobs.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            # Take whatever is already queued; wait for more only until the
+            # deadline, so a lone write is delayed by at most max_wait.
+            try:
+                batch.append(self._jobs.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            outcomes = []
+            try:
+                with transaction.atomic():
+                    for future, fn, args, kwargs in batch:
+                        try:
+                            with transaction.atomic():
+                                outcomes.append((future, fn(*args, **kwargs), None))
+                        except Exception as exc:  # noqa: BLE001 - handed back to the caller
+                            outcomes.append((future, None, exc))
+            except Exception as exc:  # noqa: BLE001 - the group commit itself failed
+                connection.close()
+                for future, _, _, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            for future, result, exc in outcomes:
+                if exc is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(exc)
+
+
+write_queue = WriteQueue()
+
+
+def run_write(fn, *args, **kwargs):
+    """
+    `fn(*args, **kwargs)` on the write queue if it's enabled, else here.
+    Always here inside a transaction: the writer's connection couldn't see
+    it, and the caller's atomic block would no longer cover the write.
+    """
+    if SQLITE_WRITE_QUEUE and not connection.in_atomic_block:
+        return write_queue.run(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,80 @@
+"""
+Batch allocation of pending sales orders (base.services.allocate_sales_orders)
+vs. taking stock order by order with remove_stock(), as the invoice signal
+does.
+
+    python -m benchmarks.bench_allocation [--orders 100000] [--products 5000]
+
+The per-order path runs on a sample and is extrapolated to --orders.
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+LOCATIONS = ('North', 'South', 'East')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--sample', type=int, default=2000, help="Orders for the per-order path.")
+    parser.add_argument('--policy', default='fifo')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from base.instrumentation import QueryRecorder
+    from base.models import Product, SalesOrder, Stock
+    from base.services import DEFAULT_WAREHOUSE, allocate_sales_orders, remove_stock
+
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'AL-{i}', unit_price=1) for i in range(args.products)]
+        )
+        # Roughly 90% of the demand is on hand, spread over four locations.
+        per_product = args.orders * 2 * 9 // 10 // args.products
+        Stock.objects.bulk_create([
+            Stock(product=p, location=location, quantity=per_product // (2 if location == DEFAULT_WAREHOUSE else 6))
+            for p in products for location in (DEFAULT_WAREHOUSE, *LOCATIONS)
+        ])
+        today = datetime.date.today()
+        SalesOrder.objects.bulk_create([
+            SalesOrder(
+                product=products[i % len(products)], quantity=1 + i % 3, customer_name='C',
+                order_date=today - datetime.timedelta(days=i % 365), priority=i % 4,
+                location=LOCATIONS[i % len(LOCATIONS)],
+            )
+            for i in range(args.orders)
+        ], batch_size=5000)
+
+        sample = list(
+            SalesOrder.objects.filter(status='PENDING').order_by('order_date', 'pk')
+            .values_list('pk', 'product_id', 'quantity')[:args.sample]
+        )
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            start = time.perf_counter()
+            for pk, product_id, quantity in sample:
+                if remove_stock(product_id, DEFAULT_WAREHOUSE, quantity, 'INVOICE', pk):
+                    SalesOrder.objects.filter(pk=pk).update(status='COMPLETED')
+            per_order = (time.perf_counter() - start) / len(sample)
+        queries_per_order = recorder.count / len(sample)
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            start = time.perf_counter()
+            report = allocate_sales_orders(args.policy)
+            batch = time.perf_counter() - start
+
+        print(f"per order: {per_order * 1000:.2f} ms, {queries_per_order:.1f} queries/order "
+              f"-> ~{per_order * args.orders:.0f}s for {args.orders} orders")
+        print(f"batch ({args.policy}): {report['orders']} orders in {batch:.2f}s, {recorder.count} queries; "
+              f"{report['allocated']} allocated ({report['units']} units), {report['short']} short")
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Burst of scanner lookups: sync DRF endpoints on a WSGI thread pool vs. the
+async endpoints on the ASGI handler, both in-process.
+
+    python -m benchmarks.bench_async_reads [--requests 2000] [--concurrency 100] [--workers 8]
+
+WSGI capacity is bounded by --workers threads (one request per thread);
+the ASGI run keeps --concurrency requests in flight on one event loop.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import percentile, scratch_database, setup_django
+
+
+def report(label, latencies, elapsed):
+    print(
+        f"{label:>28}: {len(latencies) / elapsed:7.0f} req/s, "
+        f"p50={percentile(latencies, 50) * 1000:6.1f}ms p99={percentile(latencies, 99) * 1000:6.1f}ms"
+    )
+
+
+def run_wsgi(paths, workers):
+    from django.db import connection
+    from django.test import Client
+
+    def one(path):
+        client = Client()
+        start = time.perf_counter()
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        connection.close()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, paths))
+    return latencies, time.perf_counter() - start
+
+
+def run_asgi(paths, concurrency):
+    from django.test import AsyncClient
+
+    async def main():
+        client = AsyncClient()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(path):
+            async with gate:
+                start = time.perf_counter()
+                response = await client.get(path)
+                assert response.status_code == 200, (path, response.status_code)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(path) for path in paths))
+        return latencies, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django()
+    from base.models import Product, Stock
+
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'SCAN-{i}', unit_price=1) for i in range(1000)]
+        )
+        Stock.objects.bulk_create([
+            Stock(product=p, location=loc, quantity=(p.pk * 7) % 50)
+            for p in products for loc in ('A', 'B')
+        ])
+
+        cases = [
+            ('stock by product+location',
+             lambda i: f'/api/stock/?product={products[i % 1000].pk}&location=A',
+             lambda i: f'/api/async/stock/?product={products[i % 1000].pk}&location=A'),
+            ('product by sku',
+             lambda i: f'/api/products/?sku=SCAN-{i % 1000}',
+             lambda i: f'/api/async/products/SCAN-{i % 1000}/'),
+            ('reorder list',
+             lambda i: '/api/stock/reorder/',
+             lambda i: '/api/async/stock/reorder/'),
+        ]
+        for label, sync_path, async_path in cases:
+            latencies, elapsed = run_wsgi([sync_path(i) for i in range(args.requests)], args.workers)
+            report(f'WSGI {label}', latencies, elapsed)
+            latencies, elapsed = run_asgi([async_path(i) for i in range(args.requests)], args.concurrency)
+            report(f'ASGI {label}', latencies, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Finance export of sales orders: the old whole-table JSON response
+(SalesOrderSerializer(many=True) rendered in one go) vs. the streamed
+/api/sales-orders/export/ in CSV and NDJSON.
+
+    python -m benchmarks.bench_exports [--orders 200000]
+
+Reports time to first byte, total time and peak traced memory.
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def measure(label, produce_chunks):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in produce_chunks():
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:>20}: first byte {first * 1000:8.1f}ms, total {total:6.2f}s, "
+        f"{size / 2**20:6.1f} MB out, peak memory {peak / 2**20:7.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=200000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from rest_framework.renderers import JSONRenderer
+    from base.models import Product, SalesOrder
+    from base.serializers import SalesOrderSerializer
+
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'Product {i}', sku=f'EXP-{i}', unit_price=5) for i in range(500)]
+        )
+        SalesOrder.objects.bulk_create(
+            [SalesOrder(product=products[i % 500], quantity=i % 9 + 1, customer_name=f'Customer {i % 300}')
+             for i in range(args.orders)],
+            batch_size=5000,
+        )
+        client = Client()
+        b''.join(client.get('/api/sales-orders/export/?customer_name=nobody').streaming_content)  # warm up URLconf/imports
+
+        def whole_json():
+            data = SalesOrderSerializer(SalesOrder.objects.all(), many=True).data
+            yield JSONRenderer().render(data)
+
+        def export(fmt):
+            return lambda: client.get(f'/api/sales-orders/export/?export_format={fmt}').streaming_content
+
+        measure('whole JSON', whole_json)
+        measure('export csv', export('csv'))
+        measure('export ndjson', export('ndjson'))
+
+
+if __name__ == '__main__':
+    main()
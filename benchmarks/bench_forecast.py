@@ -0,0 +1,57 @@
+"""
+Batch demand forecasting over many SKUs.
+
+    python -m benchmarks.bench_forecast [--products 10000] [--months 24]
+
+Seeds one sales order per product per month (bulk, then one rollup
+rebuild), then times forecast_demand() for each method (query + NumPy +
+upsert).
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--months', type=int, default=24)
+    args = parser.parse_args()
+
+    setup_django()
+    from base.forecasting import METHODS, add_months, forecast_demand
+    from base.models import DemandForecast, Product, SalesOrder
+    from base.services import rebuild_sales_rollups
+
+    this_month = datetime.date.today().replace(day=1)
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'F-{i}', unit_price=1) for i in range(args.products)],
+            batch_size=5000,
+        )
+        for offset in range(-args.months, 0):
+            month = add_months(this_month, offset)
+            SalesOrder.objects.bulk_create(
+                [
+                    SalesOrder(product=p, quantity=1 + (p.pk + offset) % 7, customer_name='c', order_date=month)
+                    for p in products
+                ],
+                batch_size=5000,
+            )
+        rebuild_sales_rollups()
+        print(f"{args.products} products x {args.months} months of history")
+
+        for method in METHODS:
+            start = time.perf_counter()
+            written = forecast_demand(method, args.months, horizon=3)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{method:>22}: {written} forecasts in {elapsed:.2f}s "
+                f"({written / elapsed:.0f}/s), table rows={DemandForecast.objects.count()}"
+            )
+
+
+if __name__ == '__main__':
+    main()
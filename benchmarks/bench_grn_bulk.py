@@ -0,0 +1,80 @@
+"""
+Per-row query count: one POST /api/grn/ per GRN vs. POST /api/grn/bulk/.
+The per-row figures include draining the stock-posting jobs those POSTs
+queue (base.jobs).
+
+    python -m benchmarks.bench_grn_bulk [--rows 500]
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def seed(n_rows):
+    from base.models import GoodsReceivedNote, Product, PurchaseOrder, Stock
+
+    GoodsReceivedNote.objects.all().delete()
+    PurchaseOrder.objects.all().delete()
+    Stock.objects.all().delete()
+    products = Product.objects.bulk_create([
+        Product(name=f'P{i}', sku=f'GRN-{i}', unit_price=1) for i in range(50)
+    ])
+    pos = PurchaseOrder.objects.bulk_create([
+        PurchaseOrder(
+            product=products[i % len(products)], quantity=5, supplier='S',
+            expected_date=datetime.date.today(),
+        )
+        for i in range(n_rows)
+    ])
+    return [{'purchase_order': po.pk, 'received_quantity': 5, 'matched': True} for po in pos]
+
+
+def measure(label, n_rows, send):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from base.models import Product, Stock
+
+    Product.objects.all().delete()
+    payload = seed(n_rows)
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        send(payload)
+        elapsed = time.perf_counter() - start
+    total = sum(Stock.objects.values_list('quantity', flat=True))
+    print(
+        f"{label:>8}: {n_rows} GRNs, {len(ctx.captured_queries)} queries "
+        f"({len(ctx.captured_queries) / n_rows:.2f}/row), {elapsed:.2f}s, stock={total}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.test import APIClient
+    from base import jobs
+
+    jobs.JOB_WORKER = 'external'  # drained below, on this connection
+    client = APIClient()
+
+    def one_by_one(payload):
+        for row in payload:
+            response = client.post('/api/grn/', row, format='json')
+            assert response.status_code == 201, response.content
+        jobs.drain_jobs()
+
+    def bulk(payload):
+        response = client.post('/api/grn/bulk/', payload, format='json')
+        assert response.status_code == 201, response.content
+
+    with scratch_database():
+        measure('per-row', args.rows, one_by_one)
+        measure('bulk', args.rows, bulk)
+
+
+if __name__ == '__main__':
+    main()
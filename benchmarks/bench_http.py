@@ -0,0 +1,367 @@
+"""
+HTTP benchmark over every route in base/urls.py plus JWT login, driven
+through the Django test client against a seeded scratch database.
+
+    python -m benchmarks.bench_http [--requests 100] [--products 500]
+        [--only <substring>] [--output bench-http.json]
+        [--baseline previous.json] [--tolerance 0.5]
+
+Every router viewset gets list, filtered list (on its first filterset
+field) and detail cases, plus create where the viewset allows it. Extra
+actions, the async routes, the sales report, register and login have
+their own cases. The GRN and invoice creates queue their stock posting
+(base.jobs), which the in-process worker runs alongside. A route without
+a case is an error, so new endpoints can't be left out silently.
+
+For each case the run records throughput, p50/p95/p99 latency and SQL
+queries per request, and writes them as JSON. With --baseline, it exits
+with status 1 if any case's query count went up, or if its p95 grew by
+more than --tolerance (ignoring differences under --min-delta-ms).
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+from urllib.parse import urlencode
+
+from benchmarks.harness import percentile, scratch_database, setup_django
+
+LOCATION_B = 'Overflow'
+
+
+class Case:
+    def __init__(self, name, route, method, path, payload=None, content_type=None, auth=False, expect=(200,)):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.path = path                # callable(i) -> URL
+        self.payload = payload          # callable(i) -> body, or None
+        self.content_type = content_type
+        self.auth = auth
+        self.expect = expect
+
+
+# ---------------------------------
+# DATA
+# ---------------------------------
+def seed(n_products, n_requests):
+    from django.contrib.auth.models import User
+    from base.models import (
+        DemandForecast, DropShipment, GoodsReceivedNote, Job, Product, PurchaseOrder,
+        SalesInvoice, SalesOrder, StockTransfer,
+    )
+    from base.search import rebuild_product_search
+    from base.services import DEFAULT_WAREHOUSE, add_stock, rebuild_sales_rollups, refresh_stock_summary
+
+    products = Product.objects.bulk_create([
+        Product(name=f'Bench product {i}', sku=f'BENCH-{i}', description='x' * 100, unit_price=10 + i % 90)
+        for i in range(n_products)
+    ])
+    for product in products:
+        add_stock(product.pk, DEFAULT_WAREHOUSE, 1_000_000, 'OPENING')
+        add_stock(product.pk, LOCATION_B, 5)
+    refresh_stock_summary([p.pk for p in products])
+
+    today = datetime.date.today()
+    pos = PurchaseOrder.objects.bulk_create([
+        PurchaseOrder(product=products[i % n_products], quantity=10, supplier=f'Supplier {i % 20}',
+                      expected_date=today)
+        for i in range(n_products + n_requests * 11)  # seeded GRNs + GRN create + GRN bulk (10 each)
+    ])
+    GoodsReceivedNote.objects.bulk_create([
+        GoodsReceivedNote(purchase_order=po, received_quantity=10, processed=True) for po in pos[:n_products]
+    ])
+    orders = SalesOrder.objects.bulk_create([
+        SalesOrder(product=products[i % n_products], quantity=1, customer_name=f'Customer {i % 50}',
+                   order_date=today - datetime.timedelta(days=i % 365))
+        for i in range(n_products * 4 + n_requests)
+    ])
+    invoices = SalesInvoice.objects.bulk_create([
+        SalesInvoice(sales_order=so, quantity=so.quantity, processed=True) for so in orders[:n_products]
+    ])
+    Job.objects.bulk_create([Job(kind='post_invoice', object_id=inv.pk, status='DONE') for inv in invoices])
+    StockTransfer.objects.bulk_create([
+        StockTransfer(product=p, from_location=DEFAULT_WAREHOUSE, to_location=LOCATION_B, quantity=1)
+        for p in products
+    ])
+    DropShipment.objects.bulk_create([
+        DropShipment(product=p, customer_name=f'Customer {p.pk % 50}', address='1 Bench St') for p in products
+    ])
+    DemandForecast.objects.bulk_create([
+        DemandForecast(product=p, month=today.replace(day=1), predicted_demand=p.pk % 40) for p in products
+    ])
+    rebuild_sales_rollups()
+    rebuild_product_search()
+    User.objects.create_superuser('bench', 'bench@example.com', 'bench-password')
+
+    return {
+        'products': [p.pk for p in products],
+        'free_pos': [po.pk for po in pos[n_products:]],
+        'free_orders': [so.pk for so in orders[n_products * 4:]],
+        'warehouse': DEFAULT_WAREHOUSE,
+    }
+
+
+# ---------------------------------
+# CASES
+# ---------------------------------
+def create_payloads(data):
+    products = data['products']
+    free_pos = iter(data['free_pos'])
+    free_orders = iter(data['free_orders'])
+    today = datetime.date.today()
+
+    def product(i):
+        return products[i % len(products)]
+
+    return {
+        'product': lambda i: {'name': f'New {i}', 'sku': f'NEW-{i}', 'unit_price': '9.99'},
+        'stock': lambda i: {'product': product(i), 'location': f'Bin {i}', 'quantity': 5},
+        'stocktransfer': lambda i: {
+            'product': product(i), 'from_location': data['warehouse'], 'to_location': LOCATION_B, 'quantity': 1,
+        },
+        'purchaseorder': lambda i: {
+            'product': product(i), 'quantity': 10, 'supplier': 'Acme', 'expected_date': today.isoformat(),
+        },
+        'dropshipment': lambda i: {'product': product(i), 'customer_name': 'Bench', 'address': '1 Bench St'},
+        'demandforecast': lambda i: {
+            'product': product(i), 'month': datetime.date(3000 + i, 1, 1).isoformat(), 'predicted_demand': 5,
+        },
+        # Matched GRN -> stock is added by base.signals.
+        'goodsreceivednote': lambda i: {
+            'purchase_order': next(free_pos), 'received_quantity': 10, 'matched': True,
+        },
+        'salesorder': lambda i: {'product': product(i), 'quantity': 1, 'customer_name': 'Bench'},
+        # Invoice -> stock is removed and the order completed by base.signals.
+        'salesinvoice': lambda i: {'sales_order': next(free_orders), 'quantity': 1},
+    }, {
+        'goodsreceivednote-bulk': lambda i: [
+            {'purchase_order': next(free_pos), 'received_quantity': 10, 'matched': True} for _ in range(10)
+        ],
+        'stocktransfer-batch': lambda i: {
+            'from_location': data['warehouse'], 'to_location': LOCATION_B,
+            'items': [{'product': product(i + k), 'quantity': 1} for k in range(5)],
+        },
+        'demandforecast-generate': lambda i: {'history': 12, 'horizon': 3},
+        # Dry run: leaves the pending orders for the invoice case.
+        'salesorder-allocate': lambda i: {'policy': 'fifo', 'dry_run': True},
+        'job-retry': lambda i: {},
+        'product-bulk-import': lambda i: 'sku,name,unit_price\n' + ''.join(
+            f'IMP-{i}-{k},Imported {k},{k}.50\n' for k in range(50)
+        ),
+    }
+
+
+def build_cases(router, data):
+    from django.db import models
+
+    from base.services import DEFAULT_WAREHOUSE
+
+    creates, action_payloads = create_payloads(data)
+    cases = [Case('api root', 'api-root', 'get', lambda i: '/api/')]
+
+    for prefix, viewset, basename in router.registry:
+        model = viewset.queryset.model
+        sample = viewset.queryset.order_by('pk').first()
+        base = f'/api/{prefix}/'
+        cases.append(Case(f'{prefix} list', f'{basename}-list', 'get', lambda i, base=base: base))
+
+        field_name = viewset.filterset_fields[0]
+        field = model._meta.get_field(field_name)
+        value = getattr(sample, field.attname)
+        if isinstance(field, models.BooleanField):
+            value = str(value).lower()
+        query = urlencode({field_name: value})
+        cases.append(Case(f'{prefix} filtered list', f'{basename}-list', 'get',
+                          lambda i, base=base, query=query: f'{base}?{query}'))
+        cases.append(Case(f'{prefix} detail', f'{basename}-detail', 'get',
+                          lambda i, base=base, pk=sample.pk: f'{base}{pk}/'))
+
+        if hasattr(viewset, 'create'):
+            if basename not in creates:
+                raise SystemExit(f"No create payload for {basename}; add one to create_payloads().")
+            cases.append(Case(f'{prefix} create', f'{basename}-list', 'post', lambda i, base=base: base,
+                              payload=creates[basename], expect=(201,)))
+
+        for extra in viewset.get_extra_actions():
+            route = f'{basename}-{extra.url_name}'
+            action_base = f'{base}{sample.pk}/' if extra.detail else base
+            path = lambda i, base=action_base, url_path=extra.url_path: f'{base}{url_path}/'  # noqa: E731
+            if 'post' in extra.mapping:
+                payload = action_payloads[route]
+                content_type = 'text/csv' if route == 'product-bulk-import' else None
+                # Retrying a job that didn't fail is answered with 409.
+                expect = (200, 409) if route == 'job-retry' else (200, 201)
+                cases.append(Case(f'{prefix} {extra.url_path}', route, 'post', path, payload,
+                                  content_type=content_type, expect=expect))
+            else:
+                cases.append(Case(f'{prefix} {extra.url_path}', route, 'get', path))
+
+    for case in cases:
+        if case.route == 'stock-balance':
+            query = urlencode({
+                'product': data['products'][0], 'location': DEFAULT_WAREHOUSE,
+                'at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            })
+            case.path = lambda i, query=query: f'/api/stock/balance/?{query}'
+        elif case.route == 'product-search':
+            case.path = lambda i, n=len(data['products']): f'/api/products/search/?q=BENCH-{i % n}'
+
+    products = data['products']
+    cases += [
+        Case('async stock lookup', 'async-stock', 'get',
+             lambda i: f'/api/async/stock/?product={products[i % len(products)]}&location={LOCATION_B}'),
+        Case('async reorder list', 'async-stock-reorder', 'get', lambda i: '/api/async/stock/reorder/'),
+        Case('async product by sku', 'async-product-by-sku', 'get',
+             lambda i: f'/api/async/products/BENCH-{i % len(products)}/'),
+        Case('register', 'register', 'post', lambda i: '/api/register/',
+             lambda i: {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'secret-pass'},
+             auth=True, expect=(201,)),
+        Case('sql metrics', 'sql-metrics', 'get', lambda i: '/api/_metrics/', auth=True),
+        Case('sales report 30 days', 'sales-report', 'get', lambda i: '/api/reports/sales/'),
+        Case('jwt login', 'login', 'post', lambda i: '/api/login/',
+             lambda i: {'username': 'bench', 'password': 'bench-password'}),
+    ]
+    return cases
+
+
+def route_names(patterns):
+    from django.urls import URLResolver
+
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+# ---------------------------------
+# RUN / COMPARE
+# ---------------------------------
+def run_case(client, case, n_requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    if case.method == 'get':
+        getattr(client, case.method)(case.path(0))  # warm-up, not timed
+
+    latencies = []
+    queries = 0
+    for i in range(n_requests):
+        kwargs = {}
+        if case.payload is not None:
+            body = case.payload(i)
+            if case.content_type:
+                kwargs = {'data': body, 'content_type': case.content_type}
+            else:
+                kwargs = {'data': body, 'format': 'json'}
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, case.method)(case.path(i), **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latencies.append(time.perf_counter() - start)
+        queries += len(captured)
+        if response.status_code not in case.expect:
+            body = b'' if response.streaming else response.content[:300]
+            raise SystemExit(f"{case.name}: HTTP {response.status_code} {body!r}")
+
+    total = sum(latencies)
+    return {
+        'route': case.route,
+        'method': case.method.upper(),
+        'requests': n_requests,
+        'throughput_rps': round(n_requests / total, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'queries_per_request': round(queries / n_requests, 2),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for name, current in results['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        if before is None:
+            continue
+        if current['queries_per_request'] > before['queries_per_request']:
+            regressions.append(
+                f"{name}: queries/request {before['queries_per_request']} -> {current['queries_per_request']}"
+            )
+        grown = current['p95_ms'] - before['p95_ms']
+        if grown > min_delta_ms and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=100, help="Requests per case.")
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--only', help="Run only cases whose name contains this text.")
+    parser.add_argument('--output', default='bench-http.json')
+    parser.add_argument('--baseline', help="Results JSON from an earlier run to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative p95 growth.")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help="Ignore p95 changes smaller than this.")
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from rest_framework.test import APIClient
+
+    from base.urls import router, urlpatterns
+
+    with scratch_database():
+        data = seed(args.products, args.requests)
+        cases = build_cases(router, data)
+
+        covered = {case.route for case in cases}
+        missing = sorted(set(route_names(urlpatterns)) - covered)
+        if missing:
+            raise SystemExit(f"No benchmark case for routes: {', '.join(missing)}")
+
+        client = APIClient()
+        login = client.post('/api/login/', {'username': 'bench', 'password': 'bench-password'}, format='json')
+        admin = APIClient()
+        admin.credentials(HTTP_AUTHORIZATION=f"Bearer {login.json()['access']}")
+
+        results = {
+            'meta': {
+                'requests_per_case': args.requests,
+                'products': args.products,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            },
+            'cases': {},
+        }
+        for case in cases:
+            if args.only and args.only not in case.name:
+                continue
+            result = run_case(admin if case.auth else client, case, args.requests)
+            results['cases'][case.name] = result
+            print(
+                f"{case.name:>34}: {result['throughput_rps']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  p99 {result['p99_ms']:7.2f} ms  "
+                f"{result['queries_per_request']:6.2f} queries"
+            )
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+A client retry storm against POST /api/transfers/: every transfer is sent
+--retries extra times, interleaved with other threads' requests (so some
+retries race their original). Without an Idempotency-Key each retry is a
+new transfer; with one (base.idempotency) it gets the first response back.
+
+    python -m benchmarks.bench_idempotency [--threads 8] [--transfers 100] [--retries 2]
+"""
+import argparse
+import random
+import time
+import uuid
+
+from benchmarks.harness import percentile, run_threads, scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--transfers', type=int, default=100, help="Distinct transfers per run.")
+    parser.add_argument('--retries', type=int, default=2, help="Extra sends of each transfer.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from base.models import Product, Stock, StockTransfer
+    from base.services import add_stock
+
+    with scratch_database():
+        product = Product.objects.create(name='P', sku='IK-1', unit_price=1)
+        add_stock(product.pk, 'A', 1_000_000, 'OPENING')
+
+        def on_hand(location):
+            stock = Stock.objects.filter(product=product, location=location).first()
+            return stock.quantity if stock else 0
+
+        def storm(label, with_key):
+            StockTransfer.objects.all().delete()
+            sends = [(i, uuid.uuid4().hex if with_key else None) for i in range(args.transfers)]
+            sends = [send for send in sends for _ in range(1 + args.retries)]
+            random.Random(0).shuffle(sends)
+            seen, first, retry = set(), [], []
+
+            def worker(t):
+                client = APIClient()
+                for i, key in sends[t::args.threads]:
+                    headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+                    is_retry = i in seen
+                    seen.add(i)
+                    start = time.perf_counter()
+                    response = client.post('/api/transfers/', {
+                        'product': product.pk, 'from_location': 'A', 'to_location': 'B', 'quantity': 1,
+                    }, format='json', **headers)
+                    (retry if is_retry else first).append(time.perf_counter() - start)
+                    assert response.status_code == 201, response.content
+
+            before = on_hand('B')
+            elapsed = run_threads(worker, args.threads)
+            moved = on_hand('B') - before
+            print(f"{label:>8}: {len(sends)} requests in {elapsed:.2f}s -> {StockTransfer.objects.count()} transfers, "
+                  f"{moved} units moved (want {args.transfers}); retries p50 {percentile(retry, 50) * 1000:.2f} "
+                  f"p95 {percentile(retry, 95) * 1000:.2f} ms vs first sends p50 {percentile(first, 50) * 1000:.2f} ms")
+
+        storm('no key', with_key=False)
+        storm('with key', with_key=True)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
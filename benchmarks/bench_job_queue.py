@@ -0,0 +1,88 @@
+"""
+Invoice POST latency under a burst of concurrent requests: stock posted
+inside the request (the old post_save handler) vs. queued for the job
+workers (base.jobs), plus how long the queue takes to drain afterwards.
+
+    python -m benchmarks.bench_job_queue [--threads 8] [--requests 50] [--products 20]
+
+Few products means many requests post to the same Stock rows.
+"""
+import argparse
+import time
+
+from benchmarks.harness import percentile, run_threads, scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help="Invoices per thread.")
+    parser.add_argument('--products', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models.signals import post_save
+    from rest_framework.test import APIClient
+    from base import jobs
+    from base.models import Job, Product, SalesInvoice, SalesOrder
+    from base.services import DEFAULT_WAREHOUSE, add_stock, post_sales_invoices
+    from base.signals import reduce_stock_on_invoice
+
+    def post_inline(sender, instance, created, **kwargs):
+        if created and not instance.processed:
+            errors = post_sales_invoices([instance.pk])
+            if errors:
+                raise ValueError(errors[instance.pk])
+
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'JQ-{i}', unit_price=1) for i in range(args.products)]
+        )
+        for product in products:
+            add_stock(product.pk, DEFAULT_WAREHOUSE, 1_000_000, 'OPENING')
+        per_mode = args.threads * args.requests
+        orders = [so.pk for so in SalesOrder.objects.bulk_create([
+            SalesOrder(product=products[i % len(products)], quantity=1, customer_name='C')
+            for i in range(per_mode * 2)
+        ])]
+
+        def burst(mode, orders):
+            latencies = [[] for _ in range(args.threads)]
+
+            def worker(t):
+                client = APIClient()
+                for k in range(args.requests):
+                    start = time.perf_counter()
+                    response = client.post('/api/sales-invoices/', {
+                        'sales_order': orders[t * args.requests + k], 'quantity': 1,
+                    }, format='json')
+                    latencies[t].append(time.perf_counter() - start)
+                    assert response.status_code == 201, response.content
+
+            elapsed = run_threads(worker, args.threads)
+            flat = [value for per_thread in latencies for value in per_thread]
+            print(f"{mode:>8}: {len(flat) / elapsed:7.1f} req/s  p50 {percentile(flat, 50) * 1000:6.2f}  "
+                  f"p95 {percentile(flat, 95) * 1000:6.2f}  p99 {percentile(flat, 99) * 1000:6.2f}  "
+                  f"max {max(flat) * 1000:7.2f} ms")
+
+        post_save.disconnect(reduce_stock_on_invoice, sender=SalesInvoice)
+        post_save.connect(post_inline, sender=SalesInvoice)
+        try:
+            burst('inline', orders[:per_mode])
+        finally:
+            post_save.disconnect(post_inline, sender=SalesInvoice)
+            post_save.connect(reduce_stock_on_invoice, sender=SalesInvoice)
+
+        burst('queued', orders[per_mode:])
+        start = time.perf_counter()
+        while Job.objects.filter(status='PENDING').exists():
+            time.sleep(0.01)
+        drained = time.perf_counter() - start
+        done = Job.objects.filter(status='DONE').count()
+        print(f"queue drained {drained * 1000:.0f} ms after the burst; {done}/{per_mode} jobs DONE "
+              f"({jobs.JOB_WORKER_THREADS} worker threads, batches of {jobs.JOB_BATCH_SIZE})")
+        assert SalesInvoice.objects.filter(processed=True).count() == per_mode * 2
+
+
+if __name__ == '__main__':
+    main()
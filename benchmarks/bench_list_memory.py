@@ -0,0 +1,60 @@
+"""
+Peak Python memory of GET /api/sales-orders/ (cursor page and ?stream=true)
+as the table grows.
+
+    python -m benchmarks.bench_list_memory [--sizes 10000 50000]
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.test import APIClient
+    from base.models import Product, SalesOrder
+
+    client = APIClient()
+
+    def first_page():
+        response = client.get('/api/sales-orders/')
+        assert response.status_code == 200
+
+    def streamed():
+        response = client.get('/api/sales-orders/', {'stream': 'true'})
+        for _ in response.streaming_content:
+            pass
+
+    with scratch_database():
+        product = Product.objects.create(name='Bench', sku='MEM-1', unit_price=1)
+        first_page()  # warm up imports and caches before measuring
+        streamed()
+        rows = 0
+        for size in sorted(args.sizes):
+            SalesOrder.objects.bulk_create(
+                [SalesOrder(product=product, quantity=1, customer_name=f'c{i}') for i in range(size - rows)],
+                batch_size=5000,
+            )
+            rows = size
+            print(
+                f"{size:>8} rows: page peak={peak_kib(first_page):8.0f} KiB, "
+                f"stream peak={peak_kib(streamed):8.0f} KiB"
+            )
+
+
+if __name__ == '__main__':
+    main()
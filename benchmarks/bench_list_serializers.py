@@ -0,0 +1,112 @@
+"""
+List serialization throughput: the ModelSerializers in base/serializers.py
+over model instances vs. base.fastpath.ValuesSerializer over values()
+rows, plus the product name lookup done client-side vs. ?expand=product.
+
+    python -m benchmarks.bench_list_serializers [--rows 20000] [--page 100]
+
+Both paths include the query; outputs are checked to be identical.
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def rows_per_second(fn, n_rows, repeat=3):
+    best = min(_timed(fn) for _ in range(repeat))
+    return n_rows / best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--page', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIClient
+    from base import serializers as s
+    from base.fastpath import expanded_serializer, values_serializer_for
+    from base.models import (
+        DemandForecast, Product, PurchaseOrder, SalesOrder, Stock, StockMovement, StockTransfer,
+    )
+
+    with scratch_database():
+        n = args.rows
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'L-{i}', description='x' * 100, unit_price=i % 97 + 0.5) for i in range(n)]
+        )
+        today = datetime.date.today()
+        Stock.objects.bulk_create([Stock(product=p, location='A', quantity=5) for p in products])
+        StockMovement.objects.bulk_create(
+            [StockMovement(product=p, location='A', quantity=5, reason='OPENING') for p in products]
+        )
+        StockTransfer.objects.bulk_create(
+            [StockTransfer(product=p, from_location='A', to_location='B', quantity=1) for p in products]
+        )
+        PurchaseOrder.objects.bulk_create(
+            [PurchaseOrder(product=p, quantity=3, supplier='S', expected_date=today) for p in products]
+        )
+        SalesOrder.objects.bulk_create([SalesOrder(product=p, quantity=1, customer_name='C') for p in products])
+        DemandForecast.objects.bulk_create(
+            [DemandForecast(product=p, month=today.replace(day=1), predicted_demand=3) for p in products]
+        )
+
+        cases = [
+            (s.ProductSerializer, Product.objects.all()),
+            (s.StockSerializer, Stock.objects.all()),
+            (s.StockMovementSerializer, StockMovement.objects.all()),
+            (s.StockTransferSerializer, StockTransfer.objects.all()),
+            (s.PurchaseOrderSerializer, PurchaseOrder.objects.all()),
+            (s.SalesOrderSerializer, SalesOrder.objects.all()),
+            (s.DemandForecastSerializer, DemandForecast.objects.all()),
+            (expanded_serializer(s.StockSerializer, {'product': s.ProductSerializer}),
+             Stock.objects.select_related('product')),
+        ]
+        renderer = JSONRenderer()
+        print(f"{'serializer':>32}  {'model':>10}  {'values()':>10}  rows/s")
+        for serializer_class, queryset in cases:
+            queryset = queryset.order_by('pk')
+            values = values_serializer_for(serializer_class)
+            model_data = serializer_class(queryset, many=True).data
+            fast_data = list(values.represent(queryset.values(*values.lookups)))
+            assert renderer.render(model_data) == renderer.render(fast_data), serializer_class.__name__
+
+            model = rows_per_second(lambda: serializer_class(queryset, many=True).data, n)
+            fast = rows_per_second(
+                lambda: list(values.represent(queryset.values(*values.lookups))), n
+            )
+            print(f"{serializer_class.__name__:>32}  {model:10.0f}  {fast:10.0f}  ({fast / model:.1f}x)")
+
+        client = APIClient()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            page = client.get(f'/api/stock/?page_size={args.page}').json()['results']
+            names = [client.get(f"/api/products/{row['product']}/").json()['name'] for row in page]
+            per_row = time.perf_counter() - start
+        requests, queries = 1 + len(names), len(captured)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            page = client.get(f'/api/stock/?page_size={args.page}&expand=product').json()['results']
+            names = [row['product']['name'] for row in page]
+            expanded = time.perf_counter() - start
+        print(
+            f"stock page + product names: {requests} requests/{queries} queries in {per_row * 1000:.0f}ms "
+            f"vs ?expand=product 1 request/{len(captured)} query in {expanded * 1000:.0f}ms"
+        )
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+SQL queries per authorized request for IsInventoryManager, before and after
+role resolution moved to the per-user role cache.
+
+    python -m benchmarks.bench_permissions [--requests 200]
+"""
+import argparse
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import Group, User
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.permissions import BasePermission
+    from rest_framework.response import Response
+    from rest_framework.test import APIClient, APIRequestFactory
+    from rest_framework.views import APIView
+    from base.permissions import IsInventoryManager
+
+    class LegacyIsInventoryManager(BasePermission):
+        def has_permission(self, request, view):
+            if request.user.is_staff:
+                return True
+            return request.user.groups.filter(name='InventoryManager').exists()
+
+    def make_view(permission):
+        class Probe(APIView):
+            permission_classes = [permission]
+
+            def get(self, request):
+                return Response({'ok': True})
+        return Probe.as_view()
+
+    factory = APIRequestFactory()
+
+    with scratch_database():
+        user = User.objects.create_user('manager', password='secret123')
+        user.groups.add(Group.objects.get(name='InventoryManager'))
+        login = APIClient().post('/api/login/', {'username': 'manager', 'password': 'secret123'}, format='json')
+        token = login.json()['access']
+
+        for label, permission in (('legacy', LegacyIsInventoryManager), ('cached', IsInventoryManager)):
+            view = make_view(permission)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                for _ in range(args.requests):
+                    response = view(factory.get('/probe/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+                    assert response.status_code == 200, response.status_code
+                elapsed = time.perf_counter() - start
+            print(
+                f"{label:>7}: {len(ctx.captured_queries) / args.requests:.2f} queries/request "
+                f"(user lookup + permission), {args.requests / elapsed:.0f} req/s"
+            )
+
+
+if __name__ == '__main__':
+    main()
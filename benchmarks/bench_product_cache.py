@@ -0,0 +1,83 @@
+"""
+Product catalog reads with and without the response cache.
+
+    python -m benchmarks.bench_product_cache [--requests 3000] [--write-every 200]
+
+Clients fetch list pages and product details; a third of them revalidate
+with the ETag they saw last (If-None-Match). Every --write-every requests a
+product is edited, which invalidates the catalog. Reports hit rate (HIT or
+304) and p50/p99 latency; the baseline swaps in DummyCache.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.harness import percentile, scratch_database, setup_django
+
+
+def workload(client, products, n_requests, write_every):
+    rng = random.Random(42)
+    seen = {}
+    latencies = []
+    hits = 0
+    for i in range(n_requests):
+        if write_every and i and i % write_every == 0:
+            product = rng.choice(products)
+            product.unit_price = rng.randint(1, 99)
+            product.save(update_fields=['unit_price'])  # post_save invalidates
+
+        if rng.random() < 0.3:
+            path = '/api/products/'
+        else:
+            path = f'/api/products/{rng.choice(products[:200]).pk}/'
+        headers = {}
+        if path in seen and rng.random() < 0.33:
+            headers['HTTP_IF_NONE_MATCH'] = seen[path]
+
+        start = time.perf_counter()
+        response = client.get(path, **headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code in (200, 304), response.status_code
+        if response.status_code == 304 or response.get('X-Cache') == 'HIT':
+            hits += 1
+        if response.has_header('ETag'):
+            seen[path] = response['ETag']
+    return hits, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--write-every', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+    from base.models import Product
+
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'C-{i}', description='x' * 200, unit_price=10) for i in range(2000)]
+        )
+        client = APIClient()
+        dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy):
+            _, latencies = workload(client, products, args.requests, args.write_every)
+        print(
+            f"uncached: p50={percentile(latencies, 50) * 1000:.2f}ms "
+            f"p99={percentile(latencies, 99) * 1000:.2f}ms"
+        )
+
+        cache.clear()
+        hits, latencies = workload(client, products, args.requests, args.write_every)
+        print(
+            f"  cached: p50={percentile(latencies, 50) * 1000:.2f}ms "
+            f"p99={percentile(latencies, 99) * 1000:.2f}ms, "
+            f"hit rate={hits / args.requests:.1%}"
+        )
+
+
+if __name__ == '__main__':
+    main()
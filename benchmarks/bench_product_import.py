@@ -0,0 +1,76 @@
+"""
+Product catalog load: one POST /api/products/ per row vs. the streaming
+import (base.imports), which upserts by sku in chunks.
+
+    python -m benchmarks.bench_product_import [--rows 200000] [--post-rows 1000]
+
+The streaming import reads a generated CSV file twice (the second pass is
+all updates); the process's peak RSS is reported after each pass to show
+memory does not grow with the file.
+"""
+import argparse
+import csv
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+
+def write_catalog(path, n_rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sku', 'name', 'description', 'unit_price'])
+        for i in range(n_rows):
+            writer.writerow([f'SUP-{i}', f'Supplier item {i}', 'x' * 80, f'{i % 500}.{i % 100:02d}'])
+
+
+def timed_import(path):
+    from base.imports import import_products, iter_text_lines, read_csv
+
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        report = import_products(read_csv(iter_text_lines(f)))
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KB on Linux
+    return report, elapsed, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--post-rows', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.test import APIClient
+
+    with scratch_database():
+        client = APIClient()
+        start = time.perf_counter()
+        for i in range(args.post_rows):
+            response = client.post('/api/products/', {
+                'sku': f'POST-{i}', 'name': f'Item {i}', 'description': 'x' * 80, 'unit_price': '9.99',
+            }, format='json')
+            assert response.status_code == 201, response.content
+        elapsed = time.perf_counter() - start
+        print(f"   per-row POST: {args.post_rows / elapsed:8.0f} rows/s ({args.post_rows} rows)")
+
+        tmpdir = tempfile.mkdtemp(prefix='ims-import-')
+        for n_rows in (args.rows // 10, args.rows):
+            path = os.path.join(tmpdir, f'catalog-{n_rows}.csv')
+            write_catalog(path, n_rows)
+            for label in ('insert', 'update'):
+                report, elapsed, peak = timed_import(path)
+                assert report['failed'] == 0, report['errors'][:3]
+                print(
+                    f"stream {label} {n_rows:>7}: {n_rows / elapsed:8.0f} rows/s, "
+                    f"peak RSS {peak / 2**20:.0f} MB"
+                )
+            os.remove(path)
+        os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
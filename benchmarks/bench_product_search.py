@@ -0,0 +1,110 @@
+"""
+Product search latency (GET /api/products/search/?q=) on a large catalog:
+the FTS5 index plus SKU range scan (base.search) vs. the icontains
+fallback other backends use, for typeahead prefixes and multi-word
+queries; plus the index rebuild and what keeping it in sync adds to a
+product save.
+
+    python -m benchmarks.bench_product_search [--products 1000000] [--repeat 20]
+
+Names and descriptions are drawn from a 36-word vocabulary, so every
+word is in a large share of the catalog: the worst case for the index.
+"""
+import argparse
+import random
+import time
+from unittest import mock
+
+from benchmarks.harness import percentile, scratch_database, setup_django
+
+ADJECTIVES = ['blue', 'red', 'green', 'black', 'steel', 'brass', 'heavy', 'light', 'compact', 'wide',
+              'stainless', 'galvanized', 'plastic', 'rubber', 'industrial', 'portable']
+NOUNS = ['widget', 'gadget', 'bolt', 'washer', 'bracket', 'hinge', 'valve', 'pump', 'bearing', 'gear',
+         'spring', 'clamp', 'hose', 'cable', 'switch', 'sensor', 'filter', 'gasket', 'fitting', 'coupling']
+QUERIES = [
+    ('SKU typeahead, 4 chars', 'SKU-'),
+    ('SKU typeahead, 8 chars', 'SKU-0123'),
+    ('exact SKU', 'SKU-0123456'),
+    ('word prefix, 2 chars', 'ga'),
+    ('word prefix, 3 chars', 'gal'),
+    ('word prefix, 6 chars', 'galvan'),
+    ('word prefix, 7 chars', 'galvani'),
+    ('word + prefix', 'stainless bol'),
+    ('three words', 'portable rubber hose'),
+    ('words spanning fields', 'hinge rubber valve'),
+    ('no match', 'zzzq'),
+]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--fallback-repeat', type=int, default=3, help="Runs per query of the (slow) fallback.")
+    parser.add_argument('--saves', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import transaction
+    from django.db.models.signals import post_save
+    from rest_framework.test import APIClient
+    from base import search
+    from base.models import Product
+    from base.signals import reindex_product_on_save
+
+    rng = random.Random(0)
+    with scratch_database():
+        start = time.perf_counter()
+        for first in range(0, args.products, 50_000):
+            Product.objects.bulk_create([
+                Product(
+                    name=f'{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i % 1000}',
+                    sku=f'SKU-{i:07d}',
+                    description=' '.join(rng.choice(ADJECTIVES + NOUNS) for _ in range(12)),
+                    unit_price=1 + i % 90,
+                )
+                for i in range(first, min(first + 50_000, args.products))
+            ], batch_size=5000)
+        print(f"seeded {args.products} products in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        indexed = search.rebuild_product_search()
+        print(f"rebuild_product_search: {indexed} products in {time.perf_counter() - start:.1f}s")
+
+        client = APIClient()
+        print(f"{'query':<24} {'hits':>4}  {'index p50':>9} {'p95':>7} {'HTTP p50':>9}   {'fallback p50':>12}")
+        for label, q in QUERIES:
+            hits = len(search.search_products(q))
+            indexed = timed(lambda: search.search_products(q), args.repeat)
+            http = timed(lambda: client.get('/api/products/search/', {'q': q}).json(), args.repeat)
+            with mock.patch.object(search, 'search_index_enabled', return_value=False):
+                fallback = timed(lambda: search.search_products(q), args.fallback_repeat)
+            print(f"{label:<24} {hits:>4}  {percentile(indexed, 50) * 1000:7.2f}ms {percentile(indexed, 95) * 1000:5.2f}ms "
+                  f"{percentile(http, 50) * 1000:7.2f}ms   {percentile(fallback, 50) * 1000:10.1f}ms")
+
+        def save_products():
+            for i in range(args.saves):
+                with transaction.atomic():
+                    Product.objects.create(name=f'new widget {i}', sku=f'NEW-{i}-{time.perf_counter_ns()}',
+                                           unit_price=1)
+
+        with_index = sum(timed(save_products, 1))
+        post_save.disconnect(reindex_product_on_save, sender=Product)
+        try:
+            without = sum(timed(save_products, 1))
+        finally:
+            post_save.connect(reindex_product_on_save, sender=Product)
+        print(f"product save: {without / args.saves * 1000:.2f} ms without indexing, "
+              f"{with_index / args.saves * 1000:.2f} ms with")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Sales report latency from the rollup tables (GET /api/reports/sales/) vs.
+grouping the SalesOrder table directly, as the order table grows; plus
+the chunked rollup rebuild and what the incremental update adds to an
+order save.
+
+    python -m benchmarks.bench_sales_report [--orders 200000 800000] [--products 2000]
+
+Orders are spread over two years; each size is reported for a 7-day,
+30-day and 365-day (monthly) range ending today.
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.harness import scratch_database, setup_django
+
+RANGES = ((7, 'day'), (30, 'day'), (365, 'month'))
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, nargs='+', default=[200_000, 800_000])
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--saves', type=int, default=500, help="Order creates for the per-save overhead.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import transaction
+    from django.db.models import Count, DecimalField, F, Sum
+    from django.db.models.signals import post_save
+    from rest_framework.test import APIClient
+    from base.models import Product, SalesOrder
+    from base.services import rebuild_sales_rollups
+    from base.signals import update_sales_rollups_on_order_save
+
+    today = datetime.date.today()
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'SR-{i}', unit_price=i % 50 + 1) for i in range(args.products)],
+        )
+        client = APIClient()
+        seeded = 0
+        for size in sorted(args.orders):
+            SalesOrder.objects.bulk_create([
+                SalesOrder(product=products[i % len(products)], quantity=1 + i % 5, customer_name='C',
+                           order_date=today - datetime.timedelta(days=i % 730))
+                for i in range(seeded, size)
+            ], batch_size=5000)
+            seeded = size
+            start = time.perf_counter()
+            daily, monthly = rebuild_sales_rollups()
+            print(f"{size} orders: rebuild wrote {daily} daily / {monthly} monthly rows "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+            for days, granularity in RANGES:
+                first = today - datetime.timedelta(days=days - 1)
+                url = f'/api/reports/sales/?start={first}&end={today}&granularity={granularity}'
+                rollup = best_of(lambda: client.get(url).json())
+
+                def raw():
+                    return list(
+                        SalesOrder.objects.filter(order_date__range=(first, today)).exclude(status='FAILED')
+                        .values('order_date')
+                        .annotate(order_count=Count('id'), units=Sum('quantity'),
+                                  sales=Sum(F('quantity') * F('product__unit_price'), output_field=DecimalField()))
+                        .order_by('order_date')
+                    )
+                print(f"  {days:>3} days by {granularity:<5}: orders table {best_of(raw) * 1000:8.1f} ms   "
+                      f"rollups (HTTP) {rollup * 1000:6.1f} ms")
+
+        def create_orders():
+            for i in range(args.saves):
+                with transaction.atomic():  # as the API saves (AtomicSaveMixin)
+                    SalesOrder.objects.create(product=products[i % len(products)], quantity=1, customer_name='C')
+
+        with_rollups = best_of(create_orders, 1)
+        post_save.disconnect(update_sales_rollups_on_order_save, sender=SalesOrder)
+        try:
+            without = best_of(create_orders, 1)
+        finally:
+            post_save.connect(update_sales_rollups_on_order_save, sender=SalesOrder)
+        print(f"order save: {without / args.saves * 1000:.2f} ms without rollups, "
+              f"{with_rollups / args.saves * 1000:.2f} ms with")
+
+
+if __name__ == '__main__':
+    main()
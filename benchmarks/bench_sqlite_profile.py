@@ -0,0 +1,80 @@
+"""
+Mixed read/write throughput on SQLite: default settings vs. the production
+profile (ims.settings.SQLITE_PRODUCTION_OPTIONS), and the production
+profile with writes routed through base.write_queue.
+
+    python -m benchmarks.bench_sqlite_profile [--workers 16] [--ops 200] [--write-ratio 0.2]
+
+Each worker does --ops operations: stock lookups, or add/remove of one
+unit through the stock service.
+"""
+import argparse
+import random
+
+from benchmarks.harness import run_threads, scratch_database, setup_django
+
+
+def run_profile(label, options, use_queue, args):
+    from django.db import connection
+    from base.models import Product, Stock
+    from base.services import add_stock, remove_stock
+    from base.write_queue import WriteQueue
+
+    saved = dict(connection.settings_dict['OPTIONS'])
+    connection.settings_dict['OPTIONS'].update(options)
+    connection.close()
+    try:
+        with scratch_database():
+            products = Product.objects.bulk_create(
+                [Product(name=f'P{i}', sku=f'Q-{i}', unit_price=1) for i in range(200)]
+            )
+            for product in products:
+                add_stock(product.pk, 'A', 1000)
+            product_ids = [p.pk for p in products]
+            writer = WriteQueue() if use_queue else None
+            errors = []
+
+            def worker(i):
+                rng = random.Random(i)
+                for _ in range(args.ops):
+                    pid = rng.choice(product_ids)
+                    try:
+                        if rng.random() < args.write_ratio:
+                            fn = add_stock if rng.random() < 0.5 else remove_stock
+                            if writer:
+                                writer.run(fn, pid, 'A', 1)
+                            else:
+                                fn(pid, 'A', 1)
+                        else:
+                            list(Stock.objects.filter(product_id=pid, location='A').values('quantity'))
+                    except Exception as exc:  # noqa: BLE001 - count "database is locked" etc.
+                        errors.append(exc)
+
+            elapsed = run_threads(worker, args.workers)
+            total = args.workers * args.ops
+            first = f", first: {errors[0]}" if errors else ""
+            print(f"{label:>24}: {total / elapsed:7.0f} ops/s, {len(errors)} errors{first}")
+    finally:
+        connection.settings_dict['OPTIONS'] = saved
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=200)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    default = {'timeout': 5}
+    production = settings.SQLITE_PRODUCTION_OPTIONS
+    run_profile('default', default, False, args)
+    run_profile('production', production, False, args)
+    run_profile('production + write queue', production, True, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Concurrent invoicing: read-modify-write handler vs. base.services.
+
+    python -m benchmarks.bench_stock_mutation [--threads 8] [--per-thread 50]
+
+Every thread invoices its own sales orders of 1 unit against one Stock row
+that starts with exactly enough units, so the final quantity must be 0.
+Anything left over is a lost update. The service case posts through the
+job queue; the count includes waiting for it to drain.
+"""
+import argparse
+
+from benchmarks.harness import run_threads, scratch_database, setup_django
+
+
+def legacy_reduce_stock_on_invoice(sender, instance, created, **kwargs):
+    # The handler as it was before the stock mutation service.
+    from django.db import transaction
+    from base.models import SalesInvoice, Stock
+    from base.services import DEFAULT_WAREHOUSE
+
+    if created and not instance.processed:
+        so = instance.sales_order
+        stock = Stock.objects.get(product=so.product, location=DEFAULT_WAREHOUSE)
+        if stock.quantity < so.quantity:
+            raise ValueError(f"Insufficient stock for product {so.product.name}")
+        with transaction.atomic():
+            stock.quantity -= so.quantity
+            stock.save()
+            so.status = 'COMPLETED'
+            so.save()
+            SalesInvoice.objects.filter(pk=instance.pk).update(processed=True)
+
+
+def run_case(label, n_threads, per_thread):
+    from base.jobs import drain_jobs
+    from base.models import Product, SalesInvoice, SalesOrder, Stock
+    from base.services import DEFAULT_WAREHOUSE
+
+    SalesInvoice.objects.all().delete()
+    SalesOrder.objects.all().delete()
+    Stock.objects.all().delete()
+    product, _ = Product.objects.get_or_create(
+        sku='BENCH-001', defaults={'name': 'Bench', 'unit_price': 1}
+    )
+    total = n_threads * per_thread
+    Stock.objects.create(product=product, location=DEFAULT_WAREHOUSE, quantity=total)
+    orders = SalesOrder.objects.bulk_create(
+        [SalesOrder(product=product, quantity=1, customer_name=f'c{i}') for i in range(total)]
+    )
+    order_ids = [so.pk for so in orders]
+    errors = []
+
+    def worker(i):
+        for so_id in order_ids[i::n_threads]:
+            try:
+                SalesInvoice.objects.create(sales_order_id=so_id, quantity=1)
+            except Exception as exc:  # noqa: BLE001 - report, don't abort the run
+                errors.append(exc)
+
+    elapsed = run_threads(worker, n_threads)
+    drain_jobs()  # the queued postings (base.jobs) still being run, if any
+    remaining = Stock.objects.get(product=product, location=DEFAULT_WAREHOUSE).quantity
+    invoiced = SalesInvoice.objects.count()
+    lost = remaining - (total - invoiced)
+    print(
+        f"{label:>8}: {invoiced}/{total} invoices in {elapsed:.2f}s "
+        f"({invoiced / elapsed:.0f}/s), remaining={remaining}, "
+        f"lost_updates={lost}, errors={len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--per-thread', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models.signals import post_save
+    from base.models import SalesInvoice
+    from base.signals import reduce_stock_on_invoice
+
+    with scratch_database():
+        post_save.disconnect(reduce_stock_on_invoice, sender=SalesInvoice)
+        post_save.connect(legacy_reduce_stock_on_invoice, sender=SalesInvoice)
+        try:
+            run_case('legacy', args.threads, args.per_thread)
+        finally:
+            post_save.disconnect(legacy_reduce_stock_on_invoice, sender=SalesInvoice)
+            post_save.connect(reduce_stock_on_invoice, sender=SalesInvoice)
+        run_case('service', args.threads, args.per_thread)
+
+
+if __name__ == '__main__':
+    main()
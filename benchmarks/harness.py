@@ -0,0 +1,74 @@
+"""
+Shared helpers for the offline benchmarks.
+
+Each benchmark runs against a throwaway SQLite file created from the
+project's migrations, so the real db.sqlite3 is never touched.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ims.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+
+@contextmanager
+def scratch_database():
+    """
+    Create a file-backed test database (so worker threads share it) and
+    drop it afterwards.
+    """
+    from django.db import connection
+
+    tmpdir = tempfile.mkdtemp(prefix='ims-bench-')
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    connection.settings_dict.setdefault('OPTIONS', {}).setdefault('timeout', 30)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def run_threads(worker, n_threads, *args):
+    """
+    Run `worker(thread_index, *args)` in `n_threads` threads and return the
+    wall-clock time. Each thread closes its own DB connection when done.
+    """
+    from django.db import connection
+
+    def target(i):
+        try:
+            worker(i, *args)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
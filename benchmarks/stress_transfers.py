@@ -0,0 +1,84 @@
+"""
+Concurrency stress test for stock transfers.
+
+    python -m benchmarks.stress_transfers [--threads 16] [--per-thread 50]
+
+Half the threads move stock A -> B and half B -> A, each transfer (or
+batch) touching several products, so opposite-direction transactions
+constantly want the same rows. Afterwards every product's total must be
+unchanged, no quantity may be negative, and the ledger must agree with
+Stock. Exits non-zero on any violation or unexpected error.
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.harness import run_threads, scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--per-thread', type=int, default=50)
+    parser.add_argument('--products', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Sum
+    from base.models import Product, Stock, StockMovement
+    from base.services import transfer_stock_batch
+
+    with scratch_database():
+        products = Product.objects.bulk_create(
+            [Product(name=f'P{i}', sku=f'X-{i}', unit_price=1) for i in range(args.products)]
+        )
+        for product in products:
+            Stock.objects.create(product=product, location='A', quantity=500)
+            Stock.objects.create(product=product, location='B', quantity=500)
+        product_ids = [p.pk for p in products]
+
+        shortages = []
+        errors = []
+
+        def worker(i):
+            rng = random.Random(i)
+            source, target = ('A', 'B') if i % 2 else ('B', 'A')
+            for _ in range(args.per_thread):
+                items = [(pid, rng.randint(1, 20)) for pid in rng.sample(product_ids, k=3)]
+                try:
+                    transfer_stock_batch(source, target, items)
+                except ValueError as exc:
+                    shortages.append(exc)  # legitimate: not enough at the source
+                except Exception as exc:  # noqa: BLE001 - deadlocks, lock timeouts
+                    errors.append(exc)
+
+        elapsed = run_threads(worker, args.threads)
+        attempts = args.threads * args.per_thread
+
+        failures = []
+        totals = dict(Stock.objects.values('product_id').annotate(t=Sum('quantity')).values_list('product_id', 't'))
+        if any(total != 1000 for total in totals.values()):
+            failures.append(f"totals changed: {totals}")
+        if Stock.objects.filter(quantity__lt=0).exists():
+            failures.append("negative stock")
+        for stock in Stock.objects.all():
+            ledger = StockMovement.objects.filter(
+                product_id=stock.product_id, location=stock.location
+            ).aggregate(t=Sum('quantity'))['t']
+            if ledger != stock.quantity:
+                failures.append(f"ledger {ledger} != stock {stock.quantity} for {stock}")
+        if errors:
+            failures.append(f"{len(errors)} errors, first: {errors[0]!r}")
+
+        print(
+            f"{attempts} batch transfers on {args.threads} threads in {elapsed:.2f}s "
+            f"({attempts / elapsed:.0f}/s), {len(shortages)} rejected for shortage, "
+            f"{len(errors)} errors"
+        )
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'base.instrumentation.SQLInstrumentationMiddleware',  # no-op unless SQL_INSTRUMENTATION
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +55,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query count/time as Server-Timing, aggregated at /api/_metrics/
+# (base.instrumentation). Off by default; IMS_SQL_INSTRUMENTATION=1 enables it.
+SQL_INSTRUMENTATION = os.environ.get('IMS_SQL_INSTRUMENTATION') == '1'
+
+# Who runs queued stock-posting jobs (base.jobs): 'thread' = daemon threads
+# in each web process, 'external' = only `manage.py run_jobs`.
+JOB_WORKER = os.environ.get('IMS_JOB_WORKER', 'thread')
+
+# Seconds a create response is kept for replay to retries sent with the
+# same Idempotency-Key header (base.idempotency).
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
 ROOT_URLCONF = 'ims.urls'
 
 TEMPLATES = [
@@ -83,6 +97,50 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile (IMS_SQLITE_PROFILE=production): WAL so readers
+# never block the writer, fsync only at checkpoints, a busy timeout instead
+# of instant "database is locked", a larger page cache and mmap, BEGIN
+# IMMEDIATE so write transactions queue for the lock up front, and
+# persistent connections so the pragmas are paid once per connection.
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA busy_timeout=20000;'
+        'PRAGMA cache_size=-65536;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+}
+
+# With it, invoice and GRN creates also go through the group-commit write
+# queue (base.write_queue).
+SQLITE_WRITE_QUEUE = False
+
+if os.environ.get('IMS_SQLITE_PROFILE') == 'production':
+    DATABASES['default'].update(
+        CONN_MAX_AGE=600,
+        CONN_HEALTH_CHECKS=True,
+        OPTIONS=SQLITE_PRODUCTION_OPTIONS,
+    )
+    SQLITE_WRITE_QUEUE = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; with several worker processes switch to a
+# shared backend (e.g. FileBasedCache or Redis) so invalidation reaches all.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ims-default',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,5 +192,7 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'base.pagination.StandardCursorPagination',
+    'PAGE_SIZE': 100,
 }